@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+from ib_insync import IB, util
+
+class ConnectionManager:
+    """
+    Owns the process's connection to Interactive Brokers and connects lazily on first use.
+
+    Nothing connects when the manager is created, so importing modules that share it costs
+    nothing for processes that never talk to the broker (backtests, tooling, offline runs).
+    Every DataRetrieval and BrokerIntegration given the same manager shares one IB instance.
+    Event handlers can be attached to `ib` before connecting.
+
+    An IB object can be injected instead of creating one, e.g. a fake for offline use. Objects
+    without an isConnected method are treated as always connected.
+
+    If an established connection drops, it is re-established in the background with
+    exponential backoff. Market data subscriptions are not restored; listen to
+    ib.connectedEvent to re-request them.
+
+    Attributes:
+        ib (IB): The shared IB instance. It may not be connected yet; use connect() to get a
+                 connected one.
+        host (str): The TWS / IB Gateway host.
+        port (int): The TWS / IB Gateway port.
+        client_id (int): The API client id. Defaults to a random id.
+        timeout (float): The timeout in seconds of each connection attempt.
+        max_retries (int): How many times a failed connection attempt is retried.
+        backoff (float): The delay in seconds before the first retry, doubled on each attempt.
+        max_backoff (float): The longest delay between attempts.
+        auto_reconnect (bool): Whether to reconnect after the connection drops.
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 4001,
+        client_id: Optional[int] = None,
+        ib: Optional[IB] = None,
+        timeout: float = 4,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        auto_reconnect: bool = True,
+    ):
+        self.ib = ib if ib is not None else IB()
+        self.host = host
+        self.port = port
+        self.client_id = client_id if client_id is not None else random.randint(0, 9999)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.auto_reconnect = auto_reconnect
+        self._logger = logging.getLogger(__name__)
+        self._established = False  # Whether a connection has been made and not closed on purpose
+        self._reconnecting: Optional[asyncio.Future] = None
+
+        disconnected = getattr(self.ib, 'disconnectedEvent', None)
+        if disconnected is not None:
+            disconnected += self._on_disconnected
+
+    def is_connected(self) -> bool:
+        """
+        Returns whether the IB instance is connected, without trying to connect.
+        """
+        is_connected = getattr(self.ib, 'isConnected', None)
+        return is_connected is None or is_connected()
+
+    def connect(self) -> IB:
+        """
+        Returns the shared IB instance, connecting it first if necessary.
+
+        Returns:
+            IB: The connected IB instance.
+
+        Raises:
+            ConnectionError: If every connection attempt failed.
+        """
+        if self.is_connected():
+            return self.ib
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self._delay(attempt))
+            try:
+                self.ib.connect(self.host, self.port, clientId=self.client_id, timeout=self.timeout)
+            except (OSError, asyncio.TimeoutError, ConnectionError) as e:
+                error = e
+                self._logger.warning(f"Connection attempt {attempt + 1} to {self.host}:{self.port} failed: {e!r}")
+                continue
+            self._established = True
+            return self.ib
+        raise ConnectionError(f"Could not connect to {self.host}:{self.port} after {self.max_retries + 1} attempts") from error
+
+    async def connect_async(self) -> IB:
+        """
+        Asynchronous version of connect(), for use while the event loop is running.
+        """
+        if self.is_connected():
+            return self.ib
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self._delay(attempt))
+            try:
+                await self.ib.connectAsync(self.host, self.port, clientId=self.client_id, timeout=self.timeout)
+            except (OSError, asyncio.TimeoutError, ConnectionError) as e:
+                error = e
+                self._logger.warning(f"Connection attempt {attempt + 1} to {self.host}:{self.port} failed: {e!r}")
+                continue
+            self._established = True
+            return self.ib
+        raise ConnectionError(f"Could not connect to {self.host}:{self.port} after {self.max_retries + 1} attempts") from error
+
+    def disconnect(self) -> None:
+        """
+        Closes the connection without reconnecting.
+        """
+        self._established = False
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+            self._reconnecting = None
+        if hasattr(self.ib, 'disconnect'):
+            self.ib.disconnect()
+
+    def _delay(self, attempt: int) -> float:
+        return min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+
+    def _on_disconnected(self) -> None:
+        """
+        Schedules a reconnect when an established connection drops unexpectedly.
+        """
+        if not (self.auto_reconnect and self._established):
+            return
+        if self._reconnecting is not None and not self._reconnecting.done():
+            return
+        self._logger.warning(f"Lost connection to {self.host}:{self.port}, reconnecting")
+        self._reconnecting = util.getLoop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        try:
+            await self.connect_async()
+        except ConnectionError as e:
+            self._established = False
+            self._logger.error(str(e))
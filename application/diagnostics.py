@@ -1,18 +1,45 @@
-from typing import List
+import json
+import logging
+from typing import List, Optional
 from entities.alert import Alert
 from entities.activity import Activity
 from entities.confirmation import Confirmation
+from application.latency_tracing import LatencyTracer, tracer
 
 # ? Owner: TradingSystem
 # TODO: Implement this class
 class Diagnostics:
     def __init__(self, alerts: List[Alert]):
         self.alerts = alerts
+        self.logger = logging.getLogger(__name__)
 
     def send_alert(self, alert: Alert) -> Confirmation:
         # Code to send real-time alerts via SMS or email
         pass
 
     def log_activity(self, activity: Activity):
-        # Code to log system activities and performance
-        pass
\ No newline at end of file
+        """
+        Logs a system activity as '<activity_type> <description>' at INFO level.
+        """
+        self.logger.info(f"{activity.activity_type} {activity.description}")
+
+    def log_latency(self, latency_tracer: Optional[LatencyTracer] = None, reset: bool = False) -> Activity:
+        """
+        Logs a snapshot of the pipeline's latency histograms as a 'LATENCY' activity.
+
+        The description is the JSON form of LatencyTracer.snapshot(), with p50/p99/p99.9 per stage
+        and per strategy, so it can be parsed back out of the logs.
+
+        Parameters:
+            latency_tracer (LatencyTracer, optional): The tracer to export. Defaults to the shared tracer.
+            reset (bool): Whether to clear the histograms afterwards, so each snapshot covers one interval.
+
+        Returns:
+            Activity: The logged activity.
+        """
+        latency_tracer = latency_tracer if latency_tracer is not None else tracer
+        activity = Activity('LATENCY', json.dumps(latency_tracer.snapshot()))
+        self.log_activity(activity)
+        if reset:
+            latency_tracer.reset()
+        return activity
@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from ib_insync import util
+
+from application.latency_tracing import tracer
+from data_management.data_retrieval import DataRetrieval
+from data_management.subscription_manager import MarketDataSubscription
+from data_management.tick_store import RingBuffer
+from trading_strategies.strategy_executor import StrategyExecutor
+
+class StrategyMetrics:
+    """
+    Counters and latency figures for one strategy in an ExecutionScheduler.
+
+    Latency is measured from a tick being dispatched to the strategy's orders being submitted,
+    so it includes any time the update waited while the strategy was busy.
+
+    Attributes:
+        ticks_received (int): Updates dispatched to the strategy.
+        ticks_dropped (int): Updates replaced by a newer one before the strategy processed them.
+        runs (int): Completed analyze() calls whose signals were acted on.
+        timeouts (int): Runs that exceeded the time budget. Their signals were discarded.
+        errors (int): Runs that raised an exception.
+        orders (int): Orders submitted.
+        queue_depth (int): Symbols with updates waiting to be processed.
+        last_latency (float): Latency of the latest run, in seconds.
+        max_latency (float): The highest latency seen, in seconds.
+        total_latency (float): The sum of all run latencies, in seconds.
+    """
+
+    def __init__(self):
+        self.ticks_received = 0
+        self.ticks_dropped = 0
+        self.runs = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.orders = 0
+        self.queue_depth = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.runs if self.runs else 0.0
+
+    def record_latency(self, latency: float) -> None:
+        self.runs += 1
+        self.last_latency = latency
+        self.total_latency += latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+
+    def to_dict(self) -> Dict[str, float]:
+        metrics = dict(vars(self))
+        metrics['mean_latency'] = self.mean_latency
+        return metrics
+
+class _StrategyWorker:
+    """
+    The pending updates and metrics of one StrategyExecutor.
+
+    Pending updates are kept per symbol, so a newer tick replaces a stale one for the same symbol
+    instead of queueing behind it.
+    """
+
+    def __init__(self, executor: StrategyExecutor):
+        self.executor = executor
+        self.metrics = StrategyMetrics()
+        self.pending: Dict[str, Tuple[RingBuffer, int]] = {}  # Symbol -> (buffer, dispatch time in ns)
+        self.ready = asyncio.Event()
+
+    def offer(self, buffer: RingBuffer, dispatched: int) -> None:
+        pending = self.pending
+        symbol = buffer.symbol
+        self.metrics.ticks_received += 1
+        if symbol in pending:
+            # Keep the original dispatch time so latency reflects how long the symbol has waited
+            dispatched = pending[symbol][1]
+            self.metrics.ticks_dropped += 1
+        elif len(pending) >= self.executor.max_pending:
+            del pending[next(iter(pending))]
+            self.metrics.ticks_dropped += 1
+        pending[symbol] = (buffer, dispatched)
+        self.metrics.queue_depth = len(pending)
+        self.ready.set()
+
+    def take(self) -> Tuple[RingBuffer, int]:
+        symbol = next(iter(self.pending))
+        item = self.pending.pop(symbol)
+        self.metrics.queue_depth = len(self.pending)
+        if not self.pending:
+            self.ready.clear()
+        return item
+
+class ExecutionScheduler:
+    """
+    Runs many StrategyExecutors concurrently on live market data.
+
+    Market data and order I/O stay on the ib_insync asyncio event loop, while each strategy's
+    analyze() call runs on a worker pool. Each update is dispatched only to the strategies
+    subscribed to its symbol. Every strategy has its own pending updates and its own worker task,
+    so a slow strategy drops its own stale ticks instead of queueing the others' behind them.
+
+    The workers are threads, so they only run in parallel while the GIL is released, e.g. inside
+    NumPy and pandas operations on large arrays. Strategies whose analyze() spends its time in
+    pure Python take turns holding the GIL, and the event loop competes with them for it, so each
+    CPU-bound strategy added does slow the others down. Such strategies are better split across
+    processes, each with its own ExecutionScheduler and IB client id.
+
+    Attributes:
+        executors (List[StrategyExecutor]): The strategies to run.
+        pool (Executor): The pool that analyze() calls run on.
+    """
+
+    def __init__(self, executors: List[StrategyExecutor], pool: Optional[Executor] = None):
+        """
+        Parameters:
+            executors (List[StrategyExecutor]): The strategies to run.
+            pool (Executor, optional): The thread pool to run analyze() on. Defaults to one thread
+                                       per strategy, so strategies never wait for a free worker.
+
+        Raises:
+            ValueError: If the pool is a process pool. analyze() updates the strategy's state and
+                        its executor holds the IB connection, so neither can move to another process.
+        """
+        if isinstance(pool, ProcessPoolExecutor):
+            raise ValueError("ExecutionScheduler needs a thread pool, strategies can't run in another process")
+        self.executors = executors
+        self.pool = pool if pool is not None else ThreadPoolExecutor(
+            max_workers=max(1, len(executors)), thread_name_prefix='strategy')
+        self._logger = logging.getLogger(__name__)
+        self._workers = [_StrategyWorker(executor) for executor in executors]
+        # (data source, symbol, bar resolution or None for ticks) -> workers subscribed to that symbol
+        self._subscribers: Dict[Tuple[int, str, Optional[int]], List[_StrategyWorker]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._stopped: Optional[asyncio.Event] = None
+        self._subscriptions: List[Tuple[DataRetrieval, MarketDataSubscription]] = []
+
+    def run(self) -> None:
+        """
+        Blocking wrapper around run_async(). Runs until stop() is called.
+        """
+        util.run(self.run_async())
+
+    async def run_async(self) -> None:
+        """
+        Subscribes to every strategy's symbols and processes updates until stop() is called.
+        """
+        self._stopped = asyncio.Event()
+        self.start()
+        try:
+            await self._stopped.wait()
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+            self.unsubscribe()
+
+    def start(self) -> None:
+        """
+        Subscribes to market data and starts one worker task per strategy on the running loop.
+        """
+        loop = util.getLoop()
+        sources: Dict[int, DataRetrieval] = {}
+        for worker in self._workers:
+            executor = worker.executor
+            source = executor.data_retrieval
+            sources[id(source)] = source
+            for symbol in executor.symbols:
+                self._subscribers.setdefault((id(source), symbol, executor.bar_resolution), []).append(worker)
+            self._tasks.append(loop.create_task(self._run_worker(worker)))
+
+        for source_id, symbol, resolution in self._subscribers:
+            source = sources[source_id]
+            if resolution is None:
+                subscription = source.fetch_realtime_data(symbol, lambda buffer, source_id=source_id: self.dispatch(source_id, buffer))
+            else:
+                subscription = source.fetch_realtime_bars(
+                    symbol, resolution, lambda buffer, source_id=source_id, resolution=resolution: self.dispatch(source_id, buffer, resolution))
+            self._subscriptions.append((source, subscription))
+
+    def unsubscribe(self) -> None:
+        """
+        Cancels the market data subscriptions made by start(), freeing their lines.
+        """
+        for source, subscription in self._subscriptions:
+            source.cancel_realtime_data(subscription)
+        self._subscriptions = []
+        self._subscribers = {}
+
+    def stop(self) -> None:
+        """
+        Stops processing updates and makes run() return.
+        """
+        if self._stopped is not None:
+            self._stopped.set()
+
+    def dispatch(self, source_id: int, buffer: RingBuffer, resolution: Optional[int] = None) -> None:
+        """
+        Passes a market data update to every strategy subscribed to its symbol.
+
+        Parameters:
+            source_id (int): The id() of the DataRetrieval the update came from.
+            buffer (RingBuffer): The symbol's TickBuffer with the new tick appended, or its
+                                 BarBuffer with the new bar appended.
+            resolution (int, optional): The bar length in seconds, or None for ticks.
+        """
+        workers = self._subscribers.get((source_id, buffer.symbol, resolution))
+        if not workers:
+            return
+        now = time.perf_counter_ns()
+        # One batch of ticks feeds every strategy, so its dispatch latency is recorded per strategy
+        received = buffer.received_ns if tracer.enabled else 0
+        for worker in workers:
+            worker.offer(buffer, now)
+            if received:
+                tracer.record('tick_dispatch', received, worker.executor.name)
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns every strategy's metrics, keyed by executor name.
+        """
+        return {worker.executor.name: worker.metrics.to_dict() for worker in self._workers}
+
+    async def _run_worker(self, worker: _StrategyWorker) -> None:
+        loop = asyncio.get_running_loop()
+        executor = worker.executor
+        metrics = worker.metrics
+        while True:
+            await worker.ready.wait()
+            buffer, dispatched = worker.take()
+            traced = tracer.enabled
+            if traced:
+                tracer.record('queue_wait', dispatched, executor.name)
+                # Ticks carry their arrival time while tracing, which includes the dispatch itself
+                received = buffer.received_ns or dispatched
+            start = time.perf_counter_ns() if traced else 0
+            data = executor.prepare_data(buffer)
+            if traced:
+                tracer.record('prepare_data', start, executor.name)
+
+            future = loop.run_in_executor(self.pool, executor.analyze, data)
+            remaining = executor.time_budget - (time.perf_counter_ns() - dispatched) / 1e9
+            done, _ = await asyncio.wait([future], timeout=max(remaining, 0))
+            if not done:
+                metrics.timeouts += 1
+                # Let the late run finish before starting another, so analyze() never runs concurrently
+                await asyncio.wait([future])
+                if future.exception() is not None:
+                    metrics.errors += 1
+                else:
+                    executor.discard(future.result())
+                continue
+            signals = []
+            try:
+                signals = future.result()
+                await executor.qualify(signals)
+                handles = executor.submit(signals)
+            except Exception:
+                metrics.errors += 1
+                self._logger.exception(f"Strategy {executor.name} failed on {buffer.symbol}")
+                # None of the signals got a handle, so the strategy would otherwise wait on them forever
+                executor.discard(signals)
+                continue
+            metrics.orders += len(handles)
+            metrics.record_latency((time.perf_counter_ns() - dispatched) / 1e9)
+            if traced and handles:
+                tracer.record('tick_to_order', received, executor.name)
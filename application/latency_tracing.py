@@ -0,0 +1,221 @@
+import bisect
+import itertools
+from time import perf_counter_ns
+from typing import Dict, Iterable, Optional, Tuple
+
+# Values below 2**SUB_BUCKET_BITS ns are recorded exactly. Above that every power of two is split
+# into 2**(SUB_BUCKET_BITS - 1) linear buckets, so recorded values are within 1/128 (0.8%) of the truth.
+SUB_BUCKET_BITS = 8
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+DEFAULT_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+class LatencyHistogram:
+    """
+    A fixed-size, log-linear histogram of latencies in nanoseconds, in the style of HdrHistogram.
+
+    Recording is a few integer operations and one list increment, with no allocation. Percentiles
+    are accurate to within 0.8% of the value, with the exact minimum, maximum and mean tracked
+    separately.
+
+    Attributes:
+        highest (int): The largest value, in nanoseconds, with its own bucket. Larger values are
+                       counted in the last bucket, but still update the maximum.
+        count (int): The number of recorded values.
+        total (int): The sum of all recorded values, in nanoseconds.
+        min (int): The smallest recorded value, in nanoseconds.
+        max (int): The largest recorded value, in nanoseconds.
+    """
+
+    def __init__(self, highest: int = 3_600_000_000_000):
+        self.highest = highest
+        self.counts = [0] * (_bucket_index(highest) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        """
+        Records one latency, in nanoseconds.
+        """
+        # _bucket_index() inlined, since this runs on the hot path
+        if value < SUB_BUCKET_COUNT:
+            if value < 0:
+                value = 0
+            index = value
+        else:
+            shift = value.bit_length() - SUB_BUCKET_BITS
+            index = SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + (value >> shift) - SUB_BUCKET_HALF
+            if index >= len(self.counts):
+                index = len(self.counts) - 1
+        self.counts[index] += 1
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> int:
+        """
+        Returns the value, in nanoseconds, at or below which the given percentage of values fall.
+
+        Parameters:
+            percentile (float): The percentile, between 0 and 100.
+        """
+        return self.percentiles([percentile])[0]
+
+    def percentiles(self, percentiles: Iterable[float]) -> Tuple[int, ...]:
+        """
+        Returns the values, in nanoseconds, at several percentiles with a single pass over the buckets.
+        """
+        if not self.count:
+            return tuple(0 for _ in percentiles)
+        cumulative = list(itertools.accumulate(self.counts))
+        values = []
+        for percentile in percentiles:
+            rank = max(1, -(-self.count * percentile // 100))
+            index = bisect.bisect_left(cumulative, rank)
+            # Report the top of the bucket, but never more than the largest value seen
+            values.append(min(_bucket_upper(index), self.max))
+        return tuple(int(value) for value in values)
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        """
+        Adds every value recorded in another histogram with the same range.
+        """
+        if not other.count:
+            return
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.min = other.min if not self.count else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def reset(self) -> None:
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def summary(self, percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[str, float]:
+        """
+        Returns the count and the min, mean, max and requested percentiles in microseconds,
+        e.g. {'count': 10, 'min_us': 1.2, ..., 'p99_us': 8.1, 'p99.9_us': 9.0}.
+        """
+        percentiles = tuple(percentiles)
+        summary = {
+            'count': self.count,
+            'min_us': self.min / 1000,
+            'mean_us': self.mean / 1000,
+            'max_us': self.max / 1000,
+        }
+        for percentile, value in zip(percentiles, self.percentiles(percentiles)):
+            summary[f'p{percentile:g}_us'] = value / 1000
+        return summary
+
+class LatencyTracer:
+    """
+    Keeps one LatencyHistogram per pipeline stage, and per strategy for strategy-specific stages.
+
+    Call sites take perf_counter_ns() timestamps only when `enabled` is true and pass the start
+    time to record(), so a disabled tracer costs a single attribute check:
+
+        start = perf_counter_ns() if tracer.enabled else 0
+        ...
+        if tracer.enabled:
+            tracer.record('analyze', start, strategy_name)
+
+    Each (stage, strategy) pair has its own histogram, so a stage recorded from one thread at a
+    time needs no locking.
+
+    Attributes:
+        enabled (bool): Whether call sites should record latencies.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._histograms: Dict[Tuple[str, Optional[str]], LatencyHistogram] = {}
+
+    def record(self, stage: str, start: int, strategy: Optional[str] = None) -> int:
+        """
+        Records the time elapsed since a perf_counter_ns() timestamp.
+
+        Parameters:
+            stage (str): The pipeline stage, e.g. 'analyze'.
+            start (int): The perf_counter_ns() value when the stage started.
+            strategy (str, optional): The strategy the stage ran for, if it is strategy-specific.
+
+        Returns:
+            int: The perf_counter_ns() value when the stage ended, for chaining stages.
+        """
+        end = perf_counter_ns()
+        histogram = self._histograms.get((stage, strategy))
+        if histogram is None:
+            histogram = self._histograms[(stage, strategy)] = LatencyHistogram()
+        histogram.record(end - start)
+        return end
+
+    def histogram(self, stage: str, strategy: Optional[str] = None) -> LatencyHistogram:
+        """
+        Returns the histogram of a stage, merged across strategies unless one is given.
+        """
+        if strategy is not None:
+            return self._histograms.get((stage, strategy)) or LatencyHistogram()
+        merged = LatencyHistogram()
+        for (recorded_stage, _), histogram in list(self._histograms.items()):
+            if recorded_stage == stage:
+                merged.merge(histogram)
+        return merged
+
+    def snapshot(self, percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[str, Dict]:
+        """
+        Returns summaries of every stage, plus a breakdown per strategy where stages have one.
+
+        Returns:
+            Dict[str, Dict]: {'stages': {stage: summary}, 'strategies': {strategy: {stage: summary}}}.
+        """
+        percentiles = tuple(percentiles)
+        keys = list(self._histograms)
+        stages = {stage: self.histogram(stage).summary(percentiles) for stage in dict.fromkeys(s for s, _ in keys)}
+        strategies: Dict[str, Dict[str, Dict]] = {}
+        for stage, strategy in keys:
+            if strategy is not None:
+                strategies.setdefault(strategy, {})[stage] = self._histograms[(stage, strategy)].summary(percentiles)
+        return {'stages': stages, 'strategies': strategies}
+
+    def reset(self) -> None:
+        """
+        Clears every histogram.
+        """
+        for histogram in list(self._histograms.values()):
+            histogram.reset()
+
+def _bucket_index(value: int) -> int:
+    if value < SUB_BUCKET_COUNT:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + (value >> shift) - SUB_BUCKET_HALF
+
+def _bucket_upper(index: int) -> int:
+    """
+    Returns the largest value that falls into a bucket.
+    """
+    if index < SUB_BUCKET_COUNT:
+        return index
+    offset = index - SUB_BUCKET_COUNT
+    shift = offset // SUB_BUCKET_HALF + 1
+    lower = (offset % SUB_BUCKET_HALF + SUB_BUCKET_HALF) << shift
+    return lower + (1 << shift) - 1
+
+# Shared by the live pipeline. Disabled until tracing is switched on, e.g. tracer.enabled = True.
+tracer = LatencyTracer()
@@ -1,10 +1,33 @@
 from pandas import DataFrame
 
-# TODO: Implement this class
 class PerformanceAnalysis:
+    """
+    A class for visualizing the results produced by CustomBacktester.run_backtest.
+
+    Attributes:
+        results (DataFrame): The results of the backtest, with at least 'equity' and 'position' columns.
+    """
+
     def __init__(self, results: DataFrame):
         self.results = results
 
-    def visualize_results(self, results: DataFrame):
-        # Code to generate visualizations for backtesting results
-        pass
\ No newline at end of file
+    def visualize_results(self, results: DataFrame = None):
+        """
+        Plots the equity curve, drawdown and position of a backtest.
+
+        Plotting goes through pandas, so matplotlib must be installed when this is called.
+
+        Parameters:
+            results (DataFrame, optional): The backtest results. Defaults to self.results.
+
+        Returns:
+            The matplotlib axes holding the three panels.
+        """
+        results = self.results if results is None else results
+        equity = results['equity']
+        panels = DataFrame({
+            'equity': equity,
+            'drawdown': equity / equity.cummax() - 1,
+            'position': results['position'],
+        }, index=results.index)
+        return panels.plot(subplots=True, sharex=True, legend=True, title='Backtest results')
@@ -1,18 +1,269 @@
-from typing import Dict
+import numpy as np
+from typing import Dict, List, Optional, Tuple
 from pandas import DataFrame
+from entities.option_signal import OptionSignal
+from entities.signal import Signal
 from trading_strategies.strategy_interface import StrategyInterface
 
-# TODO: Implement this class
-# ! Skipping Backtesting Class for MVP (Everything will be backtesting)
+# Number of shares controlled by one option contract
+OPTION_MULTIPLIER = 100
+
 class CustomBacktester:
-    def __init__(self, strategy: StrategyInterface, data: DataFrame):
+    """
+    A backtesting engine that replays historical bars through a StrategyInterface.
+
+    Two modes are supported:
+        - 'vectorized': The strategy exposes generate_signals(data), returning the target position for
+          every bar as an array. The whole history is then simulated with NumPy array operations.
+        - 'event': The strategy's analyze() is called bar by bar on the history seen so far and the
+          StockSignal/OptionSignal objects it produces are filled one at a time. Use this for
+          stateful strategies that can't be expressed as array operations.
+
+    Both modes assume positions are established at the close of the bar that produced them and
+    return the same results frame, which can be passed to calculate_performance_metrics() or
+    PerformanceAnalysis.
+
+    Attributes:
+        strategy (StrategyInterface): The strategy to be backtested.
+        data (DataFrame): The historical bars, as returned by DataStorage.load_from_csv or
+                          DataRetrieval.fetch_historical_data.
+        initial_cash (float): The starting account equity.
+        commission (float): The commission charged per share or contract traded.
+        slippage (float): The fraction of the price paid on every market fill.
+        price_column (str): The column holding the bar closing price.
+        periods_per_year (int): The number of bars per year, used to annualize metrics.
+    """
+
+    def __init__(
+        self,
+        strategy: StrategyInterface,
+        data: DataFrame,
+        initial_cash: float = 100_000.0,
+        commission: float = 0.0,
+        slippage: float = 0.0,
+        price_column: str = 'close',
+        periods_per_year: int = 252,
+    ):
         self.strategy = strategy
         self.data = data
+        self.initial_cash = initial_cash
+        self.commission = commission
+        self.slippage = slippage
+        self.price_column = price_column
+        self.periods_per_year = periods_per_year
+
+    def run_backtest(
+        self,
+        strategy: Optional[StrategyInterface] = None,
+        data: Optional[DataFrame] = None,
+        mode: str = 'auto',
+        lookback: Optional[int] = None,
+    ) -> DataFrame:
+        """
+        Runs a backtest for a strategy and returns the bar-by-bar results.
+
+        Parameters:
+            strategy (StrategyInterface, optional): The strategy to test. Defaults to self.strategy.
+            data (DataFrame, optional): The historical bars. Defaults to self.data.
+            mode (str): 'vectorized', 'event', or 'auto' to use the vectorized mode whenever the
+                        strategy implements generate_signals().
+            lookback (int, optional): In event mode, the number of most recent bars passed to
+                                      analyze(). Defaults to the full history seen so far.
 
-    def run_backtest(self, strategy: StrategyInterface, data: DataFrame) -> DataFrame:
-        # Code to run backtest for a specific strategy and return results
-        pass
+        Returns:
+            DataFrame: A frame indexed like the input data with price, position, trade, cost,
+                       equity and returns columns.
+        """
+        strategy = self.strategy if strategy is None else strategy
+        data = self.data if data is None else data
+
+        if mode == 'auto':
+            mode = 'vectorized' if strategy.supports_vectorized() else 'event'
+        if mode == 'vectorized':
+            return self._run_vectorized(strategy, data)
+        elif mode == 'event':
+            return self._run_event(strategy, data, lookback)
+        else:
+            raise ValueError(f"Unsupported backtest mode: {mode}")
 
     def calculate_performance_metrics(self, results: DataFrame) -> Dict:
-        # Code to calculate performance metrics after backtesting
-        pass
\ No newline at end of file
+        """
+        Calculates summary performance metrics from the results of run_backtest().
+
+        Parameters:
+            results (DataFrame): The frame returned by run_backtest().
+
+        Returns:
+            Dict: Total and annualized return, annualized volatility, Sharpe ratio, maximum
+                  drawdown, number of trades and the fraction of bars with an open position.
+        """
+        equity = results['equity'].to_numpy(dtype=np.float64)
+        returns = results['returns'].to_numpy(dtype=np.float64)
+        n = len(equity)
+        if n == 0:
+            return {}
+
+        total_return = equity[-1] / self.initial_cash - 1
+        years = n / self.periods_per_year
+        annualized_return = (1 + total_return) ** (1 / years) - 1 if total_return > -1 else -1.0
+        volatility = returns.std(ddof=1) if n > 1 else 0.0
+        sharpe_ratio = returns.mean() / volatility * np.sqrt(self.periods_per_year) if volatility > 0 else 0.0
+        drawdown = equity / np.maximum.accumulate(equity) - 1
+
+        return {
+            'total_return': float(total_return),
+            'annualized_return': float(annualized_return),
+            'annualized_volatility': float(volatility * np.sqrt(self.periods_per_year)),
+            'sharpe_ratio': float(sharpe_ratio),
+            'max_drawdown': float(-drawdown.min()),
+            'num_trades': int(np.count_nonzero(results['trade'].to_numpy())),
+            'exposure': float(np.count_nonzero(results['position'].to_numpy()) / n),
+        }
+
+    def _run_vectorized(self, strategy: StrategyInterface, data: DataFrame) -> DataFrame:
+        """
+        Simulates a strategy from the target position array returned by generate_signals().
+        """
+        prices = self._prices(data)
+        positions = np.asarray(strategy.generate_signals(data), dtype=np.float64)
+        if positions.shape != prices.shape:
+            raise ValueError(
+                f"generate_signals returned shape {positions.shape}, expected {prices.shape}"
+            )
+
+        trades = np.diff(positions, prepend=0.0)
+        traded = np.abs(trades)
+        costs = traded * (self.commission + self.slippage * prices)
+        cash_flows = -trades * prices - costs
+        return self._build_results(data, prices, positions, trades, cash_flows, costs, np.zeros_like(prices))
+
+    def _run_event(self, strategy: StrategyInterface, data: DataFrame, lookback: Optional[int]) -> DataFrame:
+        """
+        Simulates a strategy by calling analyze() bar by bar and filling the signals it emits.
+        """
+        strategy.reset()
+        prices = self._prices(data)
+        lows = self._column(data, 'low', prices)
+        highs = self._column(data, 'high', prices)
+        n = len(prices)
+
+        positions = np.zeros(n)
+        trades = np.zeros(n)
+        cash_flows = np.zeros(n)
+        costs = np.zeros(n)
+        option_values = np.zeros(n)
+
+        position = 0.0
+        option_value = 0.0  # Options are carried at cost since the bars hold no option quotes
+        working: List[Signal] = []  # Resting stock limit orders
+
+        for i in range(n):
+            # Resting limit orders placed on earlier bars fill once the bar trades through them
+            if working:
+                still_working = []
+                for signal in working:
+                    quantity = self._signed_quantity(signal)
+                    if (quantity > 0 and lows[i] <= signal.price) or (quantity < 0 and highs[i] >= signal.price):
+                        fee = abs(quantity) * self.commission
+                        position += quantity
+                        trades[i] += quantity
+                        cash_flows[i] -= quantity * signal.price + fee
+                        costs[i] += fee
+                        strategy.on_signal_done(signal, quantity)
+                    else:
+                        still_working.append(signal)
+                working = still_working
+
+            start = 0 if lookback is None else max(0, i + 1 - lookback)
+            strategy.analyze(data.iloc[start:i + 1])
+            signals, strategy.signals = strategy.signals, []
+
+            for signal in signals:
+                quantity = self._signed_quantity(signal)
+                if isinstance(signal, OptionSignal):
+                    fee = abs(quantity) * self.commission
+                    notional = quantity * signal.price * OPTION_MULTIPLIER
+                    option_value += notional
+                    cash_flows[i] -= notional + fee
+                    costs[i] += fee
+                    strategy.on_signal_done(signal, quantity)
+                elif signal.order_type == 'LIMIT':
+                    working.append(signal)
+                elif signal.order_type == 'MARKET':
+                    fill_price, fee = self._market_fill(quantity, prices[i])
+                    position += quantity
+                    trades[i] += quantity
+                    cash_flows[i] -= quantity * fill_price + fee
+                    costs[i] += fee + abs(quantity) * abs(fill_price - prices[i])
+                    strategy.on_signal_done(signal, quantity)
+                else:
+                    raise ValueError(f"Unsupported order type: {signal.order_type}")
+
+            positions[i] = position
+            option_values[i] = option_value
+
+        return self._build_results(data, prices, positions, trades, cash_flows, costs, option_values)
+
+    def _build_results(
+        self,
+        data: DataFrame,
+        prices: np.ndarray,
+        positions: np.ndarray,
+        trades: np.ndarray,
+        cash_flows: np.ndarray,
+        costs: np.ndarray,
+        option_values: np.ndarray,
+    ) -> DataFrame:
+        """
+        Builds the results frame shared by both modes from per-bar position and cash flow arrays.
+        """
+        equity = self.initial_cash + np.cumsum(cash_flows) + positions * prices + option_values
+        previous = np.empty_like(equity)
+        if len(equity):
+            previous[0] = self.initial_cash
+            previous[1:] = equity[:-1]
+        returns = equity / previous - 1
+
+        return DataFrame({
+            'price': prices,
+            'position': positions,
+            'trade': trades,
+            'cost': costs,
+            'equity': equity,
+            'returns': returns,
+        }, index=data.index)
+
+    def _market_fill(self, quantity: float, price: float) -> Tuple[float, float]:
+        """
+        Returns the fill price including slippage and the commission for a market order.
+        """
+        fill_price = price * (1 + self.slippage) if quantity > 0 else price * (1 - self.slippage)
+        return fill_price, abs(quantity) * self.commission
+
+    def _prices(self, data: DataFrame) -> np.ndarray:
+        """
+        Returns the closing prices as a float array, accepting either 'close' or 'Close'.
+        """
+        return self._column(data, self.price_column, None)
+
+    def _column(self, data: DataFrame, name: str, default: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Looks up a bar column case-insensitively, falling back to a default array if it is missing.
+        """
+        for candidate in (name, name.lower(), name.capitalize()):
+            if candidate in data.columns:
+                return data[candidate].to_numpy(dtype=np.float64)
+        if default is None:
+            raise KeyError(f"Column '{name}' not found in backtest data")
+        return default
+
+    @staticmethod
+    def _signed_quantity(signal: Signal) -> float:
+        """
+        Converts a signal into a signed quantity, positive for buys and negative for sells.
+        """
+        if signal.signal_type == 'BUY':
+            return float(signal.quantity)
+        elif signal.signal_type == 'SELL':
+            return -float(signal.quantity)
+        raise ValueError(f"Unsupported signal type: {signal.signal_type}")
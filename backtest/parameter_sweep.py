@@ -0,0 +1,206 @@
+import itertools
+import os
+import random
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
+from pandas import DataFrame
+
+from backtest.backtester import CustomBacktester
+from trading_strategies.strategy_interface import StrategyInterface
+
+# Name, dtype and byte offset of every array packed into the shared memory block
+Layout = List[Tuple[str, str, int]]
+
+# Per-process state set up once by _init_worker, so tasks only carry their parameters
+_worker_state: Dict[str, Any] = {}
+
+class ParameterSweep:
+    """
+    Runs many backtests of one strategy class over a grid or random sample of parameters, in parallel.
+
+    The numeric columns of the historical data are copied once into a shared memory block. Worker
+    processes map that block into read-only NumPy arrays when they start, so each task only ships a
+    small parameter dict instead of pickling the whole DataFrame.
+
+    Example:
+        sweep = ParameterSweep(SimpleMovingAverageStrategy, bars, backtester_kwargs={'price_column': 'Close'})
+        ranked = sweep.grid_search({'window': range(5, 200)})
+
+    Attributes:
+        strategy_cls (Type[StrategyInterface]): The strategy class, constructed as strategy_cls(**params).
+        data (DataFrame): The historical bars shared with every backtest.
+        backtester_kwargs (Dict): Keyword arguments for CustomBacktester (commission, slippage, ...).
+        metric (str): The metric from calculate_performance_metrics() used to rank results.
+        max_workers (int): The number of worker processes. 1 runs every backtest in-process.
+    """
+
+    def __init__(
+        self,
+        strategy_cls: Type[StrategyInterface],
+        data: DataFrame,
+        backtester_kwargs: Optional[Dict] = None,
+        metric: str = 'sharpe_ratio',
+        max_workers: Optional[int] = None,
+    ):
+        self.strategy_cls = strategy_cls
+        self.data = data
+        self.backtester_kwargs = backtester_kwargs or {}
+        self.metric = metric
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def grid_search(self, param_grid: Dict[str, Sequence], **run_kwargs) -> DataFrame:
+        """
+        Backtests every combination of the given parameter values.
+
+        Parameters:
+            param_grid (Dict[str, Sequence]): A mapping of parameter names to the values to try.
+            **run_kwargs: Passed to run() (mode, lookback, ascending).
+
+        Returns:
+            DataFrame: One row per combination, ranked by self.metric.
+        """
+        names = list(param_grid)
+        combinations = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+        return self.run(combinations, **run_kwargs)
+
+    def random_search(
+        self,
+        param_distributions: Dict[str, Union[Sequence, Callable[[random.Random], Any]]],
+        n_iter: int,
+        seed: Optional[int] = None,
+        **run_kwargs,
+    ) -> DataFrame:
+        """
+        Backtests a random sample of parameter combinations.
+
+        Parameters:
+            param_distributions (Dict): A mapping of parameter names to either a sequence of values to
+                                        choose from uniformly or a callable that draws a value from a
+                                        random.Random instance.
+            n_iter (int): The number of combinations to sample.
+            seed (int, optional): The seed for reproducible sampling.
+            **run_kwargs: Passed to run() (mode, lookback, ascending).
+
+        Returns:
+            DataFrame: One row per sampled combination, ranked by self.metric.
+        """
+        rng = random.Random(seed)
+        combinations = []
+        for _ in range(n_iter):
+            params = {}
+            for name, distribution in param_distributions.items():
+                params[name] = distribution(rng) if callable(distribution) else rng.choice(list(distribution))
+            combinations.append(params)
+        return self.run(combinations, **run_kwargs)
+
+    def run(
+        self,
+        combinations: List[Dict],
+        mode: str = 'auto',
+        lookback: Optional[int] = None,
+        ascending: bool = False,
+    ) -> DataFrame:
+        """
+        Backtests each parameter combination and ranks the results.
+
+        Parameters:
+            combinations (List[Dict]): The keyword arguments to construct the strategy with, one per backtest.
+            mode (str): The CustomBacktester mode ('auto', 'vectorized' or 'event').
+            lookback (int, optional): The event mode lookback passed to run_backtest().
+            ascending (bool): Rank in ascending order of self.metric, e.g. for 'max_drawdown'.
+
+        Returns:
+            DataFrame: The parameters and performance metrics of every backtest, best first.
+        """
+        if not combinations:
+            return DataFrame()
+
+        if self.max_workers == 1:
+            _worker_state.update(self._state(self.data, mode, lookback))
+            rows = [_run_combination(params) for params in combinations]
+        else:
+            shm, layout, index_layout = _share_frame(self.data)
+            try:
+                chunksize = max(1, len(combinations) // (self.max_workers * 4))
+                with ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(shm.name, layout, index_layout, len(self.data), self._state(None, mode, lookback)),
+                ) as executor:
+                    rows = list(executor.map(_run_combination, combinations, chunksize=chunksize))
+            finally:
+                shm.close()
+                shm.unlink()
+
+        results = DataFrame(rows)
+        return results.sort_values(self.metric, ascending=ascending, ignore_index=True)
+
+    def _state(self, data: Optional[DataFrame], mode: str, lookback: Optional[int]) -> Dict[str, Any]:
+        """
+        Returns the per-process state needed to run a backtest, minus the shared data in worker processes.
+        """
+        return {
+            'data': data,
+            'strategy_cls': self.strategy_cls,
+            'backtester_kwargs': self.backtester_kwargs,
+            'mode': mode,
+            'lookback': lookback,
+        }
+
+def _share_frame(data: DataFrame) -> Tuple[SharedMemory, Layout, Optional[Tuple[str, str, int]]]:
+    """
+    Copies the numeric and datetime columns of a DataFrame, and its index, into one shared memory block.
+
+    Columns of any other dtype (e.g. strings) are left out.
+    """
+    arrays = []
+    for name in data.columns:
+        values = data[name].to_numpy()
+        if values.dtype.kind in 'biufM':
+            arrays.append((name, values))
+    index_values = data.index.to_numpy()
+    has_index = not isinstance(data.index, pd.RangeIndex) and index_values.dtype.kind in 'biufM'
+    if has_index:
+        arrays.append((None, index_values))
+
+    layout: Layout = []
+    offset = 0
+    for name, values in arrays:
+        layout.append((name, values.dtype.str, offset))
+        offset += values.nbytes
+    shm = SharedMemory(create=True, size=max(offset, 1))
+    for (name, values), (_, dtype, start) in zip(arrays, layout):
+        np.ndarray(values.shape, dtype=dtype, buffer=shm.buf, offset=start)[:] = values
+
+    index_layout = layout.pop() if has_index else None
+    return shm, layout, index_layout
+
+def _init_worker(shm_name: str, layout: Layout, index_layout: Optional[Tuple[str, str, int]], length: int, state: Dict):
+    """
+    Attaches a worker process to the shared price arrays and rebuilds a zero-copy DataFrame over them.
+    """
+    # Pool workers share the parent's resource tracker, so the block is unlinked only by the parent
+    shm = SharedMemory(name=shm_name)
+
+    def attach(dtype: str, offset: int) -> np.ndarray:
+        array = np.ndarray((length,), dtype=dtype, buffer=shm.buf, offset=offset)
+        array.flags.writeable = False
+        return array
+
+    columns = {name: attach(dtype, offset) for name, dtype, offset in layout}
+    index = attach(index_layout[1], index_layout[2]) if index_layout is not None else None
+    state['data'] = DataFrame(columns, index=index, copy=False)
+    state['shm'] = shm  # Keep the mapping alive for the life of the worker
+    _worker_state.update(state)
+
+def _run_combination(params: Dict) -> Dict:
+    """
+    Runs one backtest in the current process and returns its parameters alongside its metrics.
+    """
+    backtester = CustomBacktester(None, _worker_state['data'], **_worker_state['backtester_kwargs'])
+    strategy = _worker_state['strategy_cls'](**params)
+    results = backtester.run_backtest(strategy, mode=_worker_state['mode'], lookback=_worker_state['lookback'])
+    return {**params, **backtester.calculate_performance_metrics(results)}
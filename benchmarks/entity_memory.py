@@ -0,0 +1,93 @@
+"""
+Memory and allocation time per million signals and trades, for each way of storing them.
+
+Run from the repository root:
+
+    python -m benchmarks.entity_memory [--records 1000000]
+
+"before" uses copies of the original __dict__-based entity classes, "entity" the current slotted
+StockSignal and tuple-based Trade, and "batch" the NumPy-backed SignalBatch / TradeBlotter.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+
+from entities.signal_batch import SignalBatch
+from entities.stock_signal import StockSignal
+from entities.trade import Trade
+from entities.trade_blotter import TradeBlotter
+
+class DictSignal:
+    def __init__(self, symbol: str, signal_type: str, quantity: int, order_type: str, price: float):
+        self.symbol = symbol
+        self.signal_type = signal_type
+        self.quantity = quantity
+        self.order_type = order_type
+        self.price = price
+
+class DictTrade:
+    def __init__(self, symbol: str, quantity: int, price: float):
+        self.symbol = symbol
+        self.quantity = quantity
+        self.price = price
+
+def measure(build):
+    """
+    Returns the bytes still allocated by build()'s result, and how long build() took.
+
+    Timing and memory come from separate runs, since tracing allocations slows them down.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=1_000_000)
+    n = parser.parse_args().records
+
+    symbols = np.array(['AAPL', 'MSFT', 'SPY', 'QQQ'])[np.arange(n) % 4]
+    prices = 100 + np.arange(n) % 1000 / 100
+    sides = np.where(np.arange(n) % 2, 'SELL', 'BUY')
+    symbol_list, price_list, side_list = symbols.tolist(), prices.tolist(), sides.tolist()
+
+    def signal_batch():
+        batch = SignalBatch(n)
+        batch.append_columns(symbol=symbols, side=np.where(sides == 'BUY', 1, -1), quantity=np.full(n, 100), price=prices)
+        return batch
+
+    def trade_blotter():
+        blotter = TradeBlotter(n)
+        blotter.append_columns(symbol=symbols, quantity=np.full(n, 100.0), price=prices)
+        return blotter
+
+    cases = [
+        ('signals', 'before', lambda: [DictSignal(s, t, 100, 'MARKET', p) for s, t, p in zip(symbol_list, side_list, price_list)]),
+        ('signals', 'entity', lambda: [StockSignal(s, t, 100, 'MARKET', p) for s, t, p in zip(symbol_list, side_list, price_list)]),
+        ('signals', 'batch', signal_batch),
+        ('trades', 'before', lambda: [DictTrade(s, 100, p) for s, p in zip(symbol_list, price_list)]),
+        ('trades', 'entity', lambda: [Trade(s, 100, p) for s, p in zip(symbol_list, price_list)]),
+        ('trades', 'batch', trade_blotter),
+    ]
+
+    scale = 1_000_000 / n
+    print(f"{'records':<8} {'storage':<8} {'MB / 1M':>10} {'bytes each':>11} {'seconds / 1M':>13}")
+    for records, storage, build in cases:
+        size, elapsed = measure(build)
+        print(f"{records:<8} {storage:<8} {size * scale / 2**20:>10.1f} {size / n:>11.1f} {elapsed * scale:>13.3f}")
+
+if __name__ == '__main__':
+    main()
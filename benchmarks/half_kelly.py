@@ -0,0 +1,74 @@
+"""
+Time per rebalance of the half-Kelly optimizer, against recomputing the covariance from scratch.
+
+Run from the repository root:
+
+    python -m benchmarks.half_kelly [--strategies 200] [--periods 2000] [--rebalances 50]
+
+"incremental" records each period's returns into Optimization (a rank-one update of the covariance
+and its cached inverse) and then computes the weights. "naive" rebuilds the exponentially weighted
+covariance from the whole return history and solves for the weights each time. The last column is
+the largest difference between the incremental weights and a direct solve on the same covariance.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from entities.portfolio import Portfolio
+from performance.optimization import Optimization
+
+def naive_weights(history: np.ndarray, alpha: float, fraction: float) -> np.ndarray:
+    """
+    Recomputes the exponentially weighted mean and covariance of every return so far, and solves
+    for the fractional Kelly weights.
+    """
+    decay = (1 - alpha) ** np.arange(len(history) - 1, -1, -1)
+    decay /= decay.sum()
+    mean = decay @ history
+    centered = history - mean
+    covariance = (centered * decay[:, None]).T @ centered
+    return fraction * np.linalg.solve(covariance, mean)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--strategies', type=int, default=200)
+    parser.add_argument('--periods', type=int, default=2000)
+    parser.add_argument('--rebalances', type=int, default=50)
+    args = parser.parse_args()
+    n, periods, rebalances = args.strategies, args.periods, args.rebalances
+
+    rng = np.random.default_rng(0)
+    # Correlated strategy returns: a few common factors plus idiosyncratic noise
+    loadings = rng.normal(0, 0.005, (4, n))
+    returns = rng.normal(0, 0.01, (periods + rebalances, 4)) @ loadings + rng.normal(0.0005, 0.01, (periods + rebalances, n))
+    names = [f'strategy_{i}' for i in range(n)]
+
+    optimizer = Optimization(Portfolio([], 1_000_000.0, 1_000_000.0), names)
+    for row in returns[:periods]:
+        optimizer.record_returns(dict(zip(names, row)))
+
+    incremental = []
+    naive = []
+    error = 0.0
+    for t in range(periods, periods + rebalances):
+        row = dict(zip(names, returns[t]))
+        start = time.perf_counter()
+        optimizer.record_returns(row)
+        weights = optimizer.kelly_weights()
+        incremental.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        naive_weights(returns[:t + 1], optimizer.alpha, optimizer.fraction)
+        naive.append(time.perf_counter() - start)
+
+        direct = optimizer.fraction * np.linalg.solve(optimizer.covariance, optimizer.mean)
+        error = max(error, float(np.max(np.abs(weights - direct)) / np.max(np.abs(direct))))
+
+    print(f"{'method':<12} {'ms / rebalance':>15}")
+    print(f"{'incremental':<12} {np.median(incremental) * 1000:>15.3f}")
+    print(f"{'naive':<12} {np.median(naive) * 1000:>15.3f}")
+    print(f"speedup {np.median(naive) / np.median(incremental):.1f}x, max relative weight error {error:.2e}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Orders per second through the simulated broker's matching engine.
+
+Run from the repository root:
+
+    python -m benchmarks.simulated_broker [--orders 1000000] [--symbols 100] [--batch 1000]
+
+Orders are a mix of market and limit orders on random symbols and sides, with limit prices
+scattered around the quote so some fill on arrival and the rest rest in the book. After each batch
+one symbol's quote moves, filling any limit orders it crosses.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from entities.stock_order import StockOrder
+from order_execution.simulated_broker import SimulatedBroker
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    parser.add_argument('--symbols', type=int, default=100)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+    n, batch = args.orders, args.batch
+
+    rng = np.random.default_rng(0)
+    symbols = [f'SYM{i}' for i in range(args.symbols)]
+    indices = rng.integers(0, len(symbols), n).tolist()
+    quantities = (rng.integers(1, 100, n) * rng.choice([-1, 1], n)).tolist()
+    offsets = rng.normal(0, 0.5, n).tolist()
+    markets = (rng.random(n) < 0.3).tolist()
+    orders = [StockOrder('MARKET', symbols[i], q, None) if market else StockOrder('LIMIT', symbols[i], q, round(100 + offset, 2))
+              for i, q, offset, market in zip(indices, quantities, offsets, markets)]
+    quotes = (100 + rng.normal(0, 0.5, n // batch + 1)).tolist()
+
+    broker = SimulatedBroker(cash=1e12)
+    for symbol in symbols:
+        broker.on_tick(symbol, bid=99.99, ask=100.01)
+
+    start = time.perf_counter()
+    for step, i in enumerate(range(0, n, batch)):
+        broker.submit_orders(orders[i:i + batch])
+        mid = quotes[step]
+        broker.on_tick(symbols[step % len(symbols)], bid=mid - 0.01, ask=mid + 0.01, last=mid, size=500)
+    elapsed = time.perf_counter() - start
+
+    filled = sum(1 for trade in broker.trades.values() if trade.orderStatus.status == 'Filled')
+    resting = len(broker.query_open_orders())
+    print(f"{n:,} orders in {elapsed:.2f}s: {n / elapsed:,.0f} orders/s")
+    print(f"{filled:,} filled, {resting:,} resting, {len(broker.positions)} positions")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,443 @@
+import time
+from asyncio import TimerHandle
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from ib_insync import Ticker, util
+
+from data_management.data_storage import DataStorage
+from data_management.tick_store import EPOCH, ONE_MICROSECOND, RingBuffer
+
+# Columns kept for every bar, in append order. Prices are capitalized like the columns strategies expect.
+BAR_FIELDS = {
+    'timestamp': np.int64,  # Start of the bar, in nanoseconds since the epoch (UTC)
+    'Open': np.float64,
+    'High': np.float64,
+    'Low': np.float64,
+    'Close': np.float64,
+    'Volume': np.float64,
+    'VWAP': np.float64,
+    'Count': np.int64,  # The number of trades in the bar
+}
+
+# IB tick types that report a trade: RTVolume (generic tick '233') and the plain and delayed last price
+RT_VOLUME_TICK_TYPES = frozenset((48,))
+LAST_PRICE_TICK_TYPES = frozenset((4, 68))
+
+NANOSECONDS = 1_000_000_000
+
+class Bar(NamedTuple):
+    """
+    A lightweight, immutable copy of a single bar.
+    """
+    symbol: str
+    resolution: int
+    timestamp: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    vwap: float
+    count: int
+
+class BarBuffer(RingBuffer):
+    """
+    A ring buffer holding the most recent completed bars of one symbol at one resolution.
+
+    Attributes:
+        symbol (str): The symbol whose bars are stored in this buffer.
+        resolution (int): The length of each bar, in seconds.
+        received_ns (int): The perf_counter_ns() value when the latest bar was completed.
+        persisted (int): The value of count when the bars were last saved to storage.
+    """
+
+    def __init__(self, symbol: str, resolution: int, capacity: int):
+        """
+        The constructor for the BarBuffer class.
+
+        Parameters:
+            symbol (str): The symbol whose bars are stored in this buffer.
+            resolution (int): The length of each bar, in seconds.
+            capacity (int): The maximum number of bars retained.
+        """
+        super().__init__(BAR_FIELDS, capacity)
+        self.symbol = symbol
+        self.resolution = resolution
+        self.received_ns = 0
+        self.persisted = 0
+
+    def latest(self) -> Bar:
+        """
+        Returns the most recent bar as a Bar.
+        """
+        if self.count == 0:
+            raise IndexError(f"No bars completed for {self.symbol}")
+        i = self._cursor + self.capacity - 1
+        columns = self._columns
+        return Bar(
+            self.symbol,
+            self.resolution,
+            int(columns['timestamp'][i]),
+            float(columns['Open'][i]),
+            float(columns['High'][i]),
+            float(columns['Low'][i]),
+            float(columns['Close'][i]),
+            float(columns['Volume'][i]),
+            float(columns['VWAP'][i]),
+            int(columns['Count'][i])
+        )
+
+    def to_frame(self, n: Optional[int] = None) -> DataFrame:
+        """
+        Copies the last n bars into a new pandas DataFrame with a UTC 'date' column.
+
+        Parameters:
+            n (int, optional): The number of bars to include. Defaults to all retained bars.
+
+        Returns:
+            DataFrame: A DataFrame with date, Open, High, Low, Close, Volume, VWAP and Count
+                       columns, oldest bar first.
+        """
+        df = super().to_frame(n)
+        df.insert(0, 'date', pd.to_datetime(df.pop('timestamp'), unit='ns', utc=True))
+        return df
+
+class _SymbolBars:
+    """
+    The completed bars of one symbol at every resolution, and the bars still being built.
+
+    The bars being built are kept as Python scalars, one slot per resolution, so a tick only
+    updates a handful of floats.
+    """
+
+    def __init__(self, symbol: str, resolutions: Sequence[int], capacity: int):
+        levels = len(resolutions)
+        self.symbol = symbol
+        self.buffers = [BarBuffer(symbol, resolution, capacity) for resolution in resolutions]
+        self.periods = [resolution * NANOSECONDS for resolution in resolutions]
+        self.listeners: List[List[Callable[[BarBuffer], None]]] = [[] for _ in resolutions]
+        self.start = [-1] * levels  # -1 while no bar is being built
+        self.open = [0.0] * levels
+        self.high = [0.0] * levels
+        self.low = [0.0] * levels
+        self.close = [0.0] * levels
+        self.volume = [0.0] * levels
+        self.notional = [0.0] * levels
+        self.count = [0] * levels
+        self.watermark = 0  # The end of the last completed bar at the finest resolution
+
+class BarAggregator:
+    """
+    Builds OHLCV and VWAP bars at several resolutions from live trades.
+
+    Only the finest resolution is updated per trade. Each completed bar is folded into the bar
+    being built at the next resolution, so the cost per trade doesn't grow with the number of
+    resolutions. Each resolution must therefore be a multiple of the one before it.
+
+    A bar completes when a trade arrives after its end, or when close_due() is called after it.
+    start() calls close_due() on a timer, so quiet symbols still get their bars on time. Bars with
+    no trades are skipped, and trades older than the last completed bar are counted in
+    `late_trades` and dropped.
+
+    Completed bars are appended to preallocated BarBuffers and passed to the listeners of their
+    symbol and resolution. If a DataStorage is given, they are also saved to its partitioned store
+    in batches of `batch_size` bars, under storage_key().
+
+    Attributes:
+        resolutions (List[int]): The bar lengths, in seconds, finest first.
+        capacity (int): The number of completed bars retained per symbol and resolution.
+        storage (DataStorage, optional): Where completed bars are persisted.
+        batch_size (int): The number of completed bars to collect before persisting them.
+        trade_tick_types (frozenset): The IB tick types counted as trades.
+        grace (float): The number of seconds close_due() waits after a bar's end for late trades.
+        clock (Callable[[], int]): Returns the current time in nanoseconds since the epoch.
+        late_trades (int): The number of trades dropped because their bar had already completed.
+    """
+
+    def __init__(
+        self,
+        resolutions: Sequence[int] = (1, 5, 60, 300),
+        capacity: int = 1024,
+        storage: Optional[DataStorage] = None,
+        batch_size: int = 4096,
+        rt_volume: bool = True,
+        grace: float = 0.25,
+        clock: Callable[[], int] = time.time_ns,
+    ):
+        """
+        The constructor for the BarAggregator class.
+
+        Parameters:
+            resolutions (Sequence[int]): The bar lengths, in seconds. Each must be a multiple of the
+                                         one before it once sorted.
+            capacity (int): The number of completed bars retained per symbol and resolution.
+            storage (DataStorage, optional): Where completed bars are persisted. Defaults to nowhere.
+            batch_size (int): The number of completed bars to collect before persisting them.
+            rt_volume (bool): Whether to build bars from RTVolume ticks, which report every trade and
+                              need the '233' generic tick. Otherwise the last price ticks are used,
+                              which miss trades at an unchanged price.
+            grace (float): The number of seconds close_due() waits after a bar's end for late trades.
+            clock (Callable[[], int]): Returns the current time in nanoseconds since the epoch.
+                                       Defaults to the system clock; pass MarketReplay.clock in replays.
+
+        Raises:
+            ValueError: If the resolutions don't nest.
+        """
+        resolutions = sorted(int(resolution) for resolution in resolutions)
+        if not resolutions or resolutions[0] <= 0:
+            raise ValueError("resolutions must be positive")
+        for finer, coarser in zip(resolutions, resolutions[1:]):
+            if coarser % finer:
+                raise ValueError(f"Resolution {coarser}s is not a multiple of {finer}s")
+        self.resolutions = resolutions
+        self.capacity = capacity
+        self.storage = storage
+        self.batch_size = batch_size
+        self.trade_tick_types = RT_VOLUME_TICK_TYPES if rt_volume else LAST_PRICE_TICK_TYPES
+        self.grace = grace
+        self.clock = clock
+        self.late_trades = 0
+        self._levels = {resolution: level for level, resolution in enumerate(resolutions)}
+        self._symbols: Dict[str, _SymbolBars] = {}
+        self._unpersisted = 0
+        self._timer: Optional[TimerHandle] = None
+
+    @property
+    def generic_ticks(self) -> List[str]:
+        """
+        The IB generic tick types the market data subscriptions need.
+        """
+        return ['233'] if self.trade_tick_types is RT_VOLUME_TICK_TYPES else []
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._symbols
+
+    def track(self, symbol: str) -> None:
+        """
+        Starts building bars for a symbol.
+        """
+        if symbol not in self._symbols:
+            self._symbols[symbol] = _SymbolBars(symbol, self.resolutions, self.capacity)
+
+    def buffer(self, symbol: str, resolution: int) -> BarBuffer:
+        """
+        Returns the completed bars of a symbol at a resolution, tracking the symbol if needed.
+
+        Raises:
+            KeyError: If the resolution isn't one of self.resolutions.
+        """
+        self.track(symbol)
+        return self._symbols[symbol].buffers[self._level(resolution)]
+
+    def add_listener(self, symbol: str, resolution: int, cb: Callable[[BarBuffer], None]) -> None:
+        """
+        Calls a function with the symbol's BarBuffer each time one of its bars completes.
+
+        Parameters:
+            symbol (str): The symbol.
+            resolution (int): The bar length, in seconds.
+            cb (Callable[[BarBuffer], None]): The callback.
+        """
+        self.track(symbol)
+        self._symbols[symbol].listeners[self._level(resolution)].append(cb)
+
+    def remove_listener(self, symbol: str, resolution: int, cb: Callable[[BarBuffer], None]) -> None:
+        """
+        Removes a callback added by add_listener(). The symbol's bars are kept.
+        """
+        bars = self._symbols.get(symbol)
+        if bars is not None:
+            listeners = bars.listeners[self._level(resolution)]
+            if cb in listeners:
+                listeners.remove(cb)
+
+    def on_ticker(self, ticker: Ticker) -> None:
+        """
+        Adds the trades in a ticker's latest update to the bars of its symbol, if it is tracked.
+
+        Parameters:
+            ticker (Ticker): A ticker from the pendingTickersEvent.
+        """
+        bars = self._symbols.get(ticker.contract.symbol)
+        if bars is None:
+            return
+        trade_tick_types = self.trade_tick_types
+        for tick in ticker.ticks:
+            if tick.tickType in trade_tick_types and tick.size > 0:
+                self._on_trade(bars, (tick.time - EPOCH) // ONE_MICROSECOND * 1000, tick.price, tick.size)
+
+    def on_trade(self, symbol: str, timestamp: int, price: float, size: float) -> None:
+        """
+        Adds one trade to the bars of a symbol, tracking the symbol if needed.
+
+        Parameters:
+            symbol (str): The symbol traded.
+            timestamp (int): The time of the trade, in nanoseconds since the epoch (UTC).
+            price (float): The trade price.
+            size (float): The number of shares traded.
+        """
+        self.track(symbol)
+        self._on_trade(self._symbols[symbol], timestamp, price, size)
+
+    def close_due(self, now: Optional[int] = None) -> None:
+        """
+        Completes every bar that ended more than `grace` seconds ago.
+
+        Parameters:
+            now (int, optional): The current time, in nanoseconds since the epoch. Defaults to the clock.
+        """
+        cutoff = (self.clock() if now is None else now) - int(self.grace * NANOSECONDS)
+        for bars in self._symbols.values():
+            self._roll(bars, cutoff)
+
+    @property
+    def running(self) -> bool:
+        return self._timer is not None
+
+    def start(self, interval: float = 1.0) -> None:
+        """
+        Calls close_due() every `interval` seconds on the event loop until stop() is called.
+        """
+        self.stop()
+
+        def tick():
+            self.close_due()
+            self._timer = util.getLoop().call_later(interval, tick)
+
+        self._timer = util.getLoop().call_later(interval, tick)
+
+    def stop(self) -> None:
+        """
+        Stops the close_due() timer.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def flush(self) -> None:
+        """
+        Saves every completed bar that hasn't been persisted yet to the storage.
+        """
+        if self.storage is not None:
+            for bars in self._symbols.values():
+                for buffer in bars.buffers:
+                    self._persist(buffer)
+        self._unpersisted = 0
+
+    def storage_key(self, symbol: str, resolution: int) -> str:
+        """
+        Returns the name the bars of a symbol at a resolution are stored under, e.g. 'AAPL_1m'.
+        """
+        if resolution % 3600 == 0:
+            label = f"{resolution // 3600}h"
+        elif resolution % 60 == 0:
+            label = f"{resolution // 60}m"
+        else:
+            label = f"{resolution}s"
+        return f"{symbol}_{label}"
+
+    def _level(self, resolution: int) -> int:
+        level = self._levels.get(resolution)
+        if level is None:
+            raise KeyError(f"Bars aren't built at a resolution of {resolution}s")
+        return level
+
+    def _on_trade(self, bars: _SymbolBars, timestamp: int, price: float, size: float) -> None:
+        period = bars.periods[0]
+        bucket = timestamp - timestamp % period
+        if bucket == bars.start[0]:
+            if price > bars.high[0]:
+                bars.high[0] = price
+            elif price < bars.low[0]:
+                bars.low[0] = price
+            bars.close[0] = price
+            bars.volume[0] += size
+            bars.notional[0] += price * size
+            bars.count[0] += 1
+            return
+        if timestamp < bars.watermark or bucket < bars.start[0]:
+            self.late_trades += 1
+            return
+        self._roll(bars, timestamp)
+        bars.start[0] = bucket
+        bars.open[0] = bars.high[0] = bars.low[0] = bars.close[0] = price
+        bars.volume[0] = size
+        bars.notional[0] = price * size
+        bars.count[0] = 1
+
+    def _roll(self, bars: _SymbolBars, timestamp: int) -> None:
+        """
+        Completes every bar that ends at or before the timestamp, finest first, folding each one
+        into the bar being built at the next resolution.
+        """
+        levels = len(bars.periods)
+        for level in range(levels):
+            period = bars.periods[level]
+            start = bars.start[level]
+            if start < 0:
+                continue
+            if start + period > timestamp:
+                break  # Coarser bars contain this one, so they haven't ended either
+            self._complete(bars, level)
+            if level == 0:
+                bars.watermark = start + period
+            upper = level + 1
+            if upper == levels:
+                continue
+            if bars.start[upper] < 0:
+                bars.start[upper] = start - start % bars.periods[upper]
+                bars.open[upper] = bars.open[level]
+                bars.high[upper] = bars.high[level]
+                bars.low[upper] = bars.low[level]
+                bars.volume[upper] = 0.0
+                bars.notional[upper] = 0.0
+                bars.count[upper] = 0
+            else:
+                if bars.high[level] > bars.high[upper]:
+                    bars.high[upper] = bars.high[level]
+                if bars.low[level] < bars.low[upper]:
+                    bars.low[upper] = bars.low[level]
+            bars.close[upper] = bars.close[level]
+            bars.volume[upper] += bars.volume[level]
+            bars.notional[upper] += bars.notional[level]
+            bars.count[upper] += bars.count[level]
+
+    def _complete(self, bars: _SymbolBars, level: int) -> None:
+        """
+        Appends the bar being built at a level to its buffer and notifies the listeners.
+        """
+        volume = bars.volume[level]
+        buffer = bars.buffers[level]
+        buffer.append(
+            bars.start[level],
+            bars.open[level],
+            bars.high[level],
+            bars.low[level],
+            bars.close[level],
+            volume,
+            bars.notional[level] / volume if volume else bars.close[level],
+            bars.count[level]
+        )
+        bars.start[level] = -1
+        buffer.received_ns = time.perf_counter_ns()
+        for cb in bars.listeners[level]:
+            cb(buffer)
+
+        if self.storage is not None:
+            self._unpersisted += 1
+            if self._unpersisted >= self.batch_size:
+                self.flush()
+            elif buffer.count - buffer.persisted >= buffer.capacity:
+                # Save the buffer on its own before its oldest unsaved bar is overwritten
+                self._persist(buffer)
+
+    def _persist(self, buffer: BarBuffer) -> None:
+        pending = buffer.count - buffer.persisted
+        if pending <= 0:
+            return
+        self.storage.save_partitioned(buffer.to_frame(pending), self.storage_key(buffer.symbol, buffer.resolution))
+        buffer.persisted = buffer.count
@@ -0,0 +1,270 @@
+import asyncio
+import time
+from datetime import datetime
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import pandas as pd
+from ib_insync import IB, Stock, util
+
+from data_management.data_storage import DataStorage, to_utc
+from data_management.ib_history import MAX_CHUNK_DURATIONS, request_bars_async
+
+# (symbol, start, end) of one request
+Chunk = Tuple[str, datetime, datetime]
+
+class SlidingWindowLimiter:
+    """
+    An asyncio limiter that allows at most `limit` requests in any `window` seconds.
+
+    Unlike a token bucket, which starts full and refills continuously, this never lets more than
+    `limit` requests through in a window, including the first one. That is how IB counts them.
+
+    Attributes:
+        limit (int): The number of requests allowed per window.
+        window (float): The length of the window in seconds.
+    """
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._sent: Deque[float] = deque()  # Monotonic send times within the last window, oldest first
+        self._paused_until = 0.0
+
+    async def acquire(self) -> None:
+        """
+        Waits until a request may be sent and records it as sent.
+        """
+        sent = self._sent
+        while True:
+            now = time.monotonic()
+            while sent and sent[0] <= now - self.window:
+                sent.popleft()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+            elif len(sent) >= self.limit:
+                await asyncio.sleep(sent[0] + self.window - now)
+            else:
+                sent.append(now)
+                return
+
+    def pause(self, seconds: Optional[float] = None) -> None:
+        """
+        Holds back every request for a while, e.g. after the server reports a pacing violation.
+
+        Parameters:
+            seconds (float, optional): How long to wait. Defaults to the average spacing of requests
+                                       allowed by the limit.
+        """
+        if seconds is None:
+            seconds = self.window / self.limit
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+class DownloadProgress:
+    """
+    Progress and throughput of a bulk download.
+
+    Attributes:
+        total_chunks (int): The number of requests the download was split into.
+        completed_chunks (int): Requests that returned successfully.
+        failed (List[Tuple[Chunk, str]]): Requests that still failed after every retry, with the last error.
+        retries (int): The number of retried requests.
+        pacing_errors (int): The number of pacing violations reported by the server.
+        bars (int): The number of bars received.
+        started_at (float): The monotonic time the download started.
+        finished_at (float): The monotonic time the download finished, or None while it runs.
+    """
+
+    def __init__(self, total_chunks: int):
+        self.total_chunks = total_chunks
+        self.completed_chunks = 0
+        self.failed: List[Tuple[Chunk, str]] = []
+        self.retries = 0
+        self.pacing_errors = 0
+        self.bars = 0
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def fraction_done(self) -> float:
+        done = self.completed_chunks + len(self.failed)
+        return done / self.total_chunks if self.total_chunks else 1.0
+
+    @property
+    def bars_per_second(self) -> float:
+        return self.bars / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def requests_per_second(self) -> float:
+        requests = self.completed_chunks + len(self.failed) + self.retries
+        return requests / self.elapsed if self.elapsed > 0 else 0.0
+
+class BulkDownloader:
+    """
+    Downloads historical bars for many symbols concurrently while respecting IB's pacing limits.
+
+    Each symbol's date range is split into the largest chunks IB allows for the bar size. Chunks
+    are requested through reqHistoricalDataAsync by a pool of workers. A global sliding window
+    limits the overall request rate and a per-symbol window limits bursts for the same contract.
+    Failed chunks, including requests that timed out or reported an error (for which ib_insync
+    returns no bars rather than raising), are retried with exponential backoff, and every
+    completed chunk is written straight to the DataStorage partitioned store.
+
+    Attributes:
+        ib (IB): The IB connection. Anything with a compatible reqHistoricalDataAsync coroutine can
+                 be used, e.g. a fake that simulates pacing errors.
+        storage (DataStorage): Where downloaded bars are saved, under each symbol's name.
+        bar_size (str): The IB bar size setting.
+        what_to_show (str): The IB whatToShow setting.
+        use_rth (bool): Whether to only include regular trading hours.
+        max_concurrency (int): The number of requests allowed in flight at once.
+        max_retries (int): How many times a failed chunk is retried.
+        retry_delay (float): The delay in seconds before the first retry, doubled on each attempt.
+        request_timeout (float): The timeout in seconds of each request.
+        on_progress (Callable[[DownloadProgress], None], optional): Called after every chunk.
+    """
+
+    def __init__(
+        self,
+        ib: IB,
+        storage: DataStorage,
+        bar_size: str = '1 min',
+        what_to_show: str = 'TRADES',
+        use_rth: bool = True,
+        max_concurrency: int = 10,
+        max_retries: int = 3,
+        retry_delay: float = 15.0,
+        request_timeout: float = 60.0,
+        requests_per_window: int = 60,
+        window: float = 600.0,
+        symbol_requests_per_window: int = 6,
+        symbol_window: float = 2.0,
+        on_progress: Optional[Callable[[DownloadProgress], None]] = None,
+    ):
+        """
+        Initializes the downloader. The pacing defaults follow IB's historical data limits:
+        at most 60 requests every 10 minutes and 6 requests for the same contract every 2 seconds.
+        """
+        if bar_size not in MAX_CHUNK_DURATIONS:
+            raise ValueError(f"Unsupported bar size: {bar_size}")
+        self.ib = ib
+        self.storage = storage
+        self.bar_size = bar_size
+        self.what_to_show = what_to_show
+        self.use_rth = use_rth
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.request_timeout = request_timeout
+        self.on_progress = on_progress
+        self._limiter = SlidingWindowLimiter(requests_per_window, window)
+        self._symbol_limit = (symbol_requests_per_window, symbol_window)
+        self._symbol_limiters: Dict[str, SlidingWindowLimiter] = {}
+
+    def download(self, symbols: List[str], start_date: datetime, end_date: datetime) -> DownloadProgress:
+        """
+        Blocking wrapper around download_async().
+        """
+        return util.run(self.download_async(symbols, start_date, end_date))
+
+    async def download_async(self, symbols: List[str], start_date: datetime, end_date: datetime) -> DownloadProgress:
+        """
+        Downloads the bars for every symbol between two dates and saves them to storage.
+
+        Parameters:
+            symbols (List[str]): The symbols to download.
+            start_date (datetime): The inclusive start of the range. Naive values are treated as UTC.
+            end_date (datetime): The exclusive end of the range. Naive values are treated as UTC.
+
+        Returns:
+            DownloadProgress: The final progress, including any chunks that failed every retry.
+        """
+        chunks = self.plan(symbols, start_date, end_date)
+        progress = DownloadProgress(len(chunks))
+        queue: asyncio.Queue = asyncio.Queue()
+        for chunk in chunks:
+            queue.put_nowait(chunk)
+
+        # Report request errors as exceptions so failed chunks can be told apart from empty ones
+        raise_errors = getattr(self.ib, 'RaiseRequestErrors', None)
+        if raise_errors is not None:
+            self.ib.RaiseRequestErrors = True
+        try:
+            workers = [asyncio.ensure_future(self._worker(queue, progress)) for _ in range(self.max_concurrency)]
+            await queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        finally:
+            if raise_errors is not None:
+                self.ib.RaiseRequestErrors = raise_errors
+        progress.finished_at = time.monotonic()
+        return progress
+
+    def plan(self, symbols: List[str], start_date: datetime, end_date: datetime) -> List[Chunk]:
+        """
+        Splits every symbol's range into chunks no longer than IB allows for the bar size.
+
+        Chunks are interleaved across symbols so that the per-symbol pacing limit rarely blocks.
+
+        Returns:
+            List[Chunk]: The (symbol, start, end) of every request to make.
+        """
+        start_date, end_date = to_utc(start_date), to_utc(end_date)
+        step = MAX_CHUNK_DURATIONS[self.bar_size]
+        ranges = []
+        end = end_date
+        while end > start_date:
+            ranges.append((max(start_date, end - step), end))
+            end -= step
+        return [(symbol, start, end) for start, end in ranges for symbol in symbols]
+
+    async def _worker(self, queue: asyncio.Queue, progress: DownloadProgress) -> None:
+        while True:
+            chunk = await queue.get()
+            try:
+                await self._download_chunk(chunk, progress)
+            finally:
+                queue.task_done()
+                if self.on_progress is not None:
+                    self.on_progress(progress)
+
+    async def _download_chunk(self, chunk: Chunk, progress: DownloadProgress) -> None:
+        symbol, start, end = chunk
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                progress.retries += 1
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+            await self._limiter.acquire()
+            await self._symbol_limiter(symbol).acquire()
+            result = await request_bars_async(
+                self.ib, Stock(symbol, 'SMART', 'USD'), start, end,
+                self.bar_size, self.what_to_show, self.use_rth, self.request_timeout
+            )
+            if result.failed:
+                error = result.error
+                if result.pacing_violation:
+                    progress.pacing_errors += 1
+                    self._limiter.pause()
+                continue
+
+            bars = result.bars
+            progress.bars += len(bars)
+            df = util.df(bars)
+            if df is not None:
+                dates = pd.to_datetime(df['date'], utc=True)
+                df = df[(dates >= start) & (dates < end)]
+                self.storage.save_partitioned(df, symbol)
+            progress.completed_chunks += 1
+            return
+        progress.failed.append((chunk, error))
+
+    def _symbol_limiter(self, symbol: str) -> SlidingWindowLimiter:
+        limiter = self._symbol_limiters.get(symbol)
+        if limiter is None:
+            limiter = self._symbol_limiters[symbol] = SlidingWindowLimiter(*self._symbol_limit)
+        return limiter
@@ -1,7 +1,8 @@
 from pandas import DataFrame
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
-from tick_list_enum import TRANSFORM_FUNCTIONS, TickListEnum
+from data_management.tick_list_enum import TickListEnum
+from data_management.transform_pipeline import TransformPipeline
 
 class DataProcessing:
     """
@@ -19,6 +20,32 @@ class DataProcessing:
             data (DataFrame): The initial DataFrame to be processed.
         """
         self.data = data
+        self._pipelines: Dict[Tuple, TransformPipeline] = {}  # Compiled pipelines keyed by expression
+
+    def compile(self, expr: List[Tuple[TickListEnum, List]]) -> TransformPipeline:
+        """
+        Compiles an expression list into a reusable TransformPipeline.
+
+        Compiled pipelines are cached, so repeated calls with an equal expression list are cheap.
+
+        Parameters:
+            expr (List[Tuple[TickListEnum, List]]): A list of (operation, parameters) tuples.
+
+        Returns:
+            TransformPipeline: The validated, fused pipeline.
+
+        Raises:
+            ValueError: If an operation is unsupported or its parameters are invalid.
+        """
+        key = tuple((operation, tuple(params)) for operation, params in expr)
+        try:
+            pipeline = self._pipelines.get(key)
+        except TypeError:
+            # Unhashable parameters; compile without caching
+            return TransformPipeline(expr)
+        if pipeline is None:
+            pipeline = self._pipelines[key] = TransformPipeline(expr)
+        return pipeline
 
     def transform_data(self, data: DataFrame, expr: List[Tuple[TickListEnum, List]]) -> DataFrame:
         """
@@ -32,13 +59,8 @@ class DataProcessing:
         
         Returns:
             DataFrame: The transformed DataFrame.
+
+        Raises:
+            ValueError: If an operation is unsupported or its parameters are invalid.
         """
-        for operation, params in expr:
-            if operation in TRANSFORM_FUNCTIONS:
-                # Retrieve the function associated with the enum value
-                function = TRANSFORM_FUNCTIONS[operation]
-                # Call the function with the provided parameters
-                data = function(data, *params)
-            else:
-                raise ValueError(f"Operation {operation} is not supported.")
-        return data
\ No newline at end of file
+        return self.compile(expr).run(data)
\ No newline at end of file
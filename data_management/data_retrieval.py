@@ -1,38 +1,96 @@
 from ib_insync import IB, Stock, Ticker, util
 from datetime import datetime
-from typing import Callable, List
+from time import perf_counter_ns
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from pandas import DataFrame
 
-from globals import ib
+from application.connection_manager import ConnectionManager
+from application.latency_tracing import tracer
+from data_management.bar_aggregator import BarAggregator, BarBuffer
+from data_management.historical_cache import HistoricalDataCache
+from data_management.subscription_manager import MarketDataSubscription, SubscriptionManager
+from data_management.tick_store import TickBuffer, TickStore
+from globals import connection_manager
 
 class DataRetrieval:
     """
     A class for retrieving real-time and historical market data using the ib_insync library.
     
     Attributes:
-        ib (IB): An instance of the ib_insync.IB class that is already connected to Interactive Brokers.
+        connection (ConnectionManager): The connection to Interactive Brokers, shared with other components.
+        ib (IB): The connection's ib_insync.IB instance, connected on first use.
         callbacks (dict): A dictionary mapping symbols to their corresponding list of callback functions.
+        tick_store (TickStore): Preallocated per-symbol ring buffers holding the most recent ticks.
+        cache (HistoricalDataCache): An optional persistent cache for historical data requests.
+        subscriptions (SubscriptionManager): Shares market data lines between the real-time handlers.
+        bars (BarAggregator): Builds bars from the trades of the symbols with bar handlers.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        tick_capacity: int = 4096,
+        cache: Optional[HistoricalDataCache] = None,
+        connection: Optional[ConnectionManager] = None,
+        subscriptions: Optional[SubscriptionManager] = None,
+        bars: Optional[BarAggregator] = None,
+    ):
         """
-        The constructor for the DataRetrieval class.
+        The constructor for the DataRetrieval class. It doesn't connect to the broker.
+
+        Parameters:
+            tick_capacity (int): The number of ticks retained per symbol in the tick store.
+            cache (HistoricalDataCache, optional): A cache to serve historical data requests from.
+            connection (ConnectionManager, optional): The connection to use. Defaults to the shared
+                                                      connection from globals.
+            subscriptions (SubscriptionManager, optional): The manager of the account's market data lines.
+                                                           Pass the same one to every DataRetrieval on a
+                                                           connection. Defaults to a new one.
+            bars (BarAggregator, optional): The aggregator bar handlers are served from. Defaults to
+                                            one building 1s, 5s, 1m and 5m bars.
         """
-        self.ib = ib
+        self.connection = connection if connection is not None else connection_manager
         self.callbacks = {}  # Maps symbols to lists of callbacks
+        self.tick_store = TickStore(tick_capacity)
+        self.cache = cache
+        self.subscriptions = subscriptions if subscriptions is not None else SubscriptionManager(self.connection)
+        self.bars = bars if bars is not None else BarAggregator()
+        self._handlers: Dict[MarketDataSubscription, Callable[[TickBuffer], None]] = {}
+        self._bar_handlers: Dict[MarketDataSubscription, Tuple[int, Callable[[BarBuffer], None]]] = {}
+        self._listening = False
+
+    @property
+    def ib(self) -> IB:
+        return self.connection.connect()
 
-    # TODO: We should be passing in tickList to filter specific data
-    def fetch_realtime_data(self, symbol: str, cb: Callable[[DataFrame], None]) -> None:
+    def fetch_realtime_data(
+        self,
+        symbol: str,
+        cb: Callable[[TickBuffer], None],
+        generic_ticks: Optional[Iterable[str]] = None,
+        pinned: bool = False,
+    ) -> MarketDataSubscription:
         """
         Adds a real-time data handler for a specified symbol.
 
+        The callback receives the symbol's TickBuffer after each tick is appended. Use
+        buffer.latest() for the newest tick, buffer.column(name) for zero-copy array views,
+        or buffer.to_frame() when a DataFrame is actually needed.
+
+        Handlers of the same symbol share one IB subscription, which requests the union of
+        their generic tick types and is cancelled once the last handler is removed.
+
         Parameters:
             symbol (str): The symbol for which to retrieve real-time data.
-            cb (Callable[[DataFrame], None]): The callback function that will handle the real-time data.
+            cb (Callable[[TickBuffer], None]): The callback function that will handle the real-time data.
+            generic_ticks (Iterable[str], optional): The IB generic tick types the handler needs on top of
+                                                     the standard fields, e.g. ['233'] for RTVolume.
+            pinned (bool): Whether the symbol must keep its market data line when lines are rotated.
+
+        Returns:
+            MarketDataSubscription: The token to pass to cancel_realtime_data().
         """
-        # Define the contract and subscribe to market data
-        contract = Stock(symbol, 'SMART', 'USD')
-        self.ib.reqMktData(contract)
+        subscription = self.subscriptions.subscribe(symbol, generic_ticks, pinned)
+        self._handlers[subscription] = cb
 
         # If the symbol isn't in the callbacks dict, add it with an empty list
         if symbol not in self.callbacks:
@@ -41,26 +99,94 @@ class DataRetrieval:
         # Append the new callback to the list of callbacks for this symbol
         self.callbacks[symbol].append(cb)
 
-        # Attach to the pendingTickersEvent if this is the first symbol being tracked
-        if len(self.callbacks) == 1:
+        self._listen()
+        return subscription
+
+    def fetch_realtime_bars(
+        self,
+        symbol: str,
+        resolution: int,
+        cb: Callable[[BarBuffer], None],
+        pinned: bool = False,
+    ) -> MarketDataSubscription:
+        """
+        Adds a handler for the bars of a specified symbol, built from its trades as they arrive.
+        Starts the aggregator's timer if needed, so bars complete on time without new trades.
+
+        The callback receives the symbol's BarBuffer after each bar completes. Use buffer.latest()
+        for the newest bar, or buffer.to_frame() for a DataFrame with Open, High, Low, Close,
+        Volume, VWAP and Count columns.
+
+        Parameters:
+            symbol (str): The symbol for which to build bars.
+            resolution (int): The bar length in seconds. It must be one of self.bars.resolutions.
+            cb (Callable[[BarBuffer], None]): The callback function that will handle the completed bars.
+            pinned (bool): Whether the symbol must keep its market data line when lines are rotated.
+
+        Returns:
+            MarketDataSubscription: The token to pass to cancel_realtime_data().
+        """
+        self.bars.add_listener(symbol, resolution, cb)
+        subscription = self.subscriptions.subscribe(symbol, self.bars.generic_ticks, pinned)
+        self._bar_handlers[subscription] = (resolution, cb)
+        self._listen()
+        if not self.bars.running:
+            self.bars.start()
+        return subscription
+
+    def _listen(self) -> None:
+        # Attach to the pendingTickersEvent when the first handler is added
+        if not self._listening:
             self.ib.pendingTickersEvent += self._on_pending_tickers
+            self._listening = True
+
+    def cancel_realtime_data(self, subscription: MarketDataSubscription) -> None:
+        """
+        Removes a real-time data handler added by fetch_realtime_data() or fetch_realtime_bars().
+
+        Parameters:
+            subscription (MarketDataSubscription): The token fetch_realtime_data() or
+                                                   fetch_realtime_bars() returned.
+        """
+        bar_handler = self._bar_handlers.pop(subscription, None)
+        if bar_handler is not None:
+            self.subscriptions.unsubscribe(subscription)
+            self.bars.remove_listener(subscription.symbol, *bar_handler)
+            return
+        cb = self._handlers.pop(subscription, None)
+        if cb is None:
+            return
+        self.subscriptions.unsubscribe(subscription)
+        callbacks = self.callbacks[subscription.symbol]
+        callbacks.remove(cb)
+        if not callbacks:
+            del self.callbacks[subscription.symbol]
 
     def _on_pending_tickers(self, tickers: List[Ticker]):
         """
-        An internal method that is triggered by the pendingTickersEvent. It processes incoming tickers and
-        dispatches them to the appropriate callbacks.
+        An internal method that is triggered by the pendingTickersEvent. It appends incoming tickers to
+        the tick store and dispatches the updated buffers to the appropriate callbacks, and feeds
+        the trades of symbols with bar handlers to the bar aggregator.
 
         Parameters:
             tickers (List[Ticker]): A list of Ticker objects containing the updated market data.
         """
+        traced = tracer.enabled
+        received = perf_counter_ns() if traced else 0
+        bars = self.bars
         for ticker in tickers:
             symbol = ticker.contract.symbol
-            if symbol in self.callbacks:
-                # Convert ticker to a pandas DataFrame
-                df = util.df([ticker])
-                # Call all callbacks associated with this symbol with the DataFrame
-                for cb in self.callbacks[symbol]:
-                    cb(df)
+            callbacks = self.callbacks.get(symbol)
+            if callbacks:
+                # Record the tick in the preallocated buffer instead of building a DataFrame
+                buffer = self.tick_store.append(ticker)
+                if traced:
+                    buffer.received_ns = received
+                # Call all callbacks associated with this symbol with the buffer
+                for cb in callbacks:
+                    cb(buffer)
+            if symbol in bars:
+                bars.on_ticker(ticker)
 
     # TODO: We should be using the tickList to pull down specific historical data
     def fetch_historical_data(self, symbol: str, start_date: datetime, end_date: datetime, frequency: str, tickList: List[str]) -> DataFrame:
@@ -77,6 +203,10 @@ class DataRetrieval:
         Returns:
             DataFrame: A pandas DataFrame containing the historical market data.
         """
+        if self.cache is not None:
+            df = self.cache.fetch(symbol, start_date, end_date, frequency)
+            return df[tickList] if tickList else df
+
         # Define a contract for the symbol
         contract = Stock(symbol, 'SMART', 'USD')
         # Request historical data for the contract
@@ -1,12 +1,24 @@
+import os
+import shutil
+import numpy as np
 import pandas as pd
+from datetime import date, datetime, timezone
 from pandas import DataFrame
+from typing import Dict, List, Optional
 
 class DataStorage:
     """
-    A class for handling the storage and retrieval of data in CSV format.
+    A class for handling the storage and retrieval of data.
+
+    Two formats are supported:
+        - CSV files, for importing and exporting data.
+        - A partitioned binary store for time series, laid out as
+          data_path/<symbol>/<YYYY-MM-DD>/<column>.npy. Each column is a plain NumPy array file,
+          so reads can be memory-mapped, only the requested columns are opened, and only the
+          partitions overlapping the requested time range are touched.
     
     Attributes:
-        data_path (str): The file path where CSV files will be saved and loaded from.
+        data_path (str): The file path where CSV files and partitions will be saved and loaded from.
     """
     
     def __init__(self, data_path: str):
@@ -14,7 +26,7 @@ class DataStorage:
         The constructor for the DataStorage class.
         
         Parameters:
-            data_path (str): The base directory to save and load CSV files.
+            data_path (str): The base directory to save and load data.
         """
         self.data_path = data_path
     
@@ -52,3 +64,210 @@ class DataStorage:
         full_path = f"{self.data_path}/{filename}"
         # Load the DataFrame from a CSV file
         return pd.read_csv(full_path)
+
+    def save_partitioned(self, data: DataFrame, symbol: str, time_column: str = 'date') -> None:
+        """
+        Saves a time series to the partitioned store, one partition per UTC calendar day.
+
+        Rows are merged into any existing partitions. Rows with a timestamp that is already stored
+        replace the stored row, and every partition is kept sorted by time.
+
+        Parameters:
+            data (DataFrame): The data to save. All columns must be numeric, boolean or datetime.
+            symbol (str): The symbol the data belongs to.
+            time_column (str): The column holding each row's timestamp. Naive timestamps are
+                               treated as UTC.
+
+        Raises:
+            ValueError: If a column has a dtype that can't be stored as a plain NumPy array.
+        """
+        if data.empty:
+            return
+        data = data.copy()
+        data[time_column] = _to_utc_naive(data[time_column])
+        for column in data.columns:
+            if data[column].dtype.kind not in 'biufM':
+                raise ValueError(f"Column '{column}' has unsupported dtype {data[column].dtype}")
+
+        days = data[time_column].dt.date
+        for day, partition in data.groupby(days, sort=False):
+            existing = self._read_partition(symbol, day, None, time_column)
+            if existing is not None:
+                partition = pd.concat([DataFrame(existing), partition], ignore_index=True)
+            partition = partition.drop_duplicates(subset=time_column, keep='last')
+            partition = partition.sort_values(time_column, kind='stable')
+            self._write_partition(symbol, day, partition)
+
+    def load_partitioned(
+        self,
+        symbol: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Optional[List[str]] = None,
+        time_column: str = 'date',
+    ) -> DataFrame:
+        """
+        Loads a time range of a symbol from the partitioned store into a DataFrame.
+
+        Parameters:
+            symbol (str): The symbol to load.
+            start (datetime, optional): The inclusive start of the range. Naive values are treated as UTC.
+            end (datetime, optional): The exclusive end of the range. Naive values are treated as UTC.
+            columns (List[str], optional): The columns to load. Defaults to every stored column.
+                                           The time column is always included.
+            time_column (str): The column holding each row's timestamp.
+
+        Returns:
+            DataFrame: The requested rows, sorted by time, with the time column as naive UTC
+                       datetimes. When the range falls within a single partition, the columns are
+                       read-only views over memory-mapped files.
+        """
+        arrays = self.load_arrays(symbol, start, end, columns, time_column)
+        return DataFrame(arrays, copy=False)
+
+    def load_arrays(
+        self,
+        symbol: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Optional[List[str]] = None,
+        time_column: str = 'date',
+    ) -> Dict[str, np.ndarray]:
+        """
+        Loads a time range of a symbol from the partitioned store as NumPy arrays.
+
+        Parameters:
+            symbol (str): The symbol to load.
+            start (datetime, optional): The inclusive start of the range. Naive values are treated as UTC.
+            end (datetime, optional): The exclusive end of the range. Naive values are treated as UTC.
+            columns (List[str], optional): The columns to load. Defaults to every stored column.
+                                           The time column is always included.
+            time_column (str): The column holding each row's timestamp.
+
+        Returns:
+            Dict[str, np.ndarray]: A mapping of column names to arrays. When the range falls within
+                                   a single partition these are zero-copy memory-mapped views.
+        """
+        start_ts = _to_datetime64(start)
+        end_ts = _to_datetime64(end)
+        if columns is not None and time_column not in columns:
+            columns = [time_column] + list(columns)
+
+        pieces = []
+        for day in self.list_partitions(symbol):
+            if start_ts is not None and np.datetime64(day, 'D') < start_ts.astype('datetime64[D]'):
+                continue
+            if end_ts is not None and np.datetime64(day, 'D') > end_ts.astype('datetime64[D]'):
+                continue
+            partition = self._read_partition(symbol, day, columns, time_column)
+            times = partition[time_column]
+            # Predicate pushdown within the partition using the sorted time column
+            lo = 0 if start_ts is None else int(np.searchsorted(times, start_ts, side='left'))
+            hi = len(times) if end_ts is None else int(np.searchsorted(times, end_ts, side='left'))
+            if hi > lo:
+                pieces.append({name: values[lo:hi] for name, values in partition.items()})
+
+        if not pieces:
+            return {name: np.array([], dtype='datetime64[ns]' if name == time_column else np.float64)
+                    for name in (columns or [time_column])}
+        if len(pieces) == 1:
+            return pieces[0]
+        return {name: np.concatenate([piece[name] for piece in pieces]) for name in pieces[0]}
+
+    def list_partitions(self, symbol: str) -> List[date]:
+        """
+        Returns the days for which a symbol has data in the partitioned store, in ascending order.
+
+        Parameters:
+            symbol (str): The symbol to look up.
+        """
+        symbol_path = os.path.join(self.data_path, symbol)
+        if not os.path.isdir(symbol_path):
+            return []
+        return sorted(date.fromisoformat(name) for name in os.listdir(symbol_path) if not name.startswith('.'))
+
+    def partitioned_size(self, symbol: str) -> int:
+        """
+        Returns the number of bytes a symbol occupies in the partitioned store.
+
+        Parameters:
+            symbol (str): The symbol to measure.
+        """
+        total = 0
+        for root, _, files in os.walk(os.path.join(self.data_path, symbol)):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return total
+
+    def delete_partitioned(self, symbol: str) -> None:
+        """
+        Deletes every partition of a symbol from the partitioned store.
+
+        Parameters:
+            symbol (str): The symbol to delete.
+        """
+        shutil.rmtree(os.path.join(self.data_path, symbol), ignore_errors=True)
+
+    def _partition_path(self, symbol: str, day: date) -> str:
+        return os.path.join(self.data_path, symbol, day.isoformat())
+
+    def _read_partition(
+        self,
+        symbol: str,
+        day: date,
+        columns: Optional[List[str]],
+        time_column: str,
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Memory-maps the requested columns of one partition, or returns None if it doesn't exist.
+        """
+        path = self._partition_path(symbol, day)
+        if not os.path.isdir(path):
+            return None
+        if columns is None:
+            names = sorted(name[:-4] for name in os.listdir(path) if name.endswith('.npy'))
+            # Keep the time column first, like the frames that were saved
+            columns = [time_column] + [name for name in names if name != time_column]
+        return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in columns}
+
+    def _write_partition(self, symbol: str, day: date, partition: DataFrame) -> None:
+        """
+        Writes every column of a partition, replacing the previous files atomically per column.
+        """
+        path = self._partition_path(symbol, day)
+        os.makedirs(path, exist_ok=True)
+        for column in partition.columns:
+            values = partition[column].to_numpy()
+            if values.dtype.kind == 'M':
+                values = values.astype('datetime64[ns]')
+            tmp_path = os.path.join(path, f".{column}.npy.tmp")
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.ascontiguousarray(values))
+            os.replace(tmp_path, os.path.join(path, f"{column}.npy"))
+
+def to_utc(value: datetime) -> datetime:
+    """
+    Treats naive datetimes as UTC and converts aware ones to UTC.
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def _to_utc_naive(values: pd.Series) -> pd.Series:
+    """
+    Converts a series of timestamps to naive UTC datetime64[ns] values.
+    """
+    values = pd.to_datetime(values)
+    if values.dt.tz is not None:
+        values = values.dt.tz_convert('UTC').dt.tz_localize(None)
+    return values.astype('datetime64[ns]')
+
+def _to_datetime64(value: Optional[datetime]) -> Optional[np.datetime64]:
+    """
+    Converts a datetime or date bound to a naive UTC datetime64[ns], or passes None through.
+    """
+    if value is None:
+        return None
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return timestamp.to_datetime64().astype('datetime64[ns]')
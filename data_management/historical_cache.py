@@ -0,0 +1,312 @@
+import json
+import os
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from ib_insync import IB, Stock, util
+from pandas import DataFrame
+
+from data_management.data_storage import DataStorage, to_utc
+from data_management.ib_history import MAX_CHUNK_DURATIONS, request_bars
+
+# Half-open [start, end) range of calendar days
+DayRange = Tuple[date, date]
+
+INDEX_FILENAME = '_cache_index.json'
+
+class CacheStats:
+    """
+    Counters describing how a HistoricalDataCache has been used.
+
+    Attributes:
+        hits (int): Requests served entirely from the cache.
+        partial_hits (int): Requests that needed some, but not all, of their days fetched.
+        misses (int): Requests that needed every day fetched.
+        requests (int): Historical data requests sent to IB.
+        failed_requests (int): Requests that timed out or reported an error. Their days stay uncached.
+        bars_fetched (int): Bars received from IB.
+        evictions (int): Cache entries removed by evict().
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.requests = 0
+        self.failed_requests = 0
+        self.bars_fetched = 0
+        self.evictions = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+class HistoricalDataCache:
+    """
+    A persistent read-through cache in front of IB historical data requests.
+
+    Each (symbol, bar size, whatToShow, useRTH) combination is one cache entry, stored in the
+    partitioned store of a DataStorage. An index file records which whole days each entry covers,
+    so a request only fetches the days it is missing and merges them with what is already stored.
+    Missing days are requested in chunks no longer than IB allows for the bar size. A day is only
+    marked as covered once every request for it has returned without an error or a timeout, and
+    days that haven't finished yet (today, in UTC) are never marked as covered.
+
+    Attributes:
+        ib (IB): The IB connection used for cache misses. Anything with a compatible
+                 reqHistoricalData method can be used, e.g. a fake for offline tests.
+        request_timeout (float): The timeout in seconds of each request.
+        storage (DataStorage): Where cached bars are kept.
+        max_bytes (int, optional): Evict least recently used entries beyond this total size.
+        max_age (timedelta, optional): Evict entries that haven't been fetched into for this long.
+        stats (CacheStats): Usage counters.
+    """
+
+    def __init__(
+        self,
+        ib: IB,
+        storage: DataStorage,
+        max_bytes: Optional[int] = None,
+        max_age: Optional[timedelta] = None,
+        request_timeout: float = 60.0,
+    ):
+        self.ib = ib
+        self.request_timeout = request_timeout
+        self.storage = storage
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.stats = CacheStats()
+        self._index_path = os.path.join(storage.data_path, INDEX_FILENAME)
+        self._index = self._load_index()
+
+    def fetch(
+        self,
+        symbol: str,
+        start_date: datetime,
+        end_date: datetime,
+        bar_size: str,
+        what_to_show: str = 'TRADES',
+        use_rth: bool = True,
+    ) -> DataFrame:
+        """
+        Returns the bars for a symbol and time range, fetching only the days not already cached.
+
+        Parameters:
+            symbol (str): The symbol to fetch.
+            start_date (datetime): The inclusive start of the range. Naive values are treated as UTC.
+            end_date (datetime): The exclusive end of the range. Naive values are treated as UTC.
+            bar_size (str): The IB bar size setting, e.g. '1 min'.
+            what_to_show (str): The IB whatToShow setting.
+            use_rth (bool): Whether to only include regular trading hours.
+
+        Returns:
+            DataFrame: The cached bars in the range, with a naive UTC 'date' column.
+
+        Raises:
+            ValueError: If the bar size isn't one IB supports.
+        """
+        if bar_size not in MAX_CHUNK_DURATIONS:
+            raise ValueError(f"Unsupported bar size: {bar_size}")
+        key = self._key(symbol, bar_size, what_to_show, use_rth)
+        entry = self._index.setdefault(key, {'covered': [], 'last_access': 0.0, 'last_fetch': 0.0})
+
+        requested = (to_utc(start_date).date(), to_utc(end_date - timedelta(microseconds=1)).date() + timedelta(days=1))
+        covered = [(date.fromisoformat(s), date.fromisoformat(e)) for s, e in entry['covered']]
+        missing = _subtract(requested, covered)
+
+        if not missing:
+            self.stats.hits += 1
+        elif missing == [requested]:
+            self.stats.misses += 1
+        else:
+            self.stats.partial_hits += 1
+
+        today = datetime.now(timezone.utc).date()
+        for first, last in missing:
+            for days in self._fetch_days(key, symbol, first, last, bar_size, what_to_show, use_rth):
+                # Only whole days in the past are complete enough to be served from the cache later
+                final_end = min(days[1], today)
+                if final_end > days[0]:
+                    covered = _merge(covered + [(days[0], final_end)])
+            entry['last_fetch'] = time.time()
+
+        entry['covered'] = [[s.isoformat(), e.isoformat()] for s, e in covered]
+        entry['last_access'] = time.time()
+        self._save_index()
+
+        if self.max_bytes is not None or self.max_age is not None:
+            self.evict(keep=key)
+        return self.storage.load_partitioned(key, start_date, end_date)
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        Removes entries older than max_age, then least recently used entries until the cache fits in max_bytes.
+
+        Parameters:
+            keep (str, optional): An entry key that must not be evicted, e.g. the one being read.
+
+        Returns:
+            int: The number of entries evicted.
+        """
+        evicted = 0
+        now = time.time()
+        if self.max_age is not None:
+            cutoff = now - self.max_age.total_seconds()
+            for key in [k for k, e in self._index.items() if k != keep and e['last_fetch'] < cutoff]:
+                self._remove(key)
+                evicted += 1
+
+        if self.max_bytes is not None:
+            sizes = {key: self.storage.partitioned_size(key) for key in self._index}
+            total = sum(sizes.values())
+            for key in sorted(self._index, key=lambda k: self._index[k]['last_access']):
+                if total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                total -= sizes[key]
+                self._remove(key)
+                evicted += 1
+
+        if evicted:
+            self.stats.evictions += evicted
+            self._save_index()
+        return evicted
+
+    def size(self) -> int:
+        """
+        Returns the total number of bytes held by the cache.
+        """
+        return sum(self.storage.partitioned_size(key) for key in self._index)
+
+    def clear(self) -> None:
+        """
+        Removes every cached entry.
+        """
+        for key in list(self._index):
+            self._remove(key)
+        self._save_index()
+
+    def _fetch_days(
+        self,
+        key: str,
+        symbol: str,
+        first: date,
+        last: date,
+        bar_size: str,
+        what_to_show: str,
+        use_rth: bool,
+    ) -> List[DayRange]:
+        """
+        Requests and stores the bars for the days in [first, last), in chunks no longer than IB
+        allows for the bar size.
+
+        Returns:
+            List[DayRange]: The days whose every request succeeded.
+        """
+        step = MAX_CHUNK_DURATIONS[bar_size]
+        one_day = timedelta(days=1)
+        fetched: List[DayRange] = []
+        if step >= one_day:
+            for chunk_start in _day_range(first, last, step.days):
+                chunk_end = min(chunk_start + timedelta(days=step.days), last)
+                if self._request(key, symbol, _midnight(chunk_start), _midnight(chunk_end), bar_size, what_to_show, use_rth):
+                    fetched.append((chunk_start, chunk_end))
+        else:
+            for day in _day_range(first, last, 1):
+                end = _midnight(day + one_day)
+                start = _midnight(day)
+                complete = True
+                while end > start:
+                    # Keep going after a failure, so the day's other bars are still stored
+                    complete &= self._request(key, symbol, max(start, end - step), end, bar_size, what_to_show, use_rth)
+                    end -= step
+                if complete:
+                    fetched.append((day, day + one_day))
+        return fetched
+
+    def _request(
+        self,
+        key: str,
+        symbol: str,
+        start: datetime,
+        end: datetime,
+        bar_size: str,
+        what_to_show: str,
+        use_rth: bool,
+    ) -> bool:
+        """
+        Requests the bars in [start, end) from IB and stores them.
+
+        Returns:
+            bool: Whether the request succeeded, i.e. returned without an error or a timeout.
+        """
+        result = request_bars(self.ib, Stock(symbol, 'SMART', 'USD'), start, end, bar_size, what_to_show, use_rth, self.request_timeout)
+        self.stats.requests += 1
+        if result.failed:
+            self.stats.failed_requests += 1
+            return False
+        bars = result.bars
+        self.stats.bars_fetched += len(bars)
+        df = util.df(bars)
+        if df is not None and len(df):
+            self.storage.save_partitioned(df, key)
+        return True
+
+    def _remove(self, key: str) -> None:
+        self.storage.delete_partitioned(key)
+        self._index.pop(key, None)
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if not os.path.exists(self._index_path):
+            return {}
+        with open(self._index_path) as f:
+            return json.load(f)
+
+    def _save_index(self) -> None:
+        os.makedirs(self.storage.data_path, exist_ok=True)
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+
+    @staticmethod
+    def _key(symbol: str, bar_size: str, what_to_show: str, use_rth: bool) -> str:
+        return f"{symbol}_{bar_size.replace(' ', '')}_{what_to_show}_{'RTH' if use_rth else 'ALL'}"
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, dt_time(), tzinfo=timezone.utc)
+
+def _day_range(first: date, last: date, step: int) -> List[date]:
+    """
+    Returns every `step`-th day from first, up to but excluding last.
+    """
+    return [first + timedelta(days=offset) for offset in range(0, (last - first).days, step)]
+
+def _merge(ranges: List[DayRange]) -> List[DayRange]:
+    """
+    Merges overlapping or adjacent day ranges.
+    """
+    merged: List[DayRange] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def _subtract(requested: DayRange, covered: List[DayRange]) -> List[DayRange]:
+    """
+    Returns the parts of a day range that aren't in any of the covered ranges.
+    """
+    missing = []
+    cursor, end = requested
+    for covered_start, covered_end in covered:
+        if covered_end <= cursor or covered_start >= end:
+            continue
+        if covered_start > cursor:
+            missing.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
@@ -0,0 +1,183 @@
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
+
+from ib_insync import IB, Contract
+
+# The longest duration IB accepts in one request for each bar size
+MAX_CHUNK_DURATIONS = {
+    '1 secs': timedelta(seconds=1800),
+    '5 secs': timedelta(seconds=3600),
+    '10 secs': timedelta(seconds=14400),
+    '15 secs': timedelta(seconds=14400),
+    '30 secs': timedelta(seconds=28800),
+    '1 min': timedelta(days=1),
+    '2 mins': timedelta(days=2),
+    '3 mins': timedelta(weeks=1),
+    '5 mins': timedelta(weeks=1),
+    '10 mins': timedelta(weeks=1),
+    '15 mins': timedelta(weeks=1),
+    '20 mins': timedelta(weeks=1),
+    '30 mins': timedelta(days=30),
+    '1 hour': timedelta(days=30),
+    '2 hours': timedelta(days=30),
+    '3 hours': timedelta(days=30),
+    '4 hours': timedelta(days=30),
+    '8 hours': timedelta(days=30),
+    '1 day': timedelta(days=365),
+    '1 week': timedelta(days=365),
+    '1 month': timedelta(days=365),
+}
+
+# Part of the error IB reports when a range simply has no bars, e.g. a weekend
+NO_DATA = 'returned no data'
+
+class HistoricalDataResult:
+    """
+    The outcome of one historical data request.
+
+    ib_insync returns an empty list, rather than raising, when a request times out or fails, so the
+    errors IB reported for the request are collected from errorEvent alongside the bars.
+
+    Attributes:
+        bars (list): The bars received, empty if the request failed.
+        errors (List[str]): Every error reported for the request, including 'no data' ones.
+    """
+
+    def __init__(self, bars: list, errors: List[str]):
+        self.bars = bars
+        self.errors = errors
+
+    @property
+    def failed(self) -> bool:
+        """
+        Whether the request failed. A range that simply has no bars is not a failure.
+        """
+        return bool(self.errors) and not any(NO_DATA in message.lower() for message in self.errors)
+
+    @property
+    def error(self) -> Optional[str]:
+        """
+        The last error of a failed request, or None if it succeeded.
+        """
+        return self.errors[-1] if self.failed else None
+
+    @property
+    def pacing_violation(self) -> bool:
+        """
+        Whether IB rejected the request for exceeding its pacing limits.
+        """
+        return any('pacing' in message.lower() for message in self.errors)
+
+def duration_str(duration: timedelta) -> str:
+    """
+    Formats a duration as an IB durationStr, in seconds below a day and whole days above.
+    """
+    seconds = int(duration.total_seconds())
+    if seconds < 86400:
+        return f'{max(seconds, 1)} S'
+    return f'{-(-seconds // 86400)} D'
+
+def request_bars(
+    ib: IB,
+    contract: Contract,
+    start: datetime,
+    end: datetime,
+    bar_size: str,
+    what_to_show: str = 'TRADES',
+    use_rth: bool = True,
+    timeout: float = 60.0,
+) -> HistoricalDataResult:
+    """
+    Requests the bars in [start, end) for a contract, collecting any errors IB reports for it.
+
+    Parameters:
+        ib (IB): The IB connection. Anything with a compatible reqHistoricalData method and,
+                 optionally, an errorEvent can be used.
+        contract (Contract): The contract to request. Errors are matched to it by identity.
+        start (datetime): The start of the range.
+        end (datetime): The end of the range.
+        bar_size (str): The IB bar size setting.
+        what_to_show (str): The IB whatToShow setting.
+        use_rth (bool): Whether to only include regular trading hours.
+        timeout (float): The timeout of the request in seconds. A request that returns no bars
+                         after this long counts as failed.
+
+    Returns:
+        HistoricalDataResult: The bars and errors of the request. Exceptions are reported as errors.
+    """
+    errors: List[str] = []
+    sent_at = time.monotonic()
+    with _collect_errors(ib, contract, errors):
+        try:
+            bars = ib.reqHistoricalData(
+                contract,
+                endDateTime=end,
+                durationStr=duration_str(end - start),
+                barSizeSetting=bar_size,
+                whatToShow=what_to_show,
+                useRTH=use_rth,
+                formatDate=2,
+                timeout=timeout
+            )
+        except Exception as e:
+            errors.append(str(e) or type(e).__name__)
+            bars = []
+    return _result(bars, errors, sent_at, timeout)
+
+async def request_bars_async(
+    ib: IB,
+    contract: Contract,
+    start: datetime,
+    end: datetime,
+    bar_size: str,
+    what_to_show: str = 'TRADES',
+    use_rth: bool = True,
+    timeout: float = 60.0,
+) -> HistoricalDataResult:
+    """
+    Async version of request_bars(), through reqHistoricalDataAsync.
+    """
+    errors: List[str] = []
+    sent_at = time.monotonic()
+    with _collect_errors(ib, contract, errors):
+        try:
+            bars = await ib.reqHistoricalDataAsync(
+                contract,
+                endDateTime=end,
+                durationStr=duration_str(end - start),
+                barSizeSetting=bar_size,
+                whatToShow=what_to_show,
+                useRTH=use_rth,
+                formatDate=2,
+                timeout=timeout
+            )
+        except Exception as e:
+            errors.append(str(e) or type(e).__name__)
+            bars = []
+    return _result(bars, errors, sent_at, timeout)
+
+@contextmanager
+def _collect_errors(ib: IB, contract: Contract, errors: List[str]) -> Iterator[None]:
+    """
+    Appends the errors IB reports for a contract to a list while the block runs.
+    """
+    def on_error(req_id: int, error_code: int, error_string: str, error_contract) -> None:
+        if error_contract is contract:
+            errors.append(f"Error {error_code}: {error_string}")
+
+    error_event = getattr(ib, 'errorEvent', None)
+    if error_event is None:
+        yield
+        return
+    error_event += on_error
+    try:
+        yield
+    finally:
+        error_event -= on_error
+
+def _result(bars: list, errors: List[str], sent_at: float, timeout: float) -> HistoricalDataResult:
+    if not bars and not errors and timeout and time.monotonic() - sent_at >= timeout:
+        errors.append('Request timed out')
+    return HistoricalDataResult(bars if bars is not None else [], errors)
@@ -0,0 +1,395 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from time import perf_counter_ns
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from eventkit import Event
+from ib_insync import Contract, Stock, Ticker, TickData, util
+
+from application.connection_manager import ConnectionManager
+from application.latency_tracing import LatencyHistogram, tracer
+from data_management.tick_store import EPOCH, ONE_MICROSECOND
+from globals import connection_manager
+
+# Every log starts with this, followed by fixed-size records
+MAGIC = b'FBTICKS1'
+
+# One record per TickData of a ticker update. BATCH_START marks the first record of each
+# pendingTickersEvent, so the replay emits the same groups of tickers as the live stream.
+RECORD = np.dtype([
+    ('time', '<i8'),  # Nanoseconds since the epoch (UTC)
+    ('symbol', '<u4'),  # Index into the symbols sidecar
+    ('tick_type', '<u2'),
+    ('flags', '<u2'),
+    ('price', '<f8'),
+    ('size', '<f8'),
+])
+BATCH_START = 1
+
+NANOSECONDS = 1_000_000_000
+
+def symbols_path(path: str) -> str:
+    """
+    Returns the path of the sidecar file listing the symbols of a log.
+    """
+    return f"{path}.symbols"
+
+def read_log(path: str) -> Tuple[np.ndarray, List[str]]:
+    """
+    Memory-maps a log written by MarketDataRecorder.
+
+    Parameters:
+        path (str): The path of the log.
+
+    Returns:
+        Tuple[np.ndarray, List[str]]: The records, as a read-only structured array, and the symbols
+                                      their 'symbol' field indexes.
+
+    Raises:
+        ValueError: If the file isn't a market data log.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a market data log")
+    with open(symbols_path(path)) as f:
+        symbols = json.load(f)
+    count = (os.path.getsize(path) - len(MAGIC)) // RECORD.itemsize
+    if not count:
+        return np.zeros(0, dtype=RECORD), symbols
+    return np.memmap(path, dtype=RECORD, mode='r', offset=len(MAGIC), shape=(count,)), symbols
+
+class MarketDataRecorder:
+    """
+    Records the pendingTickersEvent stream to a compact binary log.
+
+    Each TickData in a ticker update becomes one 32-byte record, buffered in a preallocated array
+    and written in chunks. Symbols are stored once, in a JSON sidecar next to the log, which is
+    rewritten before any record that refers to a new symbol reaches the disk.
+
+    Attributes:
+        path (str): The path of the log. An existing log is appended to.
+        connection (ConnectionManager): The connection whose market data is recorded.
+        records (int): The number of records written or buffered.
+    """
+
+    def __init__(self, path: str, connection: Optional[ConnectionManager] = None, chunk_size: int = 65536):
+        """
+        The constructor for the MarketDataRecorder class. It doesn't start recording.
+
+        Parameters:
+            path (str): The path of the log.
+            connection (ConnectionManager, optional): The connection to record. Defaults to the
+                                                      shared connection from globals.
+            chunk_size (int): The number of records buffered between writes.
+        """
+        self.path = path
+        self.connection = connection if connection is not None else connection_manager
+        self.records = 0
+        self._buffer = np.zeros(chunk_size, dtype=RECORD)
+        self._buffered = 0
+        self._file = None
+        self._symbols: List[str] = []
+        self._symbol_ids: Dict[str, int] = {}
+        self._symbols_written = 0
+
+    def start(self) -> None:
+        """
+        Opens the log and starts recording every pendingTickersEvent.
+        """
+        if self._file is not None:
+            return
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            records, self._symbols = read_log(self.path)
+            self.records = len(records)
+            del records
+            self._symbol_ids = {symbol: i for i, symbol in enumerate(self._symbols)}
+            self._symbols_written = len(self._symbols)
+            self._file = open(self.path, 'ab')
+        else:
+            self._file = open(self.path, 'wb')
+            self._file.write(MAGIC)
+            self._write_symbols()
+        self.connection.ib.pendingTickersEvent += self.on_pending_tickers
+
+    def stop(self) -> None:
+        """
+        Stops recording and closes the log.
+        """
+        if self._file is None:
+            return
+        self.connection.ib.pendingTickersEvent -= self.on_pending_tickers
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    def on_pending_tickers(self, tickers: List[Ticker]) -> None:
+        """
+        Buffers the ticks of one pendingTickersEvent.
+        """
+        flags = BATCH_START
+        buffer = self._buffer
+        for ticker in tickers:
+            symbol = ticker.contract.symbol
+            symbol_id = self._symbol_ids.get(symbol)
+            if symbol_id is None:
+                symbol_id = self._symbol_ids[symbol] = len(self._symbols)
+                self._symbols.append(symbol)
+            for tick in ticker.ticks:
+                if self._buffered == len(buffer):
+                    self.flush()
+                buffer[self._buffered] = (
+                    (tick.time - EPOCH) // ONE_MICROSECOND * 1000,
+                    symbol_id,
+                    tick.tickType,
+                    flags,
+                    tick.price,
+                    tick.size,
+                )
+                flags = 0
+                self._buffered += 1
+                self.records += 1
+
+    def flush(self) -> None:
+        """
+        Writes the buffered records, and the symbols they refer to, to disk.
+        """
+        if self._file is None:
+            return
+        if len(self._symbols) > self._symbols_written:
+            self._write_symbols()
+        if self._buffered:
+            self._file.write(self._buffer[:self._buffered].tobytes())
+            self._buffered = 0
+        self._file.flush()
+
+    def _write_symbols(self) -> None:
+        tmp_path = symbols_path(self.path) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._symbols, f)
+        os.replace(tmp_path, symbols_path(self.path))
+        self._symbols_written = len(self._symbols)
+
+class ReplayIB:
+    """
+    The market data side of an ib_insync.IB, fed by a MarketReplay instead of a gateway.
+
+    Inject it into a ConnectionManager, and pass that connection to the DataRetrieval instances
+    under test. Their subscriptions then go through reqMktData() and cancelMktData() here, and the
+    replay emits pendingTickersEvent for the subscribed symbols only, like a gateway would.
+
+    Attributes:
+        pendingTickersEvent (Event): Emits the tickers updated by each replayed batch.
+        tickers (Dict[str, Ticker]): The subscribed symbols' tickers.
+    """
+
+    def __init__(self):
+        self.pendingTickersEvent = Event('pendingTickersEvent')
+        self.tickers: Dict[str, Ticker] = {}
+
+    def isConnected(self) -> bool:
+        return True
+
+    def reqMktData(self, contract: Contract, genericTickList: str = '', snapshot: bool = False,
+                   regulatorySnapshot: bool = False, mktDataOptions=None) -> Ticker:
+        ticker = self.tickers.get(contract.symbol)
+        if ticker is None:
+            ticker = self.tickers[contract.symbol] = Ticker(contract=contract)
+        return ticker
+
+    def cancelMktData(self, contract: Contract) -> None:
+        self.tickers.pop(contract.symbol, None)
+
+class MarketReplay:
+    """
+    Replays a recorded log through the live market data path.
+
+    The replay emits the recorded pendingTickersEvent batches from a ReplayIB, so everything
+    downstream runs unmodified: DataRetrieval._on_pending_tickers, the tick store and bar
+    aggregator, ExecutionScheduler and the StrategyExecutors, and whatever broker their order
+    managers use. Give the order managers a simulated broker to run without a gateway.
+
+    Batches are emitted in recorded order, with their recorded tick times, so the market data
+    seen downstream is the same on every run. The pace is set by `speed`: 1.0 replays at wall
+    clock speed, N at N times that, and None as fast as possible, yielding to the event loop
+    every `yield_every` batches so the strategy workers get to run.
+
+    Use clock() as the clock of anything that would otherwise read the wall clock, e.g.
+    BarAggregator(clock=replay.clock), so it follows the recorded time.
+
+    Attributes:
+        path (str): The path of the log.
+        speed (float, optional): The replay speed, relative to the recorded time.
+        yield_every (int): The number of batches between yields when replaying as fast as possible.
+        ib (ReplayIB): The stand-in IB emitting the replayed data.
+        connection (ConnectionManager): A connection wrapping ib, for the DataRetrieval instances.
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = None, yield_every: int = 64):
+        """
+        The constructor for the MarketReplay class.
+
+        Parameters:
+            path (str): The path of a log written by MarketDataRecorder.
+            speed (float, optional): The replay speed. Defaults to as fast as possible.
+            yield_every (int): The number of batches between yields when replaying as fast as possible.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive")
+        self.path = path
+        self.speed = speed
+        self.yield_every = yield_every
+        self.ib = ReplayIB()
+        self.connection = ConnectionManager(ib=self.ib)
+        self._records, self._symbols = read_log(path)
+        self._contracts = [Stock(symbol, 'SMART', 'USD') for symbol in self._symbols]
+        self._now = int(self._records['time'][0]) if len(self._records) else 0
+
+    def clock(self) -> int:
+        """
+        Returns the recorded time of the latest replayed batch, in nanoseconds since the epoch.
+        """
+        return self._now
+
+    def run(self, trace: bool = True) -> Dict:
+        """
+        Blocking wrapper around run_async().
+        """
+        return util.run(self.run_async(trace))
+
+    async def run_async(self, trace: bool = True, chunk_size: int = 65536) -> Dict:
+        """
+        Replays the whole log and reports how the pipeline kept up.
+
+        Parameters:
+            trace (bool): Whether to reset and enable the shared latency tracer for the run, so
+                          the report includes every pipeline stage, e.g. 'tick_to_order'.
+            chunk_size (int): The number of records converted from the log at a time.
+
+        Returns:
+            Dict: {
+                'ticks': records replayed, 'skipped': records of symbols nobody subscribed to,
+                'batches': events emitted, 'elapsed_s': wall clock time taken,
+                'replayed_s': recorded time covered, 'speedup': replayed_s / elapsed_s,
+                'ticks_per_s': ticks / elapsed_s,
+                'dispatch': summary of the time each event's handlers took,
+                'lag': summary of how late batches were emitted, when paced,
+                'stages': summaries of the tracer's stages, when tracing
+            }
+        """
+        records = self._records
+        tickers = self.ib.tickers
+        contracts = self._contracts
+        emit = self.ib.pendingTickersEvent.emit
+        dispatch = LatencyHistogram()
+        lag = LatencyHistogram()
+        speed = self.speed
+        was_enabled = tracer.enabled
+        if trace:
+            tracer.reset()
+            tracer.enabled = True
+
+        first = int(records['time'][0]) if len(records) else 0
+        ticks = skipped = batches = 0
+        last_ns = -1
+        time = None
+        pending: Dict[int, Ticker] = {}
+        started = perf_counter_ns()
+        try:
+            for offset in range(0, len(records), chunk_size):
+                chunk = records[offset:offset + chunk_size]
+                rows = zip(
+                    chunk['time'].tolist(),
+                    chunk['symbol'].tolist(),
+                    chunk['tick_type'].tolist(),
+                    chunk['flags'].tolist(),
+                    chunk['price'].tolist(),
+                    chunk['size'].tolist(),
+                )
+                for time_ns, symbol_id, tick_type, flags, price, size in rows:
+                    if flags & BATCH_START:
+                        if pending:
+                            start = perf_counter_ns()
+                            emit(list(pending.values()))
+                            dispatch.record(perf_counter_ns() - start)
+                            pending = {}
+                            batches += 1
+                            if speed is None and batches % self.yield_every == 0:
+                                await asyncio.sleep(0)
+                        self._now = time_ns
+                        if speed is not None:
+                            due = started + int((time_ns - first) / speed)
+                            delay = due - perf_counter_ns()
+                            if delay > 0:
+                                await asyncio.sleep(delay / NANOSECONDS)
+                            else:
+                                lag.record(-delay)
+
+                    ticker = pending.get(symbol_id)
+                    if ticker is None:
+                        ticker = tickers.get(contracts[symbol_id].symbol)
+                        if ticker is None:
+                            skipped += 1
+                            continue
+                        ticker.ticks = []
+                        pending[symbol_id] = ticker
+                    if time_ns != last_ns:
+                        last_ns = time_ns
+                        time = EPOCH + ONE_MICROSECOND * (time_ns // 1000)
+                    _apply(ticker, time, tick_type, price, size)
+                    ticks += 1
+            if pending:
+                start = perf_counter_ns()
+                emit(list(pending.values()))
+                dispatch.record(perf_counter_ns() - start)
+                batches += 1
+            # Let the strategies finish the last updates before stopping the clock
+            await asyncio.sleep(0)
+        finally:
+            if trace:
+                tracer.enabled = was_enabled
+
+        elapsed = (perf_counter_ns() - started) / NANOSECONDS
+        replayed = (int(records['time'][-1]) - first) / NANOSECONDS if len(records) else 0.0
+        report = {
+            'ticks': ticks,
+            'skipped': skipped,
+            'batches': batches,
+            'elapsed_s': elapsed,
+            'replayed_s': replayed,
+            'speedup': replayed / elapsed if elapsed else 0.0,
+            'ticks_per_s': ticks / elapsed if elapsed else 0.0,
+            'dispatch': dispatch.summary(),
+        }
+        if speed is not None:
+            report['lag'] = lag.summary()
+        if trace:
+            report['stages'] = tracer.snapshot()['stages']
+        return report
+
+def _apply(ticker: Ticker, time: datetime, tick_type: int, price: float, size: float) -> None:
+    """
+    Applies one recorded tick to a ticker the way ib_insync's wrapper does.
+    """
+    if tick_type in (1, 66):
+        ticker.bid = price
+        ticker.bidSize = size
+    elif tick_type in (2, 67):
+        ticker.ask = price
+        ticker.askSize = size
+    elif tick_type in (4, 68, 48, 77):
+        ticker.last = price
+        ticker.lastSize = size
+    elif tick_type in (0, 69):
+        ticker.bidSize = size
+    elif tick_type in (3, 70):
+        ticker.askSize = size
+    elif tick_type in (5, 71):
+        ticker.lastSize = size
+    elif tick_type in (8, 74):
+        ticker.volume = size
+    ticker.time = time
+    ticker.ticks.append(TickData(time, tick_type, price, size))
@@ -0,0 +1,326 @@
+import math
+from abc import ABC, abstractmethod
+from typing import Dict, List, MutableMapping, Tuple
+
+from data_management.tick_list_enum import TickListEnum
+
+class StreamingIndicator(ABC):
+    """
+    Base class for stateful, constant-time counterparts of the TickListEnum batch transforms.
+
+    Each indicator is constructed with the same parameters as its batch function (minus the
+    DataFrame) and consumes one row at a time. Feeding every row of a DataFrame through update()
+    produces, row by row, the same values the batch function writes for the whole frame.
+    """
+
+    @abstractmethod
+    def update(self, row: MutableMapping[str, float]) -> MutableMapping[str, float]:
+        """
+        Applies the transform to a single new row, writing its output column into the row.
+
+        Parameters:
+            row (MutableMapping[str, float]): The newest tick or bar, e.g. a dict of column values.
+
+        Returns:
+            MutableMapping[str, float]: The same row, updated in place.
+        """
+        pass
+
+class StreamingAddConstant(StreamingIndicator):
+    """
+    Streaming counterpart of add_constant.
+    """
+
+    def __init__(self, column: str, value: float):
+        self.column = column
+        self.value = value
+
+    def update(self, row: MutableMapping[str, float]) -> MutableMapping[str, float]:
+        row[self.column] += self.value
+        return row
+
+class StreamingMultiplyByFactor(StreamingIndicator):
+    """
+    Streaming counterpart of multiply_by_factor.
+    """
+
+    def __init__(self, column: str, factor: float):
+        self.column = column
+        self.factor = factor
+
+    def update(self, row: MutableMapping[str, float]) -> MutableMapping[str, float]:
+        row[self.column] *= self.factor
+        return row
+
+class StreamingSMA(StreamingIndicator):
+    """
+    Streaming counterpart of calculate_sma, keeping a running sum over a fixed window.
+
+    The running sum is recomputed from the window each time the window wraps, which bounds
+    floating point drift while keeping updates O(1) amortized. As in pandas, the SMA is NaN while
+    the window holds a NaN, so the number of NaNs in the window is counted rather than summed.
+
+    Attributes:
+        value (float): The current SMA, or NaN until the window is full.
+    """
+
+    def __init__(self, column: str, window: int):
+        if window <= 0:
+            raise ValueError("window must be positive")
+        self.column = column
+        self.window = window
+        self.output_column = f"{column}_SMA{window}"
+        self.value = math.nan
+        self._values: List[float] = []
+        self._cursor = 0
+        self._sum = 0.0  # Sum of the window's non-NaN values
+        self._nans = 0
+
+    def push(self, x: float) -> float:
+        """
+        Adds one observation and returns the updated SMA.
+
+        Parameters:
+            x (float): The newest value.
+        """
+        values = self._values
+        if x != x:
+            self._nans += 1
+        else:
+            self._sum += x
+        if len(values) < self.window:
+            values.append(x)
+        else:
+            old = values[self._cursor]
+            if old != old:
+                self._nans -= 1
+            else:
+                self._sum -= old
+            values[self._cursor] = x
+            self._cursor += 1
+            if self._cursor == self.window:
+                self._cursor = 0
+                self._sum = math.fsum(v for v in values if v == v)
+        full = len(values) == self.window and not self._nans
+        self.value = self._sum / self.window if full else math.nan
+        return self.value
+
+    def update(self, row: MutableMapping[str, float]) -> MutableMapping[str, float]:
+        row[self.output_column] = self.push(row[self.column])
+        return row
+
+class StreamingEMA(StreamingIndicator):
+    """
+    Streaming counterpart of calculate_ema, seeded with the first observation.
+
+    NaNs are handled like pandas' ewm(adjust=False) with ignore_na=False: a NaN leaves the EMA
+    unchanged, but still ages it, so the next observation is weighted as if the gap had elapsed.
+
+    Attributes:
+        value (float): The current EMA, or NaN before the first observation.
+    """
+
+    def __init__(self, column: str, window: int):
+        if window <= 0:
+            raise ValueError("window must be positive")
+        self.column = column
+        self.window = window
+        self.output_column = f"{column}_EMA{window}"
+        self.alpha = 2.0 / (window + 1)
+        self.value = math.nan
+        self._old_weight = 1.0
+
+    def push(self, x: float) -> float:
+        """
+        Adds one observation and returns the updated EMA.
+
+        Parameters:
+            x (float): The newest value.
+        """
+        if self.value != self.value:
+            self.value = x  # Stays NaN until the first observation
+            return self.value
+        self._old_weight *= 1.0 - self.alpha
+        if x == x:
+            old_weight = self._old_weight
+            self.value = (old_weight * self.value + self.alpha * x) / (old_weight + self.alpha)
+            self._old_weight = 1.0
+        return self.value
+
+    def update(self, row: MutableMapping[str, float]) -> MutableMapping[str, float]:
+        row[self.output_column] = self.push(row[self.column])
+        return row
+
+class StreamingRollingStd(StreamingIndicator):
+    """
+    Streaming counterpart of calculate_rolling_std, using Welford's algorithm with removal.
+
+    As with StreamingSMA, the running moments are recomputed from the window each time it wraps,
+    and cover only the window's non-NaN values, with the standard deviation NaN while there are any.
+
+    Attributes:
+        value (float): The current sample standard deviation, or NaN until the window is full.
+    """
+
+    def __init__(self, column: str, window: int):
+        if window <= 1:
+            raise ValueError("window must be greater than 1")
+        self.column = column
+        self.window = window
+        self.output_column = f"{column}_STD{window}"
+        self.value = math.nan
+        self._values: List[float] = []
+        self._cursor = 0
+        self._count = 0  # Number of non-NaN values in the window
+        self._nans = 0
+        self._mean = 0.0
+        self._m2 = 0.0  # Sum of squared deviations from the mean
+
+    def push(self, x: float) -> float:
+        """
+        Adds one observation and returns the updated standard deviation.
+
+        Parameters:
+            x (float): The newest value.
+        """
+        values = self._values
+        if len(values) < self.window:
+            values.append(x)
+            self._add(x)
+        else:
+            old = values[self._cursor]
+            values[self._cursor] = x
+            self._cursor += 1
+            if self._cursor == self.window:
+                self._cursor = 0
+                valid = [v for v in values if v == v]
+                self._count = len(valid)
+                self._nans = self.window - self._count
+                self._mean = math.fsum(valid) / self._count if valid else 0.0
+                self._m2 = math.fsum((v - self._mean) ** 2 for v in valid)
+            elif x == x and old == old:
+                # Replace the oldest observation with the newest in one step
+                delta = x - old
+                old_mean = self._mean
+                self._mean += delta / self._count
+                self._m2 += delta * (x - self._mean + old - old_mean)
+            else:
+                self._remove(old)
+                self._add(x)
+        if len(values) == self.window and not self._nans:
+            self.value = math.sqrt(max(self._m2, 0.0) / (self.window - 1))
+        else:
+            self.value = math.nan
+        return self.value
+
+    def _add(self, x: float) -> None:
+        if x != x:
+            self._nans += 1
+            return
+        self._count += 1
+        delta = x - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (x - self._mean)
+
+    def _remove(self, x: float) -> None:
+        if x != x:
+            self._nans -= 1
+            return
+        self._count -= 1
+        if not self._count:
+            self._mean = self._m2 = 0.0
+            return
+        delta = x - self._mean
+        self._mean -= delta / self._count
+        self._m2 -= delta * (x - self._mean)
+
+    def update(self, row: MutableMapping[str, float]) -> MutableMapping[str, float]:
+        row[self.output_column] = self.push(row[self.column])
+        return row
+
+class StreamingVWAP(StreamingIndicator):
+    """
+    Streaming counterpart of calculate_vwap, keeping cumulative price-volume and volume sums.
+
+    As with pandas' cumsum(), NaNs are left out of the sums, and the VWAP of a row with a NaN
+    price or volume is NaN.
+
+    Attributes:
+        value (float): The current VWAP, or NaN while no volume has traded.
+    """
+
+    def __init__(self, price_column: str, volume_column: str):
+        self.price_column = price_column
+        self.volume_column = volume_column
+        self.output_column = 'VWAP'
+        self.value = math.nan
+        self._price_volume = 0.0
+        self._volume = 0.0
+
+    def push(self, price: float, volume: float) -> float:
+        """
+        Adds one trade or bar and returns the updated VWAP.
+
+        Parameters:
+            price (float): The trade price, or the bar's representative price.
+            volume (float): The traded volume.
+        """
+        price_volume = price * volume
+        if price_volume == price_volume:
+            self._price_volume += price_volume
+        if volume == volume:
+            self._volume += volume
+        if price_volume != price_volume:
+            self.value = math.nan
+        else:
+            self.value = self._price_volume / self._volume if self._volume else math.nan
+        return self.value
+
+    def update(self, row: MutableMapping[str, float]) -> MutableMapping[str, float]:
+        row[self.output_column] = self.push(row[self.price_column], row[self.volume_column])
+        return row
+
+# Mapping of enum cases to their streaming counterparts
+STREAMING_INDICATORS = {
+    TickListEnum.ADD_CONSTANT: StreamingAddConstant,
+    TickListEnum.MULTIPLY_BY_FACTOR: StreamingMultiplyByFactor,
+    TickListEnum.CALCULATE_SMA: StreamingSMA,
+    TickListEnum.CALCULATE_EMA: StreamingEMA,
+    TickListEnum.CALCULATE_ROLLING_STD: StreamingRollingStd,
+    TickListEnum.CALCULATE_VWAP: StreamingVWAP
+}
+
+class StreamingTransform:
+    """
+    The streaming equivalent of DataProcessing.transform_data for a fixed expression list.
+
+    Attributes:
+        indicators (List[StreamingIndicator]): One stateful indicator per expression, in order.
+    """
+
+    def __init__(self, expr: List[Tuple[TickListEnum, List]]):
+        """
+        Builds one streaming indicator per operation in the expression list.
+
+        Parameters:
+            expr (List[Tuple[TickListEnum, List]]): The same expression list passed to transform_data.
+        """
+        self.indicators: List[StreamingIndicator] = []
+        for operation, params in expr:
+            if operation not in STREAMING_INDICATORS:
+                raise ValueError(f"Operation {operation} is not supported.")
+            self.indicators.append(STREAMING_INDICATORS[operation](*params))
+
+    def update(self, row: Dict[str, float]) -> Dict[str, float]:
+        """
+        Runs a single new row through every indicator in O(1) time.
+
+        Parameters:
+            row (Dict[str, float]): The newest tick or bar. It is updated in place.
+
+        Returns:
+            Dict[str, float]: The row with every transform applied.
+        """
+        for indicator in self.indicators:
+            indicator.update(row)
+        return row
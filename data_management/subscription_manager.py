@@ -0,0 +1,226 @@
+from collections import Counter, OrderedDict, deque
+from typing import Deque, Dict, Iterable, List, Optional, Set
+
+from ib_insync import Contract, Stock, Ticker, util
+
+from application.connection_manager import ConnectionManager
+
+class MarketDataSubscription:
+    """
+    One consumer's interest in a symbol's market data, returned by SubscriptionManager.subscribe().
+
+    Attributes:
+        symbol (str): The symbol subscribed to.
+        generic_ticks (frozenset): The IB generic tick types the consumer needs, e.g. {'233'} for RTVolume.
+        pinned (bool): Whether the symbol's line must never be rotated out.
+        active (bool): Whether the subscription hasn't been cancelled yet.
+    """
+
+    __slots__ = ('symbol', 'generic_ticks', 'pinned', 'active')
+
+    def __init__(self, symbol: str, generic_ticks: frozenset, pinned: bool):
+        self.symbol = symbol
+        self.generic_ticks = generic_ticks
+        self.pinned = pinned
+        self.active = True
+
+class _SymbolState:
+    """
+    Every consumer of one symbol, and the IB request currently serving them.
+    """
+
+    def __init__(self, contract: Contract):
+        self.contract = contract
+        self.subscriptions: Set[MarketDataSubscription] = set()
+        self.tick_counts: Counter = Counter()
+        self.requested_ticks: Optional[str] = None  # The genericTickList of the live request
+        self.ticker: Optional[Ticker] = None
+
+    @property
+    def generic_tick_list(self) -> str:
+        return ','.join(sorted(self.tick_counts, key=lambda tick: (len(tick), tick)))
+
+    @property
+    def pinned(self) -> bool:
+        return any(subscription.pinned for subscription in self.subscriptions)
+
+class SubscriptionManager:
+    """
+    Shares IB market data lines between every consumer of a symbol.
+
+    Each symbol has at most one reqMktData request, for the union of the generic tick types its
+    consumers asked for. The request is replaced when that union changes and cancelled when the
+    last consumer unsubscribes.
+
+    IB limits how many symbols can stream at once. Past `max_lines`, new symbols wait in a queue,
+    and every `rotation_interval` seconds the longest-streaming unpinned symbols give their lines
+    to waiting ones, so every symbol gets periodic updates. Share one manager per account, since
+    the limit is per account.
+
+    Attributes:
+        connection (ConnectionManager): The connection to Interactive Brokers.
+        max_lines (int): The number of symbols that may stream at once.
+        rotation_interval (float): The number of seconds between line rotations while symbols are waiting.
+        active (OrderedDict[str, _SymbolState]): The streaming symbols, longest-streaming first.
+        waiting (Deque[str]): The symbols waiting for a line, next first.
+        requests (int): The number of reqMktData calls made, for monitoring.
+    """
+
+    def __init__(self, connection: ConnectionManager, max_lines: int = 100, rotation_interval: float = 5.0):
+        if max_lines <= 0:
+            raise ValueError("max_lines must be positive")
+        self.connection = connection
+        self.max_lines = max_lines
+        self.rotation_interval = rotation_interval
+        self._symbols: Dict[str, _SymbolState] = {}
+        self.active: 'OrderedDict[str, _SymbolState]' = OrderedDict()
+        self.waiting: Deque[str] = deque()
+        self.requests = 0
+        self._rotation = None
+
+    def subscribe(self, symbol: str, generic_ticks: Optional[Iterable[str]] = None, pinned: bool = False) -> MarketDataSubscription:
+        """
+        Adds a consumer for a symbol, starting or widening its IB subscription if needed.
+
+        Parameters:
+            symbol (str): The symbol.
+            generic_ticks (Iterable[str], optional): The IB generic tick types needed, e.g. ['233', '236'].
+                                                     Defaults to none, i.e. the standard bid/ask/last fields.
+            pinned (bool): Whether the symbol must keep its line. Pinned symbols jump the queue
+                           and are never rotated out.
+
+        Returns:
+            MarketDataSubscription: The token to pass to unsubscribe().
+        """
+        subscription = MarketDataSubscription(symbol, frozenset(generic_ticks or ()), pinned)
+        state = self._symbols.get(symbol)
+        if state is None:
+            state = self._symbols[symbol] = _SymbolState(Stock(symbol, 'SMART', 'USD'))
+        state.subscriptions.add(subscription)
+        state.tick_counts.update(subscription.generic_ticks)
+
+        if symbol in self.active:
+            self._refresh(state)
+            return subscription
+        if symbol in self.waiting:
+            if not pinned:
+                return subscription
+            self.waiting.remove(symbol)
+
+        if len(self.active) < self.max_lines:
+            self._activate(symbol)
+        elif pinned:
+            evicted = self._evict()
+            if evicted is None:
+                self.waiting.appendleft(symbol)
+            else:
+                self._activate(symbol)
+                self.waiting.appendleft(evicted)
+            self._schedule_rotation()
+        else:
+            self.waiting.append(symbol)
+            self._schedule_rotation()
+        return subscription
+
+    def unsubscribe(self, subscription: MarketDataSubscription) -> None:
+        """
+        Removes a consumer, narrowing or cancelling the symbol's IB subscription if it was the
+        last one needing it.
+        """
+        if not subscription.active:
+            return
+        subscription.active = False
+        state = self._symbols.get(subscription.symbol)
+        if state is None or subscription not in state.subscriptions:
+            return
+        state.subscriptions.discard(subscription)
+        state.tick_counts.subtract(subscription.generic_ticks)
+        state.tick_counts += Counter()  # Drops the tick types no one needs anymore
+
+        symbol = subscription.symbol
+        if state.subscriptions:
+            if symbol in self.active:
+                self._refresh(state)
+            return
+        del self._symbols[symbol]
+        if symbol in self.active:
+            self._deactivate(symbol)
+            self._fill_lines()
+        else:
+            self.waiting.remove(symbol)
+
+    def ticker(self, symbol: str) -> Optional[Ticker]:
+        """
+        Returns the live Ticker of a streaming symbol, or None if it isn't streaming.
+        """
+        state = self.active.get(symbol)
+        return state.ticker if state is not None else None
+
+    def consumers(self, symbol: str) -> int:
+        """
+        Returns the number of consumers subscribed to a symbol.
+        """
+        state = self._symbols.get(symbol)
+        return len(state.subscriptions) if state is not None else 0
+
+    def rotate(self) -> None:
+        """
+        Moves the longest-streaming unpinned symbols to the back of the queue, giving their lines
+        to the symbols at the front.
+        """
+        self._rotation = None
+        count = len(self.waiting)
+        rotated: List[str] = []
+        while count and self.waiting:
+            evicted = self._evict()
+            if evicted is None:
+                break
+            rotated.append(evicted)
+            self._activate(self.waiting.popleft())
+            count -= 1
+        self.waiting.extend(rotated)
+        self._fill_lines()
+        if self.waiting:
+            self._schedule_rotation()
+
+    def _evict(self) -> Optional[str]:
+        """
+        Cancels the longest-streaming unpinned symbol and returns it, or None if all are pinned.
+        """
+        for symbol, state in self.active.items():
+            if not state.pinned:
+                self._deactivate(symbol)
+                return symbol
+        return None
+
+    def _fill_lines(self) -> None:
+        while self.waiting and len(self.active) < self.max_lines:
+            self._activate(self.waiting.popleft())
+
+    def _activate(self, symbol: str) -> None:
+        state = self._symbols[symbol]
+        self.active[symbol] = state
+        self._request(state)
+
+    def _deactivate(self, symbol: str) -> None:
+        state = self.active.pop(symbol)
+        self.connection.connect().cancelMktData(state.contract)
+        state.ticker = None
+        state.requested_ticks = None
+
+    def _refresh(self, state: _SymbolState) -> None:
+        """
+        Re-requests a streaming symbol if the union of its generic tick types has changed.
+        """
+        if state.generic_tick_list != state.requested_ticks:
+            self.connection.connect().cancelMktData(state.contract)
+            self._request(state)
+
+    def _request(self, state: _SymbolState) -> None:
+        state.requested_ticks = state.generic_tick_list
+        state.ticker = self.connection.connect().reqMktData(state.contract, state.requested_ticks, False, False)
+        self.requests += 1
+
+    def _schedule_rotation(self) -> None:
+        if self._rotation is None and self.rotation_interval > 0:
+            self._rotation = util.getLoop().call_later(self.rotation_interval, self.rotate)
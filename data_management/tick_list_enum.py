@@ -5,6 +5,9 @@ class TickListEnum(Enum):
     ADD_CONSTANT = auto()
     MULTIPLY_BY_FACTOR = auto()
     CALCULATE_SMA = auto()
+    CALCULATE_EMA = auto()
+    CALCULATE_ROLLING_STD = auto()
+    CALCULATE_VWAP = auto()
 
 # Associated functions
 def add_constant(data: DataFrame, column: str, value: float) -> DataFrame:
@@ -31,9 +34,62 @@ def calculate_sma(data: DataFrame, column: str, window: int) -> DataFrame:
     data[sma_column_name] = data[column].rolling(window=window).mean()
     return data
 
+def calculate_ema(data: DataFrame, column: str, window: int) -> DataFrame:
+    """
+    Calculates the Exponential Moving Average (EMA) for a specified column of a DataFrame.
+
+    The smoothing factor is 2 / (window + 1) and the average is seeded with the first value,
+    matching pandas' ewm(span=window, adjust=False).
+
+    Parameters:
+        data (DataFrame): The DataFrame containing the data.
+        column (str): The name of the column to calculate the EMA for.
+        window (int): The span of the EMA in periods.
+
+    Returns:
+        DataFrame: The DataFrame with the EMA values appended as a new column.
+    """
+    ema_column_name = f"{column}_EMA{window}"
+    data[ema_column_name] = data[column].ewm(span=window, adjust=False).mean()
+    return data
+
+def calculate_rolling_std(data: DataFrame, column: str, window: int) -> DataFrame:
+    """
+    Calculates the rolling sample standard deviation for a specified column of a DataFrame.
+
+    Parameters:
+        data (DataFrame): The DataFrame containing the data.
+        column (str): The name of the column to calculate the standard deviation for.
+        window (int): The number of periods in the rolling window.
+
+    Returns:
+        DataFrame: The DataFrame with the standard deviation values appended as a new column.
+    """
+    std_column_name = f"{column}_STD{window}"
+    data[std_column_name] = data[column].rolling(window=window).std()
+    return data
+
+def calculate_vwap(data: DataFrame, price_column: str, volume_column: str) -> DataFrame:
+    """
+    Calculates the cumulative Volume Weighted Average Price (VWAP) of a DataFrame.
+
+    Parameters:
+        data (DataFrame): The DataFrame containing the data.
+        price_column (str): The name of the price column.
+        volume_column (str): The name of the volume column.
+
+    Returns:
+        DataFrame: The DataFrame with the VWAP values appended as a 'VWAP' column.
+    """
+    data['VWAP'] = (data[price_column] * data[volume_column]).cumsum() / data[volume_column].cumsum()
+    return data
+
 # Mapping of enum cases to functions
 TRANSFORM_FUNCTIONS = {
     TickListEnum.ADD_CONSTANT: add_constant,
     TickListEnum.MULTIPLY_BY_FACTOR: multiply_by_factor,
-    TickListEnum.CALCULATE_SMA: calculate_sma
+    TickListEnum.CALCULATE_SMA: calculate_sma,
+    TickListEnum.CALCULATE_EMA: calculate_ema,
+    TickListEnum.CALCULATE_ROLLING_STD: calculate_rolling_std,
+    TickListEnum.CALCULATE_VWAP: calculate_vwap
 }
\ No newline at end of file
@@ -0,0 +1,244 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from pandas import DataFrame
+from typing import Dict, NamedTuple, Optional
+
+from ib_insync import Ticker
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# Columns kept for every tick, in append order
+TICK_FIELDS = {
+    'timestamp': np.int64,  # Nanoseconds since the epoch (UTC)
+    'bid': np.float64,
+    'ask': np.float64,
+    'last': np.float64,
+    'size': np.float64,
+}
+
+class RingBuffer:
+    """
+    A fixed-capacity columnar ring buffer backed by preallocated NumPy arrays.
+
+    Every row is written twice, once at its slot and once at its slot plus the capacity, so the
+    most recent rows always sit next to each other in memory. This lets the buffer hand out
+    zero-copy views of the latest rows without ever allocating on append.
+
+    Attributes:
+        fields (tuple): The column names, in the order values are passed to append().
+        capacity (int): The maximum number of rows retained.
+        count (int): The total number of rows appended since the buffer was created.
+    """
+
+    def __init__(self, fields: Dict[str, type], capacity: int):
+        """
+        The constructor for the RingBuffer class.
+
+        Parameters:
+            fields (Dict[str, type]): An ordered mapping of column names to NumPy dtypes.
+            capacity (int): The maximum number of rows retained.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.count = 0
+        self._cursor = 0  # Next slot to write, always in [0, capacity)
+        self._columns = {name: np.zeros(2 * capacity, dtype=dtype) for name, dtype in fields.items()}
+        self._column_list = [self._columns[name] for name in self.fields]
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, *values) -> None:
+        """
+        Appends one row to the buffer, overwriting the oldest row once the buffer is full.
+
+        Parameters:
+            *values: One value per column, in the order of self.fields.
+        """
+        i = self._cursor
+        j = i + self.capacity
+        for column, value in zip(self._column_list, values):
+            column[i] = value
+            column[j] = value
+        self._cursor = i + 1 if i + 1 < self.capacity else 0
+        self.count += 1
+
+    def column(self, name: str, n: Optional[int] = None) -> np.ndarray:
+        """
+        Returns a read-only, zero-copy view of the last n values of a column, oldest first.
+
+        Parameters:
+            name (str): The column name.
+            n (int, optional): The number of rows to return. Defaults to all retained rows.
+
+        Returns:
+            np.ndarray: A view into the buffer. It is only valid until the rows are overwritten,
+                        so copy it if it needs to outlive the callback.
+        """
+        size = len(self) if n is None else min(n, len(self))
+        end = self._cursor + self.capacity
+        view = self._columns[name][end - size:end]
+        view.flags.writeable = False
+        return view
+
+    def columns(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Returns read-only, zero-copy views of the last n rows of every column.
+
+        Parameters:
+            n (int, optional): The number of rows to return. Defaults to all retained rows.
+
+        Returns:
+            Dict[str, np.ndarray]: A mapping of column names to views, oldest row first.
+        """
+        return {name: self.column(name, n) for name in self.fields}
+
+    def last(self, name: str):
+        """
+        Returns the most recent value of a column.
+
+        Parameters:
+            name (str): The column name.
+        """
+        if self.count == 0:
+            raise IndexError("buffer is empty")
+        return self._columns[name][self._cursor + self.capacity - 1]
+
+    def to_frame(self, n: Optional[int] = None) -> DataFrame:
+        """
+        Copies the last n rows into a new pandas DataFrame.
+
+        Parameters:
+            n (int, optional): The number of rows to include. Defaults to all retained rows.
+
+        Returns:
+            DataFrame: A DataFrame with one column per field, oldest row first.
+        """
+        return DataFrame({name: view.copy() for name, view in self.columns(n).items()})
+
+class TickSnapshot(NamedTuple):
+    """
+    A lightweight, immutable copy of a single tick.
+    """
+    symbol: str
+    timestamp: int
+    bid: float
+    ask: float
+    last: float
+    size: float
+
+class TickBuffer(RingBuffer):
+    """
+    A per-symbol ring buffer holding the most recent ticks as bid/ask/last/size/timestamp columns.
+
+    Attributes:
+        symbol (str): The symbol whose ticks are stored in this buffer.
+        received_ns (int): The perf_counter_ns() value when the latest tick arrived, set while
+                           latency tracing is enabled.
+    """
+
+    def __init__(self, symbol: str, capacity: int):
+        """
+        The constructor for the TickBuffer class.
+
+        Parameters:
+            symbol (str): The symbol whose ticks are stored in this buffer.
+            capacity (int): The maximum number of ticks retained.
+        """
+        super().__init__(TICK_FIELDS, capacity)
+        self.symbol = symbol
+        self.received_ns = 0
+
+    def append_ticker(self, ticker: Ticker) -> None:
+        """
+        Appends the current state of an ib_insync Ticker without allocating any arrays.
+
+        Parameters:
+            ticker (Ticker): The ticker to record.
+        """
+        time = ticker.time
+        timestamp = (time - EPOCH) // ONE_MICROSECOND * 1000 if time is not None else 0
+        self.append(timestamp, ticker.bid, ticker.ask, ticker.last, ticker.lastSize)
+
+    def latest(self) -> TickSnapshot:
+        """
+        Returns the most recent tick as a TickSnapshot.
+        """
+        if self.count == 0:
+            raise IndexError(f"No ticks received for {self.symbol}")
+        i = self._cursor + self.capacity - 1
+        columns = self._columns
+        return TickSnapshot(
+            self.symbol,
+            int(columns['timestamp'][i]),
+            float(columns['bid'][i]),
+            float(columns['ask'][i]),
+            float(columns['last'][i]),
+            float(columns['size'][i])
+        )
+
+    def to_frame(self, n: Optional[int] = None) -> DataFrame:
+        """
+        Copies the last n ticks into a new pandas DataFrame with a UTC 'time' column.
+
+        Parameters:
+            n (int, optional): The number of ticks to include. Defaults to all retained ticks.
+
+        Returns:
+            DataFrame: A DataFrame with time, bid, ask, last and size columns, oldest tick first.
+        """
+        df = super().to_frame(n)
+        df.insert(0, 'time', pd.to_datetime(df.pop('timestamp'), unit='ns', utc=True))
+        return df
+
+class TickStore:
+    """
+    A collection of TickBuffers, one per symbol, created on first use.
+
+    Attributes:
+        capacity (int): The capacity of each per-symbol buffer.
+        buffers (Dict[str, TickBuffer]): A mapping of symbols to their tick buffers.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        """
+        The constructor for the TickStore class.
+
+        Parameters:
+            capacity (int): The number of ticks retained per symbol.
+        """
+        self.capacity = capacity
+        self.buffers: Dict[str, TickBuffer] = {}
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.buffers
+
+    def buffer(self, symbol: str) -> TickBuffer:
+        """
+        Returns the buffer for a symbol, creating it if needed.
+
+        Parameters:
+            symbol (str): The symbol to look up.
+        """
+        buffer = self.buffers.get(symbol)
+        if buffer is None:
+            buffer = self.buffers[symbol] = TickBuffer(symbol, self.capacity)
+        return buffer
+
+    def append(self, ticker: Ticker) -> TickBuffer:
+        """
+        Records a ticker in the buffer for its symbol.
+
+        Parameters:
+            ticker (Ticker): The ticker to record.
+
+        Returns:
+            TickBuffer: The buffer the tick was appended to.
+        """
+        buffer = self.buffer(ticker.contract.symbol)
+        buffer.append_ticker(ticker)
+        return buffer
@@ -0,0 +1,123 @@
+import inspect
+import numpy as np
+from pandas import DataFrame
+from typing import Callable, Dict, List, Tuple
+
+from data_management.tick_list_enum import TRANSFORM_FUNCTIONS, TickListEnum
+
+# Operations that are pure column arithmetic and can be folded into a single affine step
+AFFINE_OPERATIONS = (TickListEnum.ADD_CONSTANT, TickListEnum.MULTIPLY_BY_FACTOR)
+
+class AffineStep:
+    """
+    A fused run of ADD_CONSTANT / MULTIPLY_BY_FACTOR operations.
+
+    Any sequence of additions and multiplications on a column reduces to x * scale + offset, so
+    the whole run is applied with one multiply and one add per column and a single new array.
+    Results can differ from applying the operations one at a time in the last bit of precision.
+
+    Attributes:
+        coefficients (Dict[str, Tuple[float, float]]): The (scale, offset) to apply to each column.
+    """
+
+    def __init__(self):
+        self.coefficients: Dict[str, Tuple[float, float]] = {}
+
+    def add(self, operation: TickListEnum, column: str, operand: float) -> None:
+        """
+        Folds one more arithmetic operation into the step.
+
+        Parameters:
+            operation (TickListEnum): ADD_CONSTANT or MULTIPLY_BY_FACTOR.
+            column (str): The column the operation applies to.
+            operand (float): The constant to add or the factor to multiply by.
+        """
+        scale, offset = self.coefficients.get(column, (1, 0))
+        if operation == TickListEnum.ADD_CONSTANT:
+            self.coefficients[column] = (scale, offset + operand)
+        else:
+            self.coefficients[column] = (scale * operand, offset * operand)
+
+    def __call__(self, data: DataFrame) -> DataFrame:
+        for column, (scale, offset) in self.coefficients.items():
+            values = data[column].to_numpy()
+            if scale == 1:
+                result = values + offset
+            else:
+                result = values * scale
+                if offset != 0:
+                    if np.result_type(result, offset) == result.dtype:
+                        result += offset  # In place, no second temporary
+                    else:
+                        result = result + offset
+            data[column] = result
+        return data
+
+class TransformPipeline:
+    """
+    A reusable, pre-validated form of a DataProcessing.transform_data expression list.
+
+    Compiling resolves every operation and checks its parameters once. Consecutive arithmetic
+    operations are fused into AffineSteps, so running the pipeline on each new batch only
+    executes the precomputed steps.
+
+    Attributes:
+        expr (List[Tuple[TickListEnum, List]]): The expression list the pipeline was compiled from.
+        steps (List[Callable[[DataFrame], DataFrame]]): The compiled steps, in execution order.
+    """
+
+    def __init__(self, expr: List[Tuple[TickListEnum, List]]):
+        """
+        Compiles an expression list into a pipeline.
+
+        Parameters:
+            expr (List[Tuple[TickListEnum, List]]): A list of (operation, parameters) tuples, as
+                                                     accepted by DataProcessing.transform_data.
+
+        Raises:
+            ValueError: If an operation is unsupported or its parameters don't match its function.
+        """
+        self.expr = list(expr)
+        self.steps: List[Callable[[DataFrame], DataFrame]] = []
+
+        affine = None
+        for operation, params in self.expr:
+            if operation not in TRANSFORM_FUNCTIONS:
+                raise ValueError(f"Operation {operation} is not supported.")
+            function = TRANSFORM_FUNCTIONS[operation]
+            try:
+                inspect.signature(function).bind(None, *params)
+            except TypeError as e:
+                raise ValueError(f"Invalid parameters {params} for operation {operation}: {e}") from e
+
+            if operation in AFFINE_OPERATIONS:
+                if affine is None:
+                    affine = AffineStep()
+                    self.steps.append(affine)
+                affine.add(operation, *params)
+            else:
+                affine = None
+                self.steps.append(_bind(function, params))
+
+    def run(self, data: DataFrame) -> DataFrame:
+        """
+        Applies the compiled steps to a DataFrame, modifying it in place like transform_data.
+
+        Parameters:
+            data (DataFrame): The DataFrame to be transformed.
+
+        Returns:
+            DataFrame: The transformed DataFrame.
+        """
+        for step in self.steps:
+            data = step(data)
+        return data
+
+    __call__ = run
+
+def _bind(function: Callable, params: List) -> Callable[[DataFrame], DataFrame]:
+    """
+    Returns a step that calls a transform function with its parameters already bound.
+    """
+    params = tuple(params)
+    return lambda data: function(data, *params)
@@ -1,4 +1,7 @@
+# Slotted to keep per-order memory small. Left mutable because order_id is assigned on submission.
 class Order:
+    __slots__ = ('order_id', 'order_type', 'symbol', 'quantity', 'price')
+
     def __init__(self, order_type: str, symbol: str, quantity: int, price: float, order_id: str = None):
         self.order_id = order_id
         self.order_type = order_type
@@ -1,4 +1,7 @@
+# Slotted to keep per-position memory small. Left mutable so positions can be updated on fills.
 class Position:
+    __slots__ = ('symbol', 'quantity', 'price')
+
     def __init__(self, symbol: str, quantity: int, price: float):
         self.symbol = symbol
         self.quantity = quantity
@@ -0,0 +1,167 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+NAT = np.datetime64('NaT', 'ns')
+
+class RecordBatch(ABC):
+    """
+    A growable batch of records stored in a NumPy structured array.
+
+    Subclasses define the record layout in DTYPE and how a stored record maps to an entity.
+    Symbols are stored as int32 codes into a per-batch symbol table, so each record is a small
+    fixed-size struct with no per-record Python objects.
+
+    Attributes:
+        symbols (List[str]): The symbol table. A record's 'symbol' field is an index into it.
+    """
+
+    DTYPE = np.dtype([('symbol', np.int32)])
+    # Values for fields that append_columns() isn't given, other than zero
+    DEFAULTS: Dict[str, object] = {}
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Parameters:
+            capacity (int): The number of records to preallocate. The batch grows as needed.
+        """
+        self._data = np.zeros(max(capacity, 1), dtype=self.DTYPE)
+        self._size = 0
+        self.symbols: List[str] = []
+        self._symbol_codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int):
+        """
+        Returns the record at an index as an entity object.
+        """
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('record index out of range')
+        return self._to_entity(self._data[index])
+
+    def __iter__(self) -> Iterator:
+        for record in self.records:
+            yield self._to_entity(record)
+
+    @property
+    def records(self) -> np.ndarray:
+        """
+        A zero-copy view of the stored records as a structured array.
+        """
+        return self._data[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The number of bytes used by the stored records.
+        """
+        return self._size * self.DTYPE.itemsize
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Returns a read-only, zero-copy view of one field of every record.
+        """
+        view = self._data[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def symbol_code(self, symbol: str) -> int:
+        """
+        Returns the code of a symbol in the symbol table, adding it if necessary.
+        """
+        code = self._symbol_codes.get(symbol)
+        if code is None:
+            code = self._symbol_codes[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return code
+
+    def append_columns(self, **columns) -> None:
+        """
+        Appends many records at once from one array per field.
+
+        Fields that aren't given are set to their DEFAULTS value, NaT for datetimes, or zero.
+        The 'symbol' field may be given as strings, which are encoded into the symbol table.
+
+        Parameters:
+            **columns: Equal-length array-likes keyed by field name.
+        """
+        if not columns:
+            return
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) != 1:
+            raise ValueError('All columns must have the same length')
+        n = lengths.pop()
+        start = self._reserve(n)
+        rows = self._data[start:start + n]
+        for name in self.DTYPE.names:
+            if name in columns:
+                continue
+            if name in self.DEFAULTS:
+                rows[name] = self.DEFAULTS[name]
+            elif self.DTYPE[name].kind == 'M':
+                rows[name] = NAT
+        for name, values in columns.items():
+            if name not in self.DTYPE.names:
+                raise KeyError(f"Unknown field '{name}'")
+            values = np.asarray(values)
+            if name == 'symbol' and values.dtype.kind in 'OUS':
+                unique, inverse = np.unique(values.astype(str), return_inverse=True)
+                codes = np.array([self.symbol_code(symbol) for symbol in unique], dtype=np.int32)
+                values = codes[inverse]
+            rows[name] = values
+        self._size = start + n
+
+    def to_frame(self) -> DataFrame:
+        """
+        Hands the records to a pandas DataFrame without copying the numeric fields.
+
+        The 'symbol' column is a Categorical over the symbol table.
+        """
+        records = self.records.view()
+        records.flags.writeable = False
+        data = {}
+        for name in self.DTYPE.names:
+            if name == 'symbol':
+                data[name] = pd.Categorical.from_codes(records[name], categories=self.symbols or [''], validate=False)
+            else:
+                data[name] = records[name]
+        return DataFrame(data, copy=False)
+
+    def _reserve(self, n: int) -> int:
+        """
+        Makes room for n more records, doubling the capacity as needed, and returns the first free index.
+        """
+        start = self._size
+        if start + n > len(self._data):
+            capacity = len(self._data)
+            while capacity < start + n:
+                capacity *= 2
+            data = np.zeros(capacity, dtype=self.DTYPE)
+            data[:start] = self._data[:start]
+            self._data = data
+        return start
+
+    @abstractmethod
+    def _to_entity(self, record: np.void):
+        """
+        Converts a stored record to the subclass's entity object.
+        """
+        pass
+
+def _to_datetime64(time: Optional[object]) -> np.datetime64:
+    """
+    Converts a timestamp to a naive UTC datetime64[ns], or None to NaT.
+    """
+    if time is None:
+        return NAT
+    timestamp = pd.Timestamp(time)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return timestamp.to_datetime64().astype('datetime64[ns]')
@@ -1,4 +1,7 @@
+# Slotted, since backtests create signals by the million. Left mutable so risk rules can resize them.
 class Signal:
+    __slots__ = ('symbol', 'signal_type', 'quantity', 'order_type', 'price')
+
     def __init__(self, symbol: str, signal_type: str, quantity: int, order_type: str, price: float):
         self.symbol = symbol
         self.signal_type = signal_type  # e.g., 'BUY', 'SELL'
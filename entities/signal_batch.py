@@ -0,0 +1,84 @@
+from typing import Iterable, Optional
+
+import numpy as np
+
+from entities.option_signal import OptionSignal
+from entities.record_batch import RecordBatch, _to_datetime64
+from entities.signal import Signal
+from entities.stock_signal import StockSignal
+
+SIGNAL_TYPES = {'BUY': 1, 'SELL': -1}
+ORDER_TYPES = {'MARKET': 0, 'LIMIT': 1}
+OPTION_TYPES = {'C': 1, 'P': -1}
+
+class SignalBatch(RecordBatch):
+    """
+    A columnar batch of signals, for backtests that generate them by the million.
+
+    Each signal is a 43-byte record: side and order type are small integer codes, the symbol is a
+    code into the symbol table, and option fields are NaN / 0 for stock signals. Indexing returns
+    a StockSignal or OptionSignal, and to_frame() hands the columns to pandas without copying.
+
+    Fields:
+        time (datetime64[ns]): When the signal was generated, in UTC, or NaT.
+        symbol (int32): The symbol's code in the symbol table.
+        side (int8): 1 for BUY, -1 for SELL.
+        order_type (int8): 0 for MARKET, 1 for LIMIT.
+        option_type (int8): 1 for calls, -1 for puts, 0 for stock signals.
+        quantity (int64): The number of shares or contracts.
+        price (float64): The signal price.
+        strike (float64): The option strike, NaN for stock signals.
+        expiry (int32): The option expiry as YYYYMMDD, 0 for stock signals.
+    """
+
+    DTYPE = np.dtype([
+        ('time', 'datetime64[ns]'),
+        ('price', np.float64),
+        ('strike', np.float64),
+        ('quantity', np.int64),
+        ('symbol', np.int32),
+        ('expiry', np.int32),
+        ('side', np.int8),
+        ('order_type', np.int8),
+        ('option_type', np.int8),
+    ])
+    DEFAULTS = {'strike': np.nan}
+
+    def append(self, signal: Signal, time: Optional[object] = None) -> None:
+        """
+        Appends one signal.
+
+        Parameters:
+            signal (Signal): A StockSignal or OptionSignal.
+            time (datetime, optional): When the signal was generated. Naive values are treated as UTC.
+        """
+        index = self._reserve(1)
+        is_option = isinstance(signal, OptionSignal)
+        self._data[index] = (
+            _to_datetime64(time),
+            signal.price if signal.price is not None else np.nan,
+            signal.strike if is_option else np.nan,
+            signal.quantity,
+            self.symbol_code(signal.symbol),
+            int(signal.expiry) if is_option else 0,
+            SIGNAL_TYPES[signal.signal_type],
+            ORDER_TYPES[signal.order_type],
+            OPTION_TYPES[signal.option_type] if is_option else 0,
+        )
+        self._size = index + 1
+
+    def extend(self, signals: Iterable[Signal]) -> None:
+        for signal in signals:
+            self.append(signal)
+
+    def _to_entity(self, record: np.void) -> Signal:
+        symbol = self.symbols[record['symbol']]
+        signal_type = 'BUY' if record['side'] > 0 else 'SELL'
+        order_type = 'LIMIT' if record['order_type'] else 'MARKET'
+        price = float(record['price'])
+        if record['option_type']:
+            return OptionSignal(
+                symbol, signal_type, int(record['quantity']), order_type, price,
+                float(record['strike']), str(record['expiry']), 'C' if record['option_type'] > 0 else 'P'
+            )
+        return StockSignal(symbol, signal_type, int(record['quantity']), order_type, price)
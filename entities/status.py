@@ -1,6 +1,8 @@
+from typing import NamedTuple
+
 # TODO: What is this class for?
 # TODO: This feels like a duplicate of Confirmation. Revisit and potentially consolidate
-class Status:
-    def __init__(self, order_id: str, status_type: str):
-        self.order_id = order_id
-        self.status_type = status_type
\ No newline at end of file
+# A status is a snapshot at query time, so it is an immutable tuple
+class Status(NamedTuple):
+    order_id: str
+    status_type: str
\ No newline at end of file
@@ -1,5 +1,7 @@
 from entities.order import Order
 
 class StockOrder(Order):
-    def __init__(self, order_id: str, order_type: str, symbol: str, quantity: int, price: float):
-        super().__init__(order_id, order_type, symbol, quantity, price)
\ No newline at end of file
+    __slots__ = ()
+
+    def __init__(self, order_type: str, symbol: str, quantity: int, price: float, order_id: str = None):
+        super().__init__(order_type, symbol, quantity, price, order_id)
\ No newline at end of file
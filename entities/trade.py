@@ -1,5 +1,7 @@
-class Trade:
-    def __init__(self, symbol: str, quantity: int, price: float):
-        self.symbol = symbol
-        self.quantity = quantity
-        self.price = price
\ No newline at end of file
+from typing import NamedTuple
+
+# An executed trade never changes, so it is an immutable tuple, which is also the fastest to create
+class Trade(NamedTuple):
+    symbol: str
+    quantity: int
+    price: float
\ No newline at end of file
@@ -0,0 +1,46 @@
+from typing import Optional
+
+import numpy as np
+
+from entities.record_batch import RecordBatch, _to_datetime64
+from entities.trade import Trade
+
+class TradeBlotter(RecordBatch):
+    """
+    A columnar record of executed trades, for backtests and sessions with many fills.
+
+    Each trade is a 36-byte record. Indexing returns a Trade, and to_frame() hands the columns
+    to pandas without copying.
+
+    Fields:
+        time (datetime64[ns]): When the trade executed, in UTC, or NaT.
+        symbol (int32): The symbol's code in the symbol table.
+        quantity (float64): The signed quantity, positive for buys and negative for sells.
+        price (float64): The execution price.
+        commission (float64): The commission paid.
+    """
+
+    DTYPE = np.dtype([
+        ('time', 'datetime64[ns]'),
+        ('quantity', np.float64),
+        ('price', np.float64),
+        ('commission', np.float64),
+        ('symbol', np.int32),
+    ])
+
+    def append(self, trade: Trade, time: Optional[object] = None, commission: float = 0.0) -> None:
+        """
+        Appends one trade.
+
+        Parameters:
+            trade (Trade): The executed trade.
+            time (datetime, optional): When the trade executed. Naive values are treated as UTC.
+            commission (float): The commission paid.
+        """
+        index = self._reserve(1)
+        self._data[index] = (_to_datetime64(time), trade.quantity, trade.price, commission, self.symbol_code(trade.symbol))
+        self._size = index + 1
+
+    def _to_entity(self, record: np.void) -> Trade:
+        quantity = float(record['quantity'])
+        return Trade(self.symbols[record['symbol']], int(quantity) if quantity.is_integer() else quantity, float(record['price']))
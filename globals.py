@@ -1,7 +1,6 @@
 from ib_insync import *
-import random
+from application.connection_manager import ConnectionManager
 
-ib = IB()
-random_id = random.randint(0,9999)
-# TODO: Make this more robust + reconnect logic wherever we use ib
-ib.connect('127.0.0.1', 4001, clientId=random_id)
\ No newline at end of file
+# Shared by every DataRetrieval and BrokerIntegration. Nothing connects until the broker is first used.
+connection_manager = ConnectionManager('127.0.0.1', 4001)
+ib = connection_manager.ib
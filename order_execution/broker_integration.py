@@ -1,14 +1,78 @@
-from typing import Dict, List
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple, Union
 
-from ib_insync import Stock, Option, LimitOrder, MarketOrder
-from ib_insync.order import Order as IBOrder
+from ib_insync import IB, Contract, Fill, Stock, LimitOrder, MarketOrder, Trade, util
+from ib_insync.order import Order as IBOrder, OrderStatus
 from entities.status import Status
 from entities.stock_order import StockOrder
 from entities.option_order import OptionOrder
 from entities.order import Order
 from entities.confirmation import Confirmation
 from entities.position import Position
-from globals import ib
+from order_execution.order_registry import FINAL_STATUSES, OrderRegistry
+from application.connection_manager import ConnectionManager
+from application.latency_tracing import tracer
+from data_management.option_chain import OptionContractCache
+from globals import connection_manager
+
+# Statuses set locally before the broker has seen the order
+LOCAL_STATUSES = {'PendingSubmit', 'PendingCancel', 'ApiPending'}
+
+class OrderHandle:
+    """
+    Tracks an order submitted through BrokerIntegration.submit_orders.
+
+    The futures are resolved from ib_insync's orderStatusEvent and execDetailsEvent callbacks,
+    so nothing needs to poll for them.
+
+    Attributes:
+        order (Order): The submitted order.
+        trade (Trade): The ib_insync trade for the order, or None if it couldn't be placed.
+        acknowledged (asyncio.Future): Resolves with a Confirmation once the broker first reports
+                                       on the order (accepted, filled or rejected).
+        completed (asyncio.Future): Resolves with a Confirmation once the order is filled, cancelled
+                                    or rejected.
+        submitted_ns (int): The perf_counter_ns() value when the order was placed, set while
+                            latency tracing is enabled.
+        strategy (str, optional): The strategy the order was submitted for, which its latencies are
+                                  recorded under.
+    """
+
+    def __init__(self, order: Order, trade: Optional[Trade], strategy: Optional[str] = None):
+        loop = util.getLoop()
+        self.order = order
+        self.trade = trade
+        self.strategy = strategy
+        self.acknowledged: asyncio.Future = loop.create_future()
+        self.completed: asyncio.Future = loop.create_future()
+        self.submitted_ns = 0
+
+    @classmethod
+    def rejected(cls, order: Order, confirmation: Confirmation, strategy: Optional[str] = None) -> 'OrderHandle':
+        """
+        Returns a completed handle for an order that was never placed.
+        """
+        handle = cls(order, None, strategy)
+        handle._resolve(confirmation, final=True)
+        return handle
+
+    @property
+    def confirmation(self) -> Confirmation:
+        """
+        The Confirmation for the order's current status, without waiting.
+        """
+        if self.completed.done():
+            return self.completed.result()
+        return _confirmation_from_status(self.trade.orderStatus.status)
+
+    def _resolve(self, confirmation: Confirmation, final: bool) -> None:
+        if not self.acknowledged.done():
+            self.acknowledged.set_result(confirmation)
+            if self.submitted_ns:
+                tracer.record('order_ack', self.submitted_ns, self.strategy)
+        if final and not self.completed.done():
+            self.completed.set_result(confirmation)
 
 class BrokerIntegration:
     """
@@ -18,33 +82,149 @@ class BrokerIntegration:
     and retrieve account details from Interactive Brokers.
 
     Attributes:
-        ib (IB): An instance of the IB class from ib_insync library for broker connection and operations.
+        connection (ConnectionManager): The connection to Interactive Brokers, shared with other components.
+        ib (IB): The connection's IB instance from the ib_insync library, connected on first use.
+        registry (OrderRegistry): An index of the session's orders, used for constant-time lookups.
+        option_contracts (OptionContractCache): Qualified option contracts, so each option is only
+                                                looked up with IB the first time it is traded.
     """
 
-    def __init__(self):
+    def __init__(self, connection: Optional[ConnectionManager] = None):
         """
-        Initializes the BrokerIntegration with a connection to Interactive Brokers.
-        """
-        self.ib = ib
+        Initializes the BrokerIntegration. It doesn't connect to Interactive Brokers until an
+        order or account request is made.
 
-    def execute_order(self, order: Order) -> Confirmation:
+        Parameters:
+            connection (ConnectionManager, optional): The connection to use. Defaults to the shared
+                                                      connection from globals.
+        """
+        self.connection = connection if connection is not None else connection_manager
+        # Events can be subscribed to before the connection is made
+        unconnected_ib = self.connection.ib
+        self.registry = OrderRegistry(unconnected_ib)
+        self.option_contracts = OptionContractCache(self.connection)
+        self._handles: Dict[int, OrderHandle] = {}  # Maps IB order ids to unfinished handles
+        unconnected_ib.orderStatusEvent += self._on_order_status
+        unconnected_ib.execDetailsEvent += self._on_exec_details
+
+    @property
+    def ib(self) -> IB:
+        return self.connection.connect()
+
+    def execute_order(self, order: Order, timeout: float = 2) -> Confirmation:
         """
         Executes a trading order using Interactive Brokers.
 
-        The method determines the type of order (stock or option) and creates the appropriate contract.
-        It then places the order (market or limit) and checks for its execution status.
+        This is a blocking wrapper around submit_orders(). It returns as soon as the broker first
+        reports on the order, or after the timeout, whichever comes first.
 
         Parameters:
             order (Order): The order to be executed. Can be a StockOrder or OptionOrder.
+            timeout (float): The maximum number of seconds to wait for the broker.
 
         Returns:
             Confirmation: An object indicating the status of the order execution.
         """
+        self.qualify_options([order])
+        handle = self.submit_orders([order])[0]
+        deadline = time.monotonic() + timeout
+        while not handle.acknowledged.done():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self.ib.waitOnUpdate(timeout=remaining)
+        return handle.confirmation
+
+    def submit_orders(self, orders: List[Order], strategy: Optional[str] = None) -> List[OrderHandle]:
+        """
+        Places every order immediately without waiting for the broker.
+
+        Each order's order_id is set to its IB order id if it doesn't have one yet. Await
+        handle.acknowledged or handle.completed (e.g. with asyncio.gather) to get the Confirmations.
+
+        This never waits on IB, so option contracts aren't qualified here: options must have been
+        qualified beforehand with qualify_options() or qualify_options_async(), or they are rejected.
+
+        Parameters:
+            orders (List[Order]): The orders to place. Each can be a StockOrder or OptionOrder.
+            strategy (str, optional): The strategy the orders are for, used to break down latencies.
+
+        Returns:
+            List[OrderHandle]: One handle per order, in the same order.
+        """
+        handles = []
+        for order in orders:
+            built = self._build_ib_order(order)
+            if isinstance(built, Confirmation):
+                handle = OrderHandle.rejected(order, built, strategy)
+            else:
+                start = time.perf_counter_ns() if tracer.enabled else 0
+                trade = self.ib.placeOrder(*built)
+                if order.order_id is None:
+                    order.order_id = trade.order.orderId
+                self.registry.register(order, trade)
+                handle = OrderHandle(order, trade, strategy)
+                if tracer.enabled:
+                    handle.submitted_ns = tracer.record('place_order', start, strategy)
+                self._handles[trade.order.orderId] = handle
+                # Updates may already have arrived, e.g. from a simulated or paper connection
+                self._on_order_status(trade)
+            handles.append(handle)
+        return handles
+
+    async def execute_orders_async(self, orders: List[Order], timeout: float = 2) -> List[Confirmation]:
+        """
+        Places every order at once and waits for all of them to be acknowledged.
+
+        Parameters:
+            orders (List[Order]): The orders to place.
+            timeout (float): The maximum number of seconds to wait for the broker.
+
+        Returns:
+            List[Confirmation]: One Confirmation per order, in the same order.
+        """
+        await self.qualify_options_async(orders)
+        handles = self.submit_orders(orders)
+        pending = [handle.acknowledged for handle in handles if not handle.acknowledged.done()]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+        return [handle.confirmation for handle in handles]
+
+    def qualify_options(self, orders: List[Order]) -> None:
+        """
+        Qualifies the contracts of any options among the orders that aren't cached yet, in one batch.
+
+        This blocks until IB replies, so it can't be called from inside the event loop; use
+        qualify_options_async() there.
+        """
+        keys = _option_keys(orders)
+        if keys:
+            self.option_contracts.qualify(keys)
+
+    async def qualify_options_async(self, orders: List[Order]) -> None:
+        """
+        The async version of qualify_options(), for use inside the event loop.
+        """
+        keys = _option_keys(orders)
+        if keys:
+            await self.option_contracts.qualify_async(keys)
+
+    def _build_ib_order(self, order: Order) -> Union[Tuple[Contract, IBOrder], Confirmation]:
+        """
+        Creates the IB contract and order for one of our orders.
+
+        Returns:
+            Union[Tuple[Contract, IBOrder], Confirmation]: The contract and order to place, or a
+                                                           Confirmation describing why the order is invalid.
+        """
         # Determine the type of contract based on the order type
         if isinstance(order, StockOrder):
             contract = Stock(order.symbol, 'SMART', 'USD')
         elif isinstance(order, OptionOrder):
-            contract = Option(order.symbol, order.expiry, order.strike, order.option_type, 'SMART', 'USD')
+            # Looked up in the cache only: qualifying here would block the event loop
+            contract = self.option_contracts.get(order.symbol, order.expiry, order.strike, order.option_type)
+            if contract is None:
+                return Confirmation('ERROR', 'Unknown or unqualified option contract')
         else:
             return Confirmation('ERROR', 'Unsupported order type')
 
@@ -55,18 +235,36 @@ class BrokerIntegration:
             ib_order = LimitOrder('BUY' if order.quantity > 0 else 'SELL', abs(order.quantity), order.price)
         else:
             return Confirmation('ERROR', 'Invalid order type')
-        
-        # Place the order and wait for a status update
-        trade = self.ib.placeOrder(contract, ib_order)
-        self.ib.waitOnUpdate(timeout=2)
-
-        # Check and return the status of the order
-        if trade.orderStatus.status == 'Filled':
-            return Confirmation('SUCCESS', 'Order filled')
-        elif trade.orderStatus.status in ['Submitted', 'PendingSubmit']:
-            return Confirmation('PENDING', 'Order submitted but not filled')
+        return contract, ib_order
+
+    def _on_order_status(self, trade: Trade) -> None:
+        """
+        Resolves the handle of an order when IB reports a new status for it.
+        """
+        handle = self._handles.get(trade.order.orderId)
+        if handle is None:
+            return
+        status = trade.orderStatus.status
+        if status in LOCAL_STATUSES:
+            return
+        final = status in FINAL_STATUSES
+        handle._resolve(_confirmation_from_status(status), final)
+        if final:
+            del self._handles[trade.order.orderId]
+
+    def _on_exec_details(self, trade: Trade, fill: Fill) -> None:
+        """
+        Resolves the handle of an order as soon as its executions add up to the full quantity,
+        which can happen before the matching status update arrives.
+        """
+        handle = self._handles.get(trade.order.orderId)
+        if handle is None:
+            return
+        if trade.remaining() <= 0:
+            handle._resolve(Confirmation('SUCCESS', 'Order filled'), final=True)
+            del self._handles[trade.order.orderId]
         else:
-            return Confirmation('ERROR', 'Order not filled or encountered an error')
+            handle._resolve(Confirmation('PENDING', 'Order submitted but not filled'), final=False)
 
     def query_open_orders(self) -> List[Order]:
         """
@@ -75,8 +273,7 @@ class BrokerIntegration:
         Returns:
             List[Order]: A list of open orders currently held in the Interactive Brokers account.
         """
-        open_orders = self.ib.openOrders()
-        return [self._convert_from_ib_order(order) for order in open_orders]
+        return [self._convert_from_trade(trade) for trade in self.registry.open_trades()]
     
     # TODO: What constitutes a session?
     def query_order_status(self, order: Order) -> Status:
@@ -86,10 +283,9 @@ class BrokerIntegration:
         Returns:
             Status: An object indicating the status of the order execution.
         """
-        orders = self.ib.orders()
-        for ib_order in orders:
-            if order.order_id == ib_order.order_id:
-                return Status(ib_order.order_id, ib_order.status)
+        trade = self.registry.trade_for(order)
+        if trade is not None:
+            return Status(order.order_id, trade.orderStatus.status)
         # TODO: Add error handling if the order doesn't exist on our brokerage account
         return Status(order_id="", status_type="FAILED")
 
@@ -123,13 +319,19 @@ class BrokerIntegration:
         Returns:
             Confirmation: An object indicating the status of the order cancellation.
         """
-        self.ib.cancelOrder(order.orderId)
+        trade = self.registry.trade_for(order)
+        if trade is None:
+            return Confirmation('ERROR', 'Order not found')
+        self.ib.cancelOrder(trade.order)
         return Confirmation('SUCCESS', 'Order cancelled')
 
     def modify_order(self, old_order: Order, new_order: Order) -> Confirmation:
         """
         Modifies a trading order using Interactive Brokers.
 
+        A working order for the same contract and order type is modified in place by placing it
+        again under its IB order id. Otherwise the old order is cancelled and the new one placed.
+
         Parameters:
             old_order (Order): The order to be modified.
             new_order (Order): The new order parameters.
@@ -137,6 +339,22 @@ class BrokerIntegration:
         Returns:
             Confirmation: An object indicating the status of the order modification.
         """
+        trade = self.registry.trade_for(old_order)
+        self.qualify_options([new_order])
+        built = self._build_ib_order(new_order)
+        if isinstance(built, Confirmation):
+            return built
+        contract, ib_order = built
+
+        if (trade is not None and trade.isActive() and trade.order.orderType == ib_order.orderType
+                and _same_contract(trade.contract, contract)):
+            trade.order.action = ib_order.action
+            trade.order.totalQuantity = ib_order.totalQuantity
+            trade.order.lmtPrice = ib_order.lmtPrice
+            self.ib.placeOrder(trade.contract, trade.order)
+            self.registry.relink(old_order, new_order)
+            return Confirmation('SUCCESS', 'Order modified')
+
         self.cancel_order(old_order)
         return self.execute_order(new_order)
     
@@ -150,10 +368,28 @@ class BrokerIntegration:
         Returns:
             Order: The converted custom Order object.
         """
-
-        trade = next((trade for trade in self.ib.trades() if trade.order.orderId == ib_order.orderId), None)
+        trade = self.registry.trade_for_id(ib_order.orderId)
         if trade is None:
             raise ValueError(f"No trade found with orderId: {ib_order.orderId}")
+        return self._convert_from_trade(trade)
+
+    def _convert_from_trade(self, trade: Trade) -> Order:
+        """
+        Converts an ib_insync trade to a custom Order object.
+
+        Orders placed through this class are returned as they were submitted. Orders placed
+        elsewhere, e.g. in TWS, are rebuilt from the IB order and contract.
+
+        Parameters:
+            trade (Trade): The ib_insync trade to be converted.
+
+        Returns:
+            Order: The converted custom Order object.
+        """
+        order = self.registry.order_for_id(trade.order.orderId)
+        if order is not None:
+            return order
+        ib_order = trade.order
         contract = trade.contract
 
         if contract.secType == 'STK':
@@ -210,4 +446,28 @@ class BrokerIntegration:
     #         return OptionOrder(order_id, order_type, symbol, quantity, price, strike, expiry, option_type)
     #     else:
     #         # Handling for unsupported contract types, if necessary
-    #         pass
\ No newline at end of file
+    #         pass
+
+def _confirmation_from_status(status: str) -> Confirmation:
+    """
+    Maps an IB order status to a Confirmation.
+    """
+    if status == 'Filled':
+        return Confirmation('SUCCESS', 'Order filled')
+    elif status in OrderStatus.ActiveStates:
+        return Confirmation('PENDING', 'Order submitted but not filled')
+    else:
+        return Confirmation('ERROR', 'Order not filled or encountered an error')
+
+def _same_contract(a: Contract, b: Contract) -> bool:
+    """
+    Returns whether two contracts describe the same instrument.
+    """
+    return (a.secType, a.symbol, a.lastTradeDateOrContractMonth, a.strike, a.right) == \
+        (b.secType, b.symbol, b.lastTradeDateOrContractMonth, b.strike, b.right)
+
+def _option_keys(orders: List[Order]) -> List[Tuple[str, str, float, str]]:
+    """
+    Returns the option contract keys of the option orders among the orders.
+    """
+    return [(order.symbol, order.expiry, order.strike, order.option_type) for order in orders if isinstance(order, OptionOrder)]
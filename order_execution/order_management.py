@@ -1,4 +1,9 @@
-from typing import Dict
+from time import perf_counter_ns
+from typing import List, Optional
+
+from ib_insync import Fill, Trade
+
+from application.latency_tracing import tracer
 from entities.confirmation import Confirmation
 from entities.option_order import OptionOrder
 from entities.option_signal import OptionSignal
@@ -7,7 +12,9 @@ from entities.signal import Signal
 from entities.status import Status
 from entities.stock_order import StockOrder
 from entities.stock_signal import StockSignal
-from order_execution.broker_integration import BrokerIntegration
+from order_execution.broker_integration import BrokerIntegration, OrderHandle
+from order_execution.order_registry import FINAL_STATUSES
+from risk_management.pre_trade_risk import PreTradeRiskGate
 
 class OrderManagement:
     """
@@ -17,23 +24,33 @@ class OrderManagement:
     Attributes:
         broker_integration (BrokerIntegration): An instance of BrokerIntegration that handles
                                                 communication with the broker.
+        risk_gate (PreTradeRiskGate, optional): Checks orders before they are submitted. It is kept
+                                                up to date with the broker's fills and cancellations.
 
     Methods:
         create_order(signal: Signal) -> Order: Creates an order based on the provided signal.
+        execute_signals(signals: List[Signal], strategy: Optional[str]) -> List[OrderHandle]: Creates and submits orders for signals.
+        submit_orders(orders: List[Order], strategy: Optional[str]) -> List[OrderHandle]: Risk checks and submits orders.
         monitor_order(order: Order) -> Status: Checks the current status of the given order.
         cancel_order(order: Order) -> Confirmation: Cancels the specified order.
         modify_order(old_order: Order, new_order: Order) -> Confirmation: Modifies an existing order.
     """
 
-    def __init__(self, broker_integration: BrokerIntegration):
+    def __init__(self, broker_integration: BrokerIntegration, risk_gate: Optional[PreTradeRiskGate] = None):
         """
         Initializes the OrderManagement class with the provided broker integration.
 
         Args:
             broker_integration (BrokerIntegration): An instance of BrokerIntegration to be used
                                                     for order management.
+            risk_gate (PreTradeRiskGate, optional): A pre-trade risk gate for execute_signals().
         """
         self.broker_integration = broker_integration
+        self.risk_gate = risk_gate
+        if risk_gate is not None:
+            ib = broker_integration.connection.ib
+            ib.execDetailsEvent += self._on_exec_details
+            ib.orderStatusEvent += self._on_order_status
 
     def create_order(self, signal: Signal) -> Order:
         """
@@ -44,23 +61,26 @@ class OrderManagement:
                              This could be a StockSignal or an OptionSignal.
 
         Returns:
-            Order: An instance of Order (StockOrder or OptionOrder) based on the signal type.
+            Order: An instance of Order (StockOrder or OptionOrder) based on the signal type. The
+                   quantity is negative for SELL signals.
 
         Raises:
             ValueError: If the signal type is unsupported.
         """
+        # Orders carry the side in the sign of their quantity
+        quantity = -abs(signal.quantity) if signal.signal_type == 'SELL' else abs(signal.quantity)
         if isinstance(signal, StockSignal):
             return StockOrder(
                 order_type=signal.order_type,
                 symbol=signal.symbol,
-                quantity=signal.quantity,
+                quantity=quantity,
                 price=signal.price
             )
         elif isinstance(signal, OptionSignal):
             return OptionOrder(
                 order_type=signal.order_type,
                 symbol=signal.symbol,
-                quantity=signal.quantity,
+                quantity=quantity,
                 price=signal.price,
                 strike=signal.strike,
                 expiry=signal.expiry,
@@ -69,6 +89,57 @@ class OrderManagement:
         else:
             raise ValueError("Unsupported signal type")
 
+    def execute_signals(self, signals: List[Signal], strategy: Optional[str] = None) -> List[OrderHandle]:
+        """
+        Creates an order for every signal and submits them without waiting for the broker.
+
+        With a risk gate, the orders are checked as one batch first. See submit_orders().
+
+        Args:
+            signals (List[Signal]): The signals to act on.
+            strategy (str, optional): The strategy the signals came from, used to break down latencies.
+
+        Returns:
+            List[OrderHandle]: One handle per signal, in the same order.
+        """
+        start = perf_counter_ns() if tracer.enabled else 0
+        orders = [self.create_order(signal) for signal in signals]
+        if tracer.enabled:
+            tracer.record('create_order', start, strategy)
+        return self.submit_orders(orders, strategy)
+
+    def submit_orders(self, orders: List[Order], strategy: Optional[str] = None) -> List[OrderHandle]:
+        """
+        Checks orders with the risk gate, if there is one, and submits those it accepts.
+
+        Args:
+            orders (List[Order]): The orders to submit.
+            strategy (str, optional): The strategy the orders are for, used to break down latencies.
+
+        Returns:
+            List[OrderHandle]: One handle per order, in the same order. Rejected orders' handles
+                               are already completed with the gate's ERROR Confirmation.
+        """
+        if self.risk_gate is None:
+            return self.broker_integration.submit_orders(orders, strategy)
+
+        start = perf_counter_ns() if tracer.enabled else 0
+        confirmations = self.risk_gate.check_batch(orders)
+        if tracer.enabled:
+            tracer.record('risk_check', start, strategy)
+        accepted = [order for order, confirmation in zip(orders, confirmations) if confirmation.confirmation_type == 'SUCCESS']
+        submitted = iter(self.broker_integration.submit_orders(accepted, strategy))
+        handles = []
+        for order, confirmation in zip(orders, confirmations):
+            if confirmation.confirmation_type == 'SUCCESS':
+                handle = next(submitted)
+                if handle.trade is None:
+                    self.risk_gate.release(order)
+            else:
+                handle = OrderHandle.rejected(order, confirmation, strategy)
+            handles.append(handle)
+        return handles
+
     def monitor_order(self, order: Order) -> Status:
         """
         Queries the current status of the given order using the broker integration.
@@ -104,4 +175,23 @@ class OrderManagement:
         Returns:
             Confirmation: A Confirmation object indicating the outcome of the modify request.
         """
-        return self.broker_integration.modify_order(old_order, new_order)
\ No newline at end of file
+        return self.broker_integration.modify_order(old_order, new_order)
+
+    def _on_exec_details(self, trade: Trade, fill: Fill) -> None:
+        """
+        Books an execution into the risk gate's positions.
+        """
+        order = self.broker_integration.registry.order_for_id(trade.order.orderId)
+        symbol = self.risk_gate.instrument_key(order) if order is not None else trade.contract.symbol
+        execution = fill.execution
+        quantity = execution.shares if execution.side == 'BOT' else -execution.shares
+        self.risk_gate.on_fill(order, symbol, quantity, execution.price)
+
+    def _on_order_status(self, trade: Trade) -> None:
+        """
+        Releases the quantity an order reserved in the risk gate once it finishes without filling.
+        """
+        if trade.orderStatus.status in FINAL_STATUSES and trade.orderStatus.status != 'Filled':
+            order = self.broker_integration.registry.order_for_id(trade.order.orderId)
+            if order is not None:
+                self.risk_gate.release(order)
\ No newline at end of file
@@ -0,0 +1,292 @@
+import math
+from asyncio import TimerHandle
+from typing import Callable, Dict, List, Optional
+
+from ib_insync import Fill, Trade, util
+
+from entities.confirmation import Confirmation
+from entities.order import Order
+from entities.signal import Signal
+from entities.stock_signal import StockSignal
+from order_execution.broker_integration import OrderHandle
+from order_execution.order_management import OrderManagement
+from order_execution.order_registry import FINAL_STATUSES
+from performance.metrics_calculations import MetricsCalculation
+
+class NettedOrderHandle(OrderHandle):
+    """
+    Tracks one strategy's share of a netted order.
+
+    The handle's order is the strategy's own (child) order. Its futures resolve once the child's
+    full quantity has been allocated, or once the parent order finishes.
+
+    Attributes:
+        strategy (str): The strategy the child order belongs to.
+        parent (OrderHandle): The handle of the order sent to the broker, or None if the child was
+                              fully crossed against other strategies.
+        filled (float): The signed quantity allocated to the child so far.
+        average_price (float): The average price of the allocated quantity.
+    """
+
+    def __init__(self, order: Order, strategy: str):
+        super().__init__(order, None, strategy)
+        self.parent: Optional[OrderHandle] = None
+        self.filled = 0.0
+        self.average_price = 0.0
+
+    @property
+    def confirmation(self) -> Confirmation:
+        if self.completed.done():
+            return self.completed.result()
+        if self.parent is not None:
+            return self.parent.confirmation
+        return Confirmation('PENDING', 'Order waiting to be netted')
+
+    def _allocate(self, quantity: float, price: float) -> None:
+        total = self.filled + quantity
+        if total:
+            self.average_price = (self.average_price * self.filled + price * quantity) / total
+        self.filled = total
+
+class _NetGroup:
+    """
+    The child orders for one symbol collected during one window, and how they were netted.
+    """
+
+    def __init__(self, symbol: str, children: List[NettedOrderHandle], reference_price: float):
+        self.symbol = symbol
+        self.children = children
+        self.reference_price = reference_price
+        net = sum(child.order.quantity for child in children)
+        self.side = 1 if net > 0 else -1
+        same_side = [child for child in children if child.order.quantity * self.side > 0]
+        opposite = [child for child in children if child.order.quantity * self.side < 0]
+        crossed = sum(abs(child.order.quantity) for child in opposite)
+
+        # Opposite-side children are crossed in full against a pro rata share of the same side.
+        # Whatever is left of the same side is what the parent order buys or sells.
+        self.crossed: Dict[int, float] = {id(child): abs(child.order.quantity) for child in opposite}
+        shares = allocate(crossed, [abs(child.order.quantity) for child in same_side])
+        for child, share in zip(same_side, shares):
+            self.crossed[id(child)] = share
+        self.takers = same_side
+        self.remainders = [abs(child.order.quantity) - self.crossed[id(child)] for child in same_side]
+        self.parent_quantity = abs(net)
+        self.allocated = [0.0] * len(same_side)
+        self.parent: Optional[OrderHandle] = None
+        self.parent_filled = 0.0
+        self.parent_cost = 0.0
+
+    def cross(self, price: float) -> None:
+        """
+        Allocates the crossed quantities to every child at one price.
+        """
+        for child in self.children:
+            quantity = self.crossed[id(child)]
+            if quantity:
+                child._allocate(math.copysign(quantity, child.order.quantity), price)
+
+class OrderNetting:
+    """
+    Nets market orders for the same symbol from different strategies into one parent order.
+
+    Signals for a symbol are collected for `window` seconds from the first one. The parent order
+    is then sent for the net quantity, so opposing signals are crossed internally instead of each
+    going to the broker and paying for a round trip. With N overlapping strategies this sends one
+    order instead of N.
+
+    Fills of the parent are allocated to the strategies on the net side pro rata to what each
+    still needs, with the largest remainder method so every allocation is a whole number of shares.
+    The crossed quantities are booked at the parent's average fill price once it finishes, or at
+    the reference price if nothing went to the broker. Each allocation is reported to the metrics,
+    if given, under the strategy's name.
+
+    If the parent is rejected or cancelled, the crossings still stand, and children that weren't
+    fully filled complete with the parent's Confirmation.
+
+    Only MARKET stock signals for a whole number of shares are netted. Other signals, including
+    fractional quantities, are submitted straight away.
+
+    Attributes:
+        order_manager (OrderManagement): Creates, risk checks and submits the orders.
+        window (float): The number of seconds to collect signals for before netting them.
+        price_source (Callable[[str], float], optional): Returns the current price of a symbol,
+            used to book crossings when the strategies net to zero.
+        metrics (MetricsCalculation, optional): Receives each strategy's share of the fills.
+        stats (Dict[str, float]): Counts of signals netted, parent orders sent, and quantity crossed.
+    """
+
+    def __init__(
+        self,
+        order_manager: OrderManagement,
+        window: float = 0.05,
+        price_source: Optional[Callable[[str], float]] = None,
+        metrics: Optional[MetricsCalculation] = None,
+    ):
+        self.order_manager = order_manager
+        self.window = window
+        self.price_source = price_source
+        self.metrics = metrics
+        self.stats: Dict[str, float] = {'signals': 0, 'parent_orders': 0, 'crossed_quantity': 0.0}
+        self._pending: Dict[str, List[NettedOrderHandle]] = {}
+        self._timers: Dict[str, TimerHandle] = {}
+        self._groups: Dict[int, _NetGroup] = {}  # IB order id of the parent -> group
+
+        ib = order_manager.broker_integration.connection.ib
+        ib.execDetailsEvent += self._on_exec_details
+        ib.orderStatusEvent += self._on_order_status
+
+    def submit(self, strategy: str, signals: List[Signal]) -> List[OrderHandle]:
+        """
+        Queues a strategy's signals for netting.
+
+        Parameters:
+            strategy (str): The name of the strategy the signals came from.
+            signals (List[Signal]): The signals.
+
+        Returns:
+            List[OrderHandle]: One handle per signal, in the same order. Netted signals get a
+                               NettedOrderHandle.
+        """
+        handles: List[OrderHandle] = []
+        for signal in signals:
+            if not isinstance(signal, StockSignal) or signal.order_type != 'MARKET' or not float(signal.quantity).is_integer():
+                handles.extend(self.order_manager.execute_signals([signal], strategy))
+                continue
+            handle = NettedOrderHandle(self.order_manager.create_order(signal), strategy)
+            pending = self._pending.get(signal.symbol)
+            if pending is None:
+                pending = self._pending[signal.symbol] = []
+                self._timers[signal.symbol] = util.getLoop().call_later(self.window, self.flush, signal.symbol)
+            pending.append(handle)
+            self.stats['signals'] += 1
+            handles.append(handle)
+        return handles
+
+    def flush(self, symbol: Optional[str] = None) -> None:
+        """
+        Nets and submits the signals collected for a symbol, or for every symbol.
+        """
+        symbols = list(self._pending) if symbol is None else [symbol]
+        for symbol in symbols:
+            timer = self._timers.pop(symbol, None)
+            if timer is not None:
+                timer.cancel()
+            children = self._pending.pop(symbol, None)
+            if children:
+                self._net(symbol, children)
+
+    def _net(self, symbol: str, children: List[NettedOrderHandle]) -> None:
+        group = _NetGroup(symbol, children, self._reference_price(symbol, children))
+        self.stats['crossed_quantity'] += sum(group.crossed.values()) / 2
+        if not group.parent_quantity:
+            self._finish(group, Confirmation('SUCCESS', 'Order filled internally'))
+            return
+
+        parent_order = self.order_manager.create_order(
+            StockSignal(symbol, 'BUY' if group.side > 0 else 'SELL', group.parent_quantity, 'MARKET', group.reference_price)
+        )
+        parent = self.order_manager.submit_orders([parent_order])[0]
+        self.stats['parent_orders'] += 1
+        group.parent = parent
+        for child in children:
+            child.parent = parent
+        if parent.trade is None:
+            self._finish(group, parent.confirmation)
+            return
+        self._groups[parent.trade.order.orderId] = group
+        # Updates may already have arrived, e.g. from a simulated or paper connection
+        for fill in parent.trade.fills:
+            self._on_exec_details(parent.trade, fill)
+        self._on_order_status(parent.trade)
+
+    def _reference_price(self, symbol: str, children: List[NettedOrderHandle]) -> float:
+        if self.price_source is not None:
+            return self.price_source(symbol)
+        prices = [child.order.price for child in children if child.order.price]
+        return sum(prices) / len(prices) if prices else 0.0
+
+    def _on_exec_details(self, trade: Trade, fill: Fill) -> None:
+        """
+        Allocates a fill of a parent order to the strategies it was netted from.
+        """
+        group = self._groups.get(trade.order.orderId)
+        if group is None:
+            return
+        shares = fill.execution.shares
+        price = fill.execution.price
+        group.parent_filled += shares
+        group.parent_cost += shares * price
+
+        # Allocate the cumulative fill and hand out the difference, so rounding never drifts
+        targets = allocate(min(group.parent_filled, group.parent_quantity), group.remainders)
+        for index, (child, target) in enumerate(zip(group.takers, targets)):
+            quantity = target - group.allocated[index]
+            if quantity:
+                group.allocated[index] = target
+                signed = quantity * group.side
+                child._allocate(signed, price)
+                self._report(child, signed, price)
+                if group.allocated[index] == group.remainders[index] and not group.crossed[id(child)]:
+                    child._resolve(Confirmation('SUCCESS', 'Order filled'), final=True)
+
+    def _on_order_status(self, trade: Trade) -> None:
+        """
+        Completes a group once its parent order is done.
+        """
+        if trade.orderStatus.status not in FINAL_STATUSES:
+            return
+        group = self._groups.pop(trade.order.orderId, None)
+        if group is None:
+            return
+        self._finish(group, group.parent.confirmation)
+
+    def _finish(self, group: _NetGroup, confirmation: Confirmation) -> None:
+        """
+        Books the crossed quantities and resolves every child that isn't complete yet.
+        """
+        price = group.parent_cost / group.parent_filled if group.parent_filled else group.reference_price
+        group.cross(price)
+        for child in group.children:
+            crossed = group.crossed[id(child)]
+            if crossed:
+                self._report(child, math.copysign(crossed, child.order.quantity), price)
+            if child.filled == child.order.quantity:
+                child._resolve(Confirmation('SUCCESS', 'Order filled'), final=True)
+            else:
+                child._resolve(confirmation, final=True)
+
+    def _report(self, child: NettedOrderHandle, quantity: float, price: float) -> None:
+        if self.metrics is not None:
+            self.metrics.on_fill(child.order.symbol, quantity, price, strategy=child.strategy)
+
+def allocate(total: float, weights: List[float]) -> List[float]:
+    """
+    Splits a whole number of units pro rata to weights with the largest remainder method.
+
+    Every share is a whole number, the shares add up to the total, and no share exceeds its weight
+    when the total is at most the sum of the weights. Ties go to the earlier weight.
+
+    Parameters:
+        total (float): The number of units to split.
+        weights (List[float]): The weights, e.g. the quantities each party asked for.
+
+    Returns:
+        List[float]: One share per weight.
+
+    Raises:
+        ValueError: If the total isn't a whole number.
+    """
+    if not float(total).is_integer():
+        raise ValueError(f"Can only allocate whole units, got {total}")
+    weight_sum = sum(weights)
+    if not weight_sum or total <= 0:
+        return [0.0] * len(weights)
+    quotas = [total * weight / weight_sum for weight in weights]
+    shares = [float(math.floor(quota)) for quota in quotas]
+    leftover = int(total - sum(shares))
+    if leftover:
+        order = sorted(range(len(weights)), key=lambda i: shares[i] - quotas[i])
+        for i in order[:leftover]:
+            shares[i] += 1
+    return shares
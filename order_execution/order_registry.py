@@ -0,0 +1,116 @@
+from typing import Dict, List, Optional
+
+from ib_insync import IB, Trade
+from ib_insync.order import OrderStatus
+
+from entities.order import Order
+
+# Statuses after which an order will receive no further updates
+FINAL_STATUSES = OrderStatus.DoneStates | {'Inactive'}
+
+class OrderRegistry:
+    """
+    An in-memory index of the session's orders, kept up to date from ib_insync events.
+
+    Trades are indexed by IB order id and by our own Order.order_id, and the open ones are tracked
+    separately, so every lookup is O(1) instead of a scan over ib.trades() or ib.orders().
+
+    Attributes:
+        ib (IB): The connection whose events keep the registry current.
+    """
+
+    def __init__(self, ib: IB):
+        """
+        Seeds the registry with the trades the connection already knows about and subscribes to
+        its order events.
+
+        Parameters:
+            ib (IB): The connection to track.
+        """
+        self.ib = ib
+        self._trades: Dict[int, Trade] = {}  # IB order id -> trade
+        self._open: Dict[int, Trade] = {}  # IB order id -> trade, for active orders only
+        self._orders: Dict[int, Order] = {}  # IB order id -> our order
+        self._ib_ids: Dict[object, int] = {}  # Our order id -> IB order id
+
+        for trade in ib.trades():
+            self._track(trade)
+        ib.newOrderEvent += self._track
+        ib.openOrderEvent += self._track
+        ib.orderModifyEvent += self._track
+        ib.orderStatusEvent += self._track
+        ib.cancelOrderEvent += self._track
+
+    def register(self, order: Order, trade: Trade) -> None:
+        """
+        Links one of our orders to the IB trade that was placed for it.
+
+        Parameters:
+            order (Order): Our order. Its order_id must already be set.
+            trade (Trade): The trade returned by ib.placeOrder.
+        """
+        ib_order_id = trade.order.orderId
+        self._orders[ib_order_id] = order
+        self._ib_ids[order.order_id] = ib_order_id
+        self._track(trade)
+
+    def trade_for(self, order: Order) -> Optional[Trade]:
+        """
+        Returns the IB trade for one of our orders, or None if it isn't known.
+
+        Orders converted from IB orders carry the IB order id as their order_id, so those are
+        found too.
+
+        Parameters:
+            order (Order): The order to look up.
+        """
+        ib_order_id = self._ib_ids.get(order.order_id, order.order_id)
+        return self._trades.get(ib_order_id)
+
+    def trade_for_id(self, ib_order_id: int) -> Optional[Trade]:
+        """
+        Returns the IB trade with the given IB order id, or None if it isn't known.
+
+        Parameters:
+            ib_order_id (int): The IB order id.
+        """
+        return self._trades.get(ib_order_id)
+
+    def order_for_id(self, ib_order_id: int) -> Optional[Order]:
+        """
+        Returns our order for an IB order id, or None if it wasn't placed through us.
+
+        Parameters:
+            ib_order_id (int): The IB order id.
+        """
+        return self._orders.get(ib_order_id)
+
+    def open_trades(self) -> List[Trade]:
+        """
+        Returns the trades whose orders are still working, in the order they were first seen.
+        """
+        return list(self._open.values())
+
+    def relink(self, old_order: Order, new_order: Order) -> None:
+        """
+        Points a new order at the IB trade of an order it replaces through in-place modification.
+
+        Parameters:
+            old_order (Order): The order that was modified.
+            new_order (Order): The order describing its new parameters.
+        """
+        ib_order_id = self._ib_ids.pop(old_order.order_id, old_order.order_id)
+        new_order.order_id = old_order.order_id
+        self._ib_ids[new_order.order_id] = ib_order_id
+        self._orders[ib_order_id] = new_order
+
+    def _track(self, trade: Trade) -> None:
+        """
+        Records a trade from any order event and updates whether it is open.
+        """
+        ib_order_id = trade.order.orderId
+        self._trades[ib_order_id] = trade
+        if trade.orderStatus.status in FINAL_STATUSES:
+            self._open.pop(ib_order_id, None)
+        else:
+            self._open[ib_order_id] = trade
@@ -0,0 +1,756 @@
+import asyncio
+import heapq
+import math
+from collections import deque
+from time import perf_counter_ns
+from typing import Deque, Dict, List, Optional, Tuple, Union
+
+from eventkit import Event
+from ib_insync import CommissionReport, Contract, Execution, Fill, Option, Stock, Ticker
+from ib_insync.order import OrderStatus
+
+from application.connection_manager import ConnectionManager
+from application.latency_tracing import tracer
+from entities.confirmation import Confirmation
+from entities.option_order import OptionOrder
+from entities.order import Order
+from entities.position import Position
+from entities.status import Status
+from entities.stock_order import StockOrder
+from order_execution.broker_integration import OrderHandle, _confirmation_from_status
+from order_execution.order_registry import FINAL_STATUSES, OrderRegistry
+from risk_management.pre_trade_risk import OPTION_MULTIPLIER
+from data_management.tick_store import EPOCH, ONE_MICROSECOND
+
+# IB tick types that report a trade
+TRADE_TICK_TYPES = frozenset((4, 48, 68, 77))
+
+INFINITY = float('inf')
+
+class SlippageModel:
+    """
+    Moves market order fills against the order by a fixed fraction of the price plus a fixed
+    amount per share.
+
+    Attributes:
+        bps (float): The slippage in basis points of the price.
+        per_share (float): The slippage in currency per share.
+    """
+
+    def __init__(self, bps: float = 0.0, per_share: float = 0.0):
+        self.bps = bps
+        self.per_share = per_share
+
+    def adjust(self, price: float, quantity: float) -> float:
+        """
+        Returns the fill price of a market order for a signed quantity at a reference price.
+        """
+        offset = price * self.bps / 10_000 + self.per_share
+        return price + offset if quantity > 0 else price - offset
+
+class CommissionModel:
+    """
+    Charges a fee per share with a minimum and a maximum per order, like IB's fixed pricing.
+
+    The fee is computed on an order's cumulative fills, so an order filled in parts pays the
+    same as one filled at once.
+
+    Attributes:
+        per_share (float): The fee per share, or per contract.
+        minimum (float): The smallest fee per order.
+        maximum_rate (float): The largest fee per order, as a fraction of its value. 0 for no cap.
+    """
+
+    def __init__(self, per_share: float = 0.005, minimum: float = 1.0, maximum_rate: float = 0.01):
+        self.per_share = per_share
+        self.minimum = minimum
+        self.maximum_rate = maximum_rate
+
+    def commission(self, quantity: float, notional: float) -> float:
+        """
+        Returns the fee for an order that has filled a quantity worth a notional value so far.
+        """
+        fee = max(abs(quantity) * self.per_share, self.minimum)
+        if self.maximum_rate:
+            fee = min(fee, abs(notional) * self.maximum_rate)
+        return fee
+
+class SimulatedOrder:
+    """
+    An order resting in, or working against, the simulated books. The fields mirror the
+    ib_insync Order fields that order event listeners read.
+    """
+
+    __slots__ = ('orderId', 'action', 'totalQuantity', 'orderType', 'lmtPrice', 'key', 'side', 'seq',
+                 'remaining', 'notional', 'commission')
+
+    def __init__(self, order_id: int, key: str, quantity: float, order_type: str, limit: float):
+        self.orderId = order_id
+        self.key = key
+        self.side = 1 if quantity > 0 else -1
+        self.action = 'BUY' if quantity > 0 else 'SELL'
+        self.totalQuantity = abs(quantity)
+        self.orderType = order_type
+        self.lmtPrice = limit
+        self.seq = 0
+        self.remaining = abs(quantity)
+        self.notional = 0.0
+        self.commission = 0.0
+
+class SimulatedTrade:
+    """
+    The simulated counterpart of an ib_insync Trade: the order, its contract, status and fills.
+    """
+
+    __slots__ = ('contract', 'order', 'orderStatus', 'fills')
+
+    def __init__(self, contract: Contract, order: SimulatedOrder):
+        self.contract = contract
+        self.order = order
+        self.orderStatus = OrderStatus(orderId=order.orderId, status='PendingSubmit', remaining=order.totalQuantity)
+        self.fills: List[Fill] = []
+
+    def isActive(self) -> bool:
+        return self.orderStatus.status in OrderStatus.ActiveStates
+
+    def isDone(self) -> bool:
+        return self.orderStatus.status in OrderStatus.DoneStates
+
+    def filled(self) -> float:
+        return self.orderStatus.filled
+
+    def remaining(self) -> float:
+        return self.orderStatus.remaining
+
+class SimulatedIB:
+    """
+    The order event and query surface of an ib_insync.IB for a SimulatedBroker.
+
+    Components that listen to `broker.connection.ib`, like OrderRegistry, the pre-trade risk gate
+    in OrderManagement and OrderNetting, get the same events from the simulation as from IB.
+    """
+
+    def __init__(self, broker: 'SimulatedBroker'):
+        self._broker = broker
+        self.newOrderEvent = Event('newOrderEvent')
+        self.openOrderEvent = Event('openOrderEvent')
+        self.orderModifyEvent = Event('orderModifyEvent')
+        self.orderStatusEvent = Event('orderStatusEvent')
+        self.cancelOrderEvent = Event('cancelOrderEvent')
+        self.execDetailsEvent = Event('execDetailsEvent')
+
+    def isConnected(self) -> bool:
+        return True
+
+    def trades(self) -> List[SimulatedTrade]:
+        return list(self._broker.trades.values())
+
+    def openTrades(self) -> List[SimulatedTrade]:
+        return self._broker.registry.open_trades()
+
+    def waitOnUpdate(self, timeout: float = 0) -> bool:
+        # Every update is applied synchronously, so there is never anything to wait for
+        return True
+
+class _Book:
+    """
+    The working orders and latest prices of one instrument.
+
+    Resting limit orders are kept in two heaps of (price key, sequence, trade), best price and
+    then earliest first. Cancelled and modified orders are left in place and skipped when they
+    reach the top, and the heaps are rebuilt once most of their entries are stale.
+    """
+
+    __slots__ = ('key', 'contract', 'multiplier', 'bids', 'asks', 'market', 'bid', 'ask', 'last',
+                 'bid_size', 'ask_size', 'last_size', 'available', 'bars', 'stale')
+
+    def __init__(self, key: str, contract: Contract, multiplier: int):
+        self.key = key
+        self.contract = contract
+        self.multiplier = multiplier
+        self.bids: List[Tuple[float, int, SimulatedTrade]] = []
+        self.asks: List[Tuple[float, int, SimulatedTrade]] = []
+        self.market: Dict[int, Deque[Tuple[int, SimulatedTrade]]] = {1: deque(), -1: deque()}
+        self.bid = self.ask = self.last = math.nan
+        self.bid_size = self.ask_size = self.last_size = math.nan
+        self.available = {1: INFINITY, -1: INFINITY}  # Liquidity left at the quote since the last update
+        self.bars = False  # Whether prices come from bars, so market orders wait for the next open
+        self.stale = 0
+
+class SimulatedBroker:
+    """
+    An in-process matching engine with the interface of BrokerIntegration, for backtests, replays
+    and paper trading without IB.
+
+    Orders are matched against the market data passed to on_tick(), on_bar() or
+    on_pending_tickers(), never against each other:
+
+        - Market orders fill at the ask (buys) or bid (sells), or the last price without a quote,
+          moved by the slippage model. After bars they wait for the next bar's open.
+        - Limit orders fill at the quote once it reaches their limit, or at their limit once a
+          trade prints through it. Against bars they fill at the open if it is at or better than
+          their limit, or at their limit if the bar trades through it.
+
+    With a participation rate, each update only offers that fraction of the quote size, trade size
+    or bar volume, and orders fill partially in price-time priority. Commissions follow the
+    commission model and are charged on each fill.
+
+    Positions and cash are kept per instrument. Option orders trade instruments keyed like
+    PreTradeRiskGate.instrument_key(), e.g. 'AAPL 20261120 150 C', which their prices must be
+    fed under.
+
+    Attributes:
+        connection (ConnectionManager): Wraps a SimulatedIB, so listeners attach as they would to IB.
+        registry (OrderRegistry): An index of the session's orders.
+        slippage (SlippageModel): Moves market order fills.
+        commissions (CommissionModel): Computes the fee on each fill.
+        participation (float, optional): The fraction of displayed or traded size orders may take
+                                         per update. None fills any quantity at once.
+        cash (float): The cash balance.
+        realized_pnl (float): The profit or loss booked on closed quantities, before commissions.
+        commission_paid (float): The commissions paid.
+        trades (Dict[int, SimulatedTrade]): Every order placed, by order id.
+    """
+
+    def __init__(
+        self,
+        cash: float = 100_000.0,
+        slippage: Optional[SlippageModel] = None,
+        commissions: Optional[CommissionModel] = None,
+        participation: Optional[float] = None,
+    ):
+        """
+        Parameters:
+            cash (float): The starting cash balance.
+            slippage (SlippageModel, optional): Defaults to no slippage.
+            commissions (CommissionModel, optional): Defaults to IB's fixed pricing for US stocks.
+            participation (float, optional): The fraction of displayed or traded size orders may
+                                             take per update. Defaults to unlimited.
+        """
+        self.slippage = slippage if slippage is not None else SlippageModel()
+        self.commissions = commissions if commissions is not None else CommissionModel()
+        self.participation = participation
+        self.cash = cash
+        self.realized_pnl = 0.0
+        self.commission_paid = 0.0
+        self.trades: Dict[int, SimulatedTrade] = {}
+        self.positions: Dict[str, Position] = {}  # Instrument key -> quantity and average price
+        self.time = EPOCH
+        self._books: Dict[str, _Book] = {}
+        self._handles: Dict[int, OrderHandle] = {}
+        self._next_id = 1
+        self._seq = 0
+        self._ib = SimulatedIB(self)
+        self.connection = ConnectionManager(ib=self._ib)
+        self.registry = OrderRegistry(self._ib)
+
+    @property
+    def ib(self) -> SimulatedIB:
+        return self._ib
+
+    # Market data
+
+    def on_tick(
+        self,
+        symbol: str,
+        bid: float = math.nan,
+        ask: float = math.nan,
+        last: float = math.nan,
+        size: float = 0.0,
+        bid_size: float = math.nan,
+        ask_size: float = math.nan,
+        timestamp: Optional[int] = None,
+    ) -> None:
+        """
+        Updates an instrument's prices and fills the orders they reach.
+
+        Parameters:
+            symbol (str): The instrument key.
+            bid (float): The bid, or NaN if unchanged.
+            ask (float): The ask, or NaN if unchanged.
+            last (float): The price of a trade, or NaN if there wasn't one.
+            size (float): The size of the trade.
+            bid_size (float): The size at the bid, or NaN if unknown.
+            ask_size (float): The size at the ask, or NaN if unknown.
+            timestamp (int, optional): The time of the update, in nanoseconds since the epoch.
+        """
+        book = self._book(symbol)
+        if timestamp is not None:
+            self.time = EPOCH + ONE_MICROSECOND * (timestamp // 1000)
+        book.bars = False
+        if bid > 0:
+            book.bid = bid
+        if ask > 0:
+            book.ask = ask
+        if bid_size == bid_size:
+            book.bid_size = bid_size
+        if ask_size == ask_size:
+            book.ask_size = ask_size
+        book.available[1] = self._liquidity(book.ask_size)
+        book.available[-1] = self._liquidity(book.bid_size)
+        traded = last > 0 and size > 0
+        if traded:
+            book.last = last
+            book.last_size = size
+        self._match_quote(book, 1)
+        self._match_quote(book, -1)
+        if traded:
+            through = self._liquidity(size)
+            self._fill_limits(book, 1, last, False, True, through)
+            self._fill_limits(book, -1, last, False, True, through)
+
+    def on_bar(
+        self,
+        symbol: str,
+        open: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: float = math.nan,
+        timestamp: Optional[int] = None,
+    ) -> None:
+        """
+        Fills the orders an instrument's bar reaches, then waits for the next bar.
+
+        Parameters:
+            symbol (str): The instrument key.
+            open (float): The open price.
+            high (float): The high price.
+            low (float): The low price.
+            close (float): The close price.
+            volume (float): The volume traded, which limits fills with a participation rate.
+            timestamp (int, optional): The start of the bar, in nanoseconds since the epoch.
+        """
+        book = self._book(symbol)
+        if timestamp is not None:
+            self.time = EPOCH + ONE_MICROSECOND * (timestamp // 1000)
+        for side, touch in ((1, low), (-1, high)):
+            available = self._liquidity(volume)
+            available = self._fill_market(book, side, open, available)
+            available = self._fill_limits(book, side, open, True, False, available)
+            self._fill_limits(book, side, touch, False, True, available)
+        book.bars = True
+        book.last = close
+        book.bid = book.ask = math.nan
+
+    def on_pending_tickers(self, tickers: List[Ticker]) -> None:
+        """
+        Applies a pendingTickersEvent, e.g. from a MarketReplay or a live connection when paper trading.
+        """
+        for ticker in tickers:
+            contract = ticker.contract
+            if contract.secType == 'OPT':
+                key = _option_key(contract.symbol, contract.lastTradeDateOrContractMonth, contract.strike, contract.right)
+            else:
+                key = contract.symbol
+            traded = any(tick.tickType in TRADE_TICK_TYPES for tick in ticker.ticks)
+            time = ticker.time
+            self.on_tick(
+                key,
+                ticker.bid,
+                ticker.ask,
+                ticker.last if traded else math.nan,
+                ticker.lastSize if traded else 0.0,
+                ticker.bidSize,
+                ticker.askSize,
+                (time - EPOCH) // ONE_MICROSECOND * 1000 if time is not None else None,
+            )
+
+    # BrokerIntegration interface
+
+    def execute_order(self, order: Order, timeout: float = 2) -> Confirmation:
+        """
+        Executes an order and returns its Confirmation. Orders are acknowledged at once, so the
+        timeout is only accepted for compatibility with BrokerIntegration.
+        """
+        return self.submit_orders([order])[0].confirmation
+
+    def submit_orders(self, orders: List[Order], strategy: Optional[str] = None) -> List[OrderHandle]:
+        """
+        Places every order, filling those the current prices reach straight away.
+
+        Each order's order_id is set to its simulated order id if it doesn't have one yet.
+        As in BrokerIntegration, `strategy` names the strategy the orders' latencies are recorded under.
+
+        Returns:
+            List[OrderHandle]: One handle per order, in the same order.
+        """
+        return [self._place(order, strategy) for order in orders]
+
+    async def execute_orders_async(self, orders: List[Order], timeout: float = 2) -> List[Confirmation]:
+        """
+        Places every order and returns their Confirmations.
+        """
+        handles = self.submit_orders(orders)
+        pending = [handle.acknowledged for handle in handles if not handle.acknowledged.done()]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+        return [handle.confirmation for handle in handles]
+
+    def qualify_options(self, orders: List[Order]) -> None:
+        """
+        Does nothing: simulated option contracts are built from the order, so there is nothing to qualify.
+        """
+
+    async def qualify_options_async(self, orders: List[Order]) -> None:
+        """
+        Does nothing, like qualify_options().
+        """
+
+    def query_open_orders(self) -> List[Order]:
+        """
+        Returns the orders that are still working.
+        """
+        return [self.registry.order_for_id(trade.order.orderId) for trade in self.registry.open_trades()]
+
+    def query_order_status(self, order: Order) -> Status:
+        """
+        Returns the status of an order placed in this session.
+        """
+        trade = self.registry.trade_for(order)
+        if trade is not None:
+            return Status(order.order_id, trade.orderStatus.status)
+        return Status(order_id="", status_type="FAILED")
+
+    def query_positions(self) -> List[Position]:
+        """
+        Returns the open positions, with their average cost per contract.
+        """
+        positions = []
+        for key, position in self.positions.items():
+            if position.quantity:
+                multiplier = self._books[key].multiplier
+                positions.append(Position(key, position.quantity, position.price * multiplier))
+        return positions
+
+    def query_account_details(self) -> Dict:
+        """
+        Returns the account values, as strings keyed by IB account tags.
+        """
+        gross = unrealized = 0.0
+        net = self.cash
+        for key, position in self.positions.items():
+            if not position.quantity:
+                continue
+            book = self._books[key]
+            mark = book.last if book.last == book.last else position.price
+            value = position.quantity * mark * book.multiplier
+            gross += abs(value)
+            net += value
+            unrealized += (mark - position.price) * position.quantity * book.multiplier
+        values = {
+            'TotalCashValue': self.cash,
+            'NetLiquidation': net,
+            'GrossPositionValue': gross,
+            'RealizedPnL': self.realized_pnl,
+            'UnrealizedPnL': unrealized,
+            'Commissions': self.commission_paid,
+        }
+        return {tag: f"{value:.2f}" for tag, value in values.items()}
+
+    def cancel_order(self, order: Order) -> Confirmation:
+        """
+        Cancels a working order.
+        """
+        trade = self.registry.trade_for(order)
+        if trade is None:
+            return Confirmation('ERROR', 'Order not found')
+        if trade.orderStatus.status in FINAL_STATUSES:
+            return Confirmation('ERROR', 'Order already finished')
+        self._withdraw(trade)
+        self._set_status(trade, 'Cancelled')
+        self._ib.cancelOrderEvent.emit(trade)
+        return Confirmation('SUCCESS', 'Order cancelled')
+
+    def modify_order(self, old_order: Order, new_order: Order) -> Confirmation:
+        """
+        Modifies a working order in place if it trades the same instrument with the same order
+        type, losing its time priority. Otherwise the old order is cancelled and the new one placed.
+        """
+        trade = self.registry.trade_for(old_order)
+        prepared = self._prepare(new_order)
+        if isinstance(prepared, Confirmation):
+            return prepared
+        key, order_type, limit = prepared
+
+        if trade is not None and trade.isActive() and trade.order.key == key and trade.order.orderType == order_type:
+            sim_order = trade.order
+            filled = trade.orderStatus.filled
+            if abs(new_order.quantity) <= filled:
+                return Confirmation('ERROR', 'Quantity below filled quantity')
+            side = 1 if new_order.quantity > 0 else -1
+            requeue = order_type == 'LMT' or side != sim_order.side
+            if requeue:
+                self._withdraw(trade)
+            sim_order.side = side
+            sim_order.action = 'BUY' if side > 0 else 'SELL'
+            sim_order.totalQuantity = abs(new_order.quantity)
+            sim_order.lmtPrice = limit
+            sim_order.remaining = sim_order.totalQuantity - filled
+            trade.orderStatus.remaining = sim_order.remaining
+            self.registry.relink(old_order, new_order)
+            self._ib.orderModifyEvent.emit(trade)
+            book = self._books[key]
+            if requeue:
+                self._work(book, trade)
+            elif not book.bars:
+                self._match_quote(book, side)
+            return Confirmation('SUCCESS', 'Order modified')
+
+        self.cancel_order(old_order)
+        return self.execute_order(new_order)
+
+    # Matching
+
+    def _place(self, order: Order, strategy: Optional[str] = None) -> OrderHandle:
+        start = perf_counter_ns() if tracer.enabled else 0
+        prepared = self._prepare(order)
+        if isinstance(prepared, Confirmation):
+            return OrderHandle.rejected(order, prepared, strategy)
+        key, order_type, limit = prepared
+        book = self._book(key)
+
+        order_id = self._next_id
+        self._next_id += 1
+        if order.order_id is None:
+            order.order_id = order_id
+        trade = SimulatedTrade(book.contract, SimulatedOrder(order_id, key, order.quantity, order_type, limit))
+        self.trades[order_id] = trade
+        self.registry.register(order, trade)
+        handle = OrderHandle(order, trade, strategy)
+        if tracer.enabled:
+            handle.submitted_ns = tracer.record('place_order', start, strategy)
+        self._handles[order_id] = handle
+        self._ib.newOrderEvent.emit(trade)
+        self._set_status(trade, 'Submitted')
+        self._work(book, trade)
+        return handle
+
+    def _prepare(self, order: Order) -> Union[Tuple[str, str, float], Confirmation]:
+        """
+        Validates an order and returns its instrument key, IB order type and limit price.
+        """
+        if isinstance(order, StockOrder):
+            key = order.symbol
+        elif isinstance(order, OptionOrder):
+            key = _option_key(order.symbol, order.expiry, order.strike, order.option_type)
+        else:
+            return Confirmation('ERROR', 'Unsupported order type')
+        if not order.quantity:
+            return Confirmation('ERROR', 'Order quantity is zero')
+        if order.order_type == 'MARKET':
+            return key, 'MKT', 0.0
+        if order.order_type == 'LIMIT':
+            if not order.price or order.price <= 0:
+                return Confirmation('ERROR', 'Limit order without a limit price')
+            return key, 'LMT', order.price
+        return Confirmation('ERROR', 'Invalid order type')
+
+    def _work(self, book: _Book, trade: SimulatedTrade) -> None:
+        """
+        Queues a new or modified order and fills whatever the current prices allow.
+        """
+        order = trade.order
+        self._seq += 1
+        order.seq = self._seq
+        if order.orderType == 'MKT':
+            book.market[order.side].append((order.seq, trade))
+        elif order.side > 0:
+            heapq.heappush(book.bids, (-order.lmtPrice, order.seq, trade))
+        else:
+            heapq.heappush(book.asks, (order.lmtPrice, order.seq, trade))
+        if not book.bars:
+            self._match_quote(book, order.side)
+
+    def _match_quote(self, book: _Book, side: int) -> None:
+        """
+        Fills one side's market orders and crossing limit orders against the quote.
+        """
+        quote = book.ask if side > 0 else book.bid
+        reference = quote if quote == quote else book.last
+        available = book.available[side]
+        if reference == reference:
+            available = self._fill_market(book, side, reference, available)
+        if quote == quote:
+            available = self._fill_limits(book, side, quote, True, False, available)
+        book.available[side] = available
+
+    def _fill_market(self, book: _Book, side: int, price: float, available: float) -> float:
+        """
+        Fills one side's market orders in time priority at a reference price.
+
+        Returns:
+            float: The liquidity left.
+        """
+        queue = book.market[side]
+        while queue and available > 0:
+            seq, trade = queue[0]
+            order = trade.order
+            if order.seq != seq or order.remaining <= 0:
+                queue.popleft()
+                continue
+            quantity = min(order.remaining, available)
+            if quantity < 1 and quantity < order.remaining:
+                break
+            self._fill(book, trade, quantity, self.slippage.adjust(price, side))
+            available -= quantity
+            if order.remaining <= 0:
+                queue.popleft()
+        return available
+
+    def _fill_limits(self, book: _Book, side: int, price: float, inclusive: bool, at_limit: bool, available: float) -> float:
+        """
+        Fills one side's limit orders, best first, while their limit reaches a price.
+
+        Parameters:
+            book (_Book): The instrument's book.
+            side (int): 1 for buy orders, -1 for sell orders.
+            price (float): The price the market reached.
+            inclusive (bool): Whether limits equal to the price fill.
+            at_limit (bool): Whether orders fill at their limit rather than at the price.
+            available (float): The liquidity on offer.
+
+        Returns:
+            float: The liquidity left.
+        """
+        heap = book.bids if side > 0 else book.asks
+        while heap and available > 0:
+            _, seq, trade = heap[0]
+            order = trade.order
+            if order.seq != seq or order.remaining <= 0:
+                heapq.heappop(heap)
+                book.stale -= 1
+                continue
+            limit = order.lmtPrice
+            gap = (limit - price) * side
+            if gap < 0 or (gap == 0 and not inclusive):
+                break
+            quantity = min(order.remaining, available)
+            if quantity < 1 and quantity < order.remaining:
+                break
+            self._fill(book, trade, quantity, limit if at_limit else price)
+            available -= quantity
+            if order.remaining <= 0:
+                heapq.heappop(heap)
+        return available
+
+    def _withdraw(self, trade: SimulatedTrade) -> None:
+        """
+        Takes an order out of its book. Queue and heap entries are left behind and skipped later.
+        """
+        order = trade.order
+        if order.orderType == 'LMT':
+            book = self._books[order.key]
+            book.stale += 1
+            heap_size = len(book.bids) + len(book.asks)
+            if book.stale > 1024 and book.stale * 2 > heap_size:
+                self._compact(book, trade)
+        order.seq = -1
+
+    def _compact(self, book: _Book, withdrawn: SimulatedTrade) -> None:
+        """
+        Rebuilds an instrument's heaps without their stale entries.
+        """
+        for name in ('bids', 'asks'):
+            heap = [entry for entry in getattr(book, name)
+                    if entry[2] is not withdrawn and entry[2].order.seq == entry[1] and entry[2].order.remaining > 0]
+            heapq.heapify(heap)
+            setattr(book, name, heap)
+        book.stale = 0
+
+    def _fill(self, book: _Book, trade: SimulatedTrade, quantity: float, price: float) -> None:
+        """
+        Books a fill: updates the order, position and cash, and emits the execution.
+        """
+        order = trade.order
+        order.remaining -= quantity
+        order.notional += quantity * price * book.multiplier
+        status = trade.orderStatus
+        filled = status.filled + quantity
+        status.avgFillPrice = (status.avgFillPrice * status.filled + price * quantity) / filled
+        status.filled = filled
+        status.remaining = order.remaining
+        commission = self.commissions.commission(filled, order.notional) - order.commission
+        order.commission += commission
+        signed = quantity * order.side
+        self._book_position(book, signed, price, commission)
+
+        exec_id = f"{order.orderId}.{len(trade.fills) + 1}"
+        fill = Fill(
+            book.contract,
+            Execution(
+                execId=exec_id,
+                time=self.time,
+                side='BOT' if order.side > 0 else 'SLD',
+                shares=quantity,
+                price=price,
+                orderId=order.orderId,
+                cumQty=filled,
+                avgPrice=status.avgFillPrice,
+            ),
+            CommissionReport(execId=exec_id, commission=commission, currency='USD'),
+            self.time,
+        )
+        trade.fills.append(fill)
+        self._ib.execDetailsEvent.emit(trade, fill)
+        self._set_status(trade, 'Filled' if order.remaining <= 0 else 'Submitted')
+
+    def _book_position(self, book: _Book, quantity: float, price: float, commission: float) -> None:
+        multiplier = book.multiplier
+        self.cash -= quantity * price * multiplier + commission
+        self.commission_paid += commission
+        position = self.positions.get(book.key)
+        if position is None:
+            position = self.positions[book.key] = Position(book.key, 0, 0.0)
+        held = position.quantity
+        if held == 0 or (held > 0) == (quantity > 0):
+            position.price = (position.price * held + price * quantity) / (held + quantity)
+        else:
+            closed = min(abs(quantity), abs(held))
+            self.realized_pnl += (price - position.price) * closed * (1 if held > 0 else -1) * multiplier
+            if abs(quantity) > abs(held):
+                position.price = price  # The position flipped, so the rest opens at this price
+        position.quantity = held + quantity
+        if position.quantity == 0:
+            position.price = 0.0
+
+    def _set_status(self, trade: SimulatedTrade, status: str) -> None:
+        """
+        Updates an order's status, emits it, and resolves its handle.
+        """
+        trade.orderStatus.status = status
+        self._ib.orderStatusEvent.emit(trade)
+        handle = self._handles.get(trade.order.orderId)
+        if handle is None:
+            return
+        final = status in FINAL_STATUSES
+        handle._resolve(_confirmation_from_status(status), final)
+        if final:
+            del self._handles[trade.order.orderId]
+
+    def _book(self, key: str) -> _Book:
+        book = self._books.get(key)
+        if book is None:
+            parts = key.split(' ')
+            if len(parts) == 4:
+                symbol, expiry, strike, right = parts
+                contract = Option(symbol, expiry, float(strike), right, 'SMART', currency='USD')
+                book = _Book(key, contract, OPTION_MULTIPLIER)
+            else:
+                book = _Book(key, Stock(key, 'SMART', 'USD'), 1)
+            self._books[key] = book
+        return book
+
+    def _liquidity(self, size: float) -> float:
+        """
+        Returns the quantity orders may take from a displayed or traded size.
+        """
+        if self.participation is None or not size == size:
+            return INFINITY
+        return math.floor(size * self.participation)
+
+def _option_key(symbol: str, expiry: str, strike: float, right: str) -> str:
+    """
+    Returns the instrument key of an option, in the format PreTradeRiskGate uses.
+    """
+    return f"{symbol} {expiry} {strike:g} {right}"
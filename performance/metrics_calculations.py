@@ -1,18 +1,193 @@
-from typing import Dict, List
+import math
+from typing import Dict, List, Optional, Set
+
+import numpy as np
 from pandas import DataFrame
 
 from entities.order import Order
 from entities.trade import Trade
+from performance.streaming_metrics import StreamingMetrics, annualized_ratio
 
-# TODO: Implement this class
 class MetricsCalculation:
-    def __init__(self):
+    """
+    Keeps streaming performance metrics per strategy, and computes the same metrics in batch.
+
+    Live fills and marks are fed to on_fill() and on_mark() as they arrive, each in constant time
+    per strategy, so taking a snapshot never rescans the trade history. calculate_backtest_metrics()
+    computes the same metrics with array operations over a CustomBacktester results frame.
+
+    Attributes:
+        initial_capital (float): The starting equity of each strategy.
+        window (int, optional): The number of most recent returns used for the Sharpe and Sortino ratios.
+        periods_per_year (int): The number of periods per year, used to annualize the ratios.
+        strategies (Dict[str, StreamingMetrics]): The metrics of each strategy, by name.
+    """
+
+    DEFAULT_STRATEGY = 'default'
+
+    def __init__(self, initial_capital: float = 100_000.0, window: Optional[int] = None, periods_per_year: int = 252):
+        self.initial_capital = initial_capital
+        self.window = window
+        self.periods_per_year = periods_per_year
+        self.strategies: Dict[str, StreamingMetrics] = {}
+        self._holders: Dict[str, Set[str]] = {}
         self.metrics = None
 
+    def strategy(self, name: str = DEFAULT_STRATEGY) -> StreamingMetrics:
+        """
+        Returns the metrics of a strategy, starting them on first use.
+        """
+        metrics = self.strategies.get(name)
+        if metrics is None:
+            metrics = self.strategies[name] = StreamingMetrics(self.initial_capital, self.window, self.periods_per_year)
+        return metrics
+
+    def on_fill(self, symbol: str, quantity: float, price: float, commission: float = 0.0, strategy: str = DEFAULT_STRATEGY) -> None:
+        """
+        Books a fill for a strategy. See StreamingMetrics.on_fill().
+        """
+        self.strategy(strategy).on_fill(symbol, quantity, price, commission)
+        self._holders.setdefault(symbol, set()).add(strategy)
+
+    def on_mark(self, symbol: str, price: float) -> None:
+        """
+        Revalues every strategy that has traded a symbol at a new price.
+        """
+        for name in self._holders.get(symbol, ()):
+            self.strategies[name].on_mark(symbol, price)
+
+    def end_period(self) -> None:
+        """
+        Records each strategy's return for the period that just ended.
+        """
+        for metrics in self.strategies.values():
+            metrics.end_period()
+
     def calculate_real_time_metrics(self, data: DataFrame, orders: List[Order]) -> Dict:
-        # Code to calculate real-time performance metrics
-        pass
+        """
+        Books newly filled orders, applies the latest prices and returns every strategy's metrics.
+
+        Parameters:
+            data (DataFrame): The latest prices, with a 'symbol' column and a 'last', 'price' or
+                              'close' column. The last row of each symbol is used as its mark.
+            orders (List[Order]): Orders filled since the previous call, booked at their price
+                                  against the default strategy.
+
+        Returns:
+            Dict: A snapshot of each strategy's metrics, keyed by strategy name.
+        """
+        for order in orders or []:
+            self.on_fill(order.symbol, order.quantity, order.price)
+        if data is not None and len(data) and 'symbol' in data.columns:
+            column = next((name for name in ('last', 'price', 'close', 'Close') if name in data.columns), None)
+            if column is not None:
+                for symbol, price in data.groupby('symbol', sort=False, observed=True)[column].last().items():
+                    self.on_mark(symbol, float(price))
+        self.metrics = {name: metrics.snapshot() for name, metrics in self.strategies.items()}
+        return self.metrics
 
     def calculate_post_trade_metrics(self, trades: List[Trade]) -> Dict:
-        # Code to calculate post-trade metrics
-        pass
\ No newline at end of file
+        """
+        Replays a list of executed trades through fresh streaming metrics.
+
+        Open positions are marked at the last traded price of their symbol.
+
+        Parameters:
+            trades (List[Trade]): The trades, oldest first, with signed quantities.
+
+        Returns:
+            Dict: The metrics, as returned by StreamingMetrics.snapshot().
+        """
+        metrics = StreamingMetrics(self.initial_capital, self.window, self.periods_per_year)
+        for trade in trades:
+            metrics.on_fill(trade.symbol, trade.quantity, trade.price)
+        return metrics.snapshot()
+
+    def calculate_backtest_metrics(self, results: DataFrame, initial_cash: Optional[float] = None) -> Dict:
+        """
+        Computes the streaming metrics over a backtest in one vectorized pass.
+
+        The result matches feeding each bar's trade to StreamingMetrics.on_fill() at the bar price,
+        with the bar's cost as commission, then calling on_mark() and end_period(). Option value
+        in the results' equity is not broken down into realized and unrealized P&L.
+
+        Parameters:
+            results (DataFrame): The frame returned by CustomBacktester.run_backtest().
+            initial_cash (float, optional): The backtest's starting equity. Defaults to initial_capital.
+
+        Returns:
+            Dict: The metrics, with the same keys as StreamingMetrics.snapshot().
+        """
+        capital = self.initial_capital if initial_cash is None else initial_cash
+        prices = results['price'].to_numpy(dtype=np.float64)
+        positions = results['position'].to_numpy(dtype=np.float64)
+        trades = results['trade'].to_numpy(dtype=np.float64)
+        costs = results['cost'].to_numpy(dtype=np.float64)
+        equity = results['equity'].to_numpy(dtype=np.float64)
+        returns = results['returns'].to_numpy(dtype=np.float64)
+        n = len(prices)
+        if n == 0:
+            return StreamingMetrics(capital, self.window, self.periods_per_year).snapshot()
+
+        previous = np.concatenate(([0.0], positions[:-1]))
+        size, previous_size = np.abs(positions), np.abs(previous)
+        reducing = (previous != 0) & (trades != 0) & (np.sign(trades) != np.sign(previous))
+        closed = np.where(reducing, np.minimum(np.abs(trades), previous_size), 0.0)
+        resets = (positions != 0) & (np.sign(positions) != np.sign(previous))
+
+        # The cost basis (average cost * size) follows basis[i] = scale[i] * basis[i - 1] + added[i]:
+        # adding to a position adds its cost, reducing scales the basis down and a new or flipped
+        # position starts over at the fill price.
+        scale = np.where(resets, 0.0, np.where(reducing, size / np.where(previous_size > 0, previous_size, 1.0), 1.0))
+        added = np.where(resets, size * prices, np.where(reducing | (trades == 0), 0.0, np.abs(trades) * prices))
+        basis = _affine_scan(scale, added)
+
+        previous_basis = np.concatenate(([0.0], basis[:-1]))
+        previous_cost = np.divide(previous_basis, previous_size, out=np.zeros(n), where=previous_size > 0)
+        gross = closed * (prices - previous_cost) * np.sign(previous)
+        realized = gross.sum() - costs.sum()
+        unrealized = positions[-1] * prices[-1] - np.sign(positions[-1]) * basis[-1]
+
+        peaks = np.maximum.accumulate(np.concatenate(([capital], equity)))[1:]
+        window_returns = returns if self.window is None else returns[-self.window:]
+        if self.window is not None and n < self.window:
+            mean = std = downside = math.nan
+        else:
+            mean = float(window_returns.mean())
+            std = float(window_returns.std(ddof=1)) if len(window_returns) > 1 else math.nan
+            downside = float(np.sqrt(np.mean(np.minimum(window_returns, 0.0) ** 2)))
+        traded_notional = float(np.abs(trades) @ prices)
+        closed_trades = int(np.count_nonzero(closed))
+
+        return {
+            'equity': float(equity[-1]),
+            'total_return': float(equity[-1] / capital - 1),
+            'realized_pnl': float(realized),
+            'unrealized_pnl': float(unrealized),
+            'commissions': float(costs.sum()),
+            'sharpe_ratio': annualized_ratio(mean, std, self.periods_per_year),
+            'sortino_ratio': annualized_ratio(mean, downside, self.periods_per_year),
+            'max_drawdown': float(np.max(1 - equity / peaks)),
+            'drawdown': float(1 - equity[-1] / peaks[-1]),
+            'traded_notional': traded_notional,
+            'turnover': traded_notional / capital,
+            'fills': int(np.count_nonzero(trades)),
+            'closed_trades': closed_trades,
+            'hit_rate': float(np.count_nonzero(gross > 0) / closed_trades) if closed_trades else math.nan,
+            'periods': n,
+        }
+
+def _affine_scan(scale: np.ndarray, added: np.ndarray) -> np.ndarray:
+    """
+    Solves x[i] = scale[i] * x[i - 1] + added[i], with x[-1] = 0, for every i.
+
+    Uses a parallel prefix scan over the composed affine maps, in log2(n) array passes. Only
+    products of the scales are formed, so scales in [0, 1] never overflow.
+    """
+    scale, x = scale.copy(), added.copy()
+    shift = 1
+    while shift < len(x):
+        x[shift:] += scale[shift:] * x[:-shift]
+        scale[shift:] *= scale[:-shift]
+        shift *= 2
+    return x
@@ -1,13 +1,181 @@
-# TODO: Implement this class
 # ? Owner: TradingSystem
-# ! TODO: Rework this to be dependent on a dict of strategies and their P/L
-from aiohttp_retry import Dict
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
 from entities.portfolio import Portfolio
 
 class Optimization:
-    def __init__(self, portfolio: Portfolio):
+    """
+    Allocates capital across strategies with the half-Kelly criterion.
+
+    Each strategy's returns are fed in as they are realized. The optimizer keeps exponentially
+    weighted estimates of their mean and covariance, and the inverse of that covariance, all
+    updated in O(n^2) per period: the covariance update is a scaled rank-one update, so the
+    inverse follows from the Sherman-Morrison formula. A rebalance is then a single matrix-vector
+    product. The inverse is refactorized from the covariance every `refactor_every` updates to
+    stop rounding errors from accumulating.
+
+    The full Kelly weights are the inverse covariance times the mean returns; half-Kelly takes
+    half of that, trading a little growth for much lower volatility.
+
+    Attributes:
+        portfolio (Portfolio): The portfolio being allocated.
+        strategies (List[str]): The strategies, in the order of the rows of mean and covariance.
+        halflife (float): The number of periods after which a return's weight halves.
+        fraction (float): The fraction of the full Kelly weights to use.
+        max_leverage (float, optional): The largest sum of absolute weights. Larger allocations are scaled down.
+        prior_variance (float): The variance assumed for a strategy with no history.
+        refactor_every (int): The number of updates between refactorizations of the inverse.
+        mean (np.ndarray): The exponentially weighted mean return of each strategy.
+        covariance (np.ndarray): The exponentially weighted covariance of the strategies' returns.
+        updates (int): The number of periods recorded.
+    """
+
+    def __init__(
+        self,
+        portfolio: Portfolio,
+        strategies: Optional[List[str]] = None,
+        halflife: float = 63.0,
+        fraction: float = 0.5,
+        max_leverage: Optional[float] = None,
+        prior_variance: float = 1e-4,
+        refactor_every: int = 256,
+    ):
         self.portfolio = portfolio
+        self.halflife = halflife
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.fraction = fraction
+        self.max_leverage = max_leverage
+        self.prior_variance = prior_variance
+        self.refactor_every = refactor_every
+        self.strategies: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.mean = np.zeros(0)
+        self.covariance = np.zeros((0, 0))
+        self._inverse = np.zeros((0, 0))
+        self.updates = 0
+        for name in strategies or []:
+            self.add_strategy(name)
+
+    def add_strategy(self, name: str) -> None:
+        """
+        Starts tracking a strategy with zero mean and the prior variance.
+        """
+        if name in self._index:
+            return
+        n = len(self.strategies)
+        self._index[name] = n
+        self.strategies.append(name)
+        self.mean = np.append(self.mean, 0.0)
+        # With no covariance to the others yet, the inverse just gains a diagonal entry
+        self.covariance = _grow(self.covariance, self.prior_variance)
+        self._inverse = _grow(self._inverse, 1 / self.prior_variance)
+
+    def record_returns(self, returns: Dict[str, float]) -> None:
+        """
+        Records one period of strategy returns. Strategies missing from the dict returned zero.
+
+        Parameters:
+            returns (Dict[str, float]): Each strategy's return over the period, as a fraction of its capital.
+        """
+        for name in returns:
+            if name not in self._index:
+                self.add_strategy(name)
+        r = np.zeros(len(self.strategies))
+        for name, value in returns.items():
+            r[self._index[name]] = value
+
+        alpha = self.alpha
+        deviation = r - self.mean
+        self.mean += alpha * deviation
+        # covariance' = (1 - alpha) * covariance + u u^T, with u = sqrt((1 - alpha) * alpha) * deviation
+        decay = 1 - alpha
+        u = np.sqrt(decay * alpha) * deviation
+        self.covariance *= decay
+        self.covariance += np.outer(u, u)
+        self.updates += 1
+
+        if self.updates % self.refactor_every == 0:
+            self.refactorize()
+        else:
+            inverse = self._inverse
+            inverse /= decay
+            v = inverse @ u
+            inverse -= np.outer(v, v / (1 + u @ v))
+
+    def record_pnl(self, pnl: Dict[str, float], capital: Union[float, Dict[str, float]]) -> None:
+        """
+        Records one period of strategy P&L, converted to returns on each strategy's capital.
+
+        Parameters:
+            pnl (Dict[str, float]): Each strategy's P&L over the period.
+            capital (Union[float, Dict[str, float]]): The capital each strategy traded with, or one
+                                                      amount for all of them.
+        """
+        if isinstance(capital, dict):
+            returns = {name: value / capital[name] for name, value in pnl.items()}
+        else:
+            returns = {name: value / capital for name, value in pnl.items()}
+        self.record_returns(returns)
+
+    def refactorize(self) -> None:
+        """
+        Recomputes the cached inverse from the covariance through its Cholesky factor.
+        """
+        n = len(self.strategies)
+        if not n:
+            return
+        covariance = (self.covariance + self.covariance.T) / 2
+        try:
+            factor = np.linalg.cholesky(covariance)
+        except np.linalg.LinAlgError:
+            # Lost positive definiteness to rounding, so nudge it back with a little of the prior
+            covariance += np.eye(n) * self.prior_variance * 1e-6
+            factor = np.linalg.cholesky(covariance)
+        factor_inverse = np.linalg.inv(factor)
+        self.covariance = covariance
+        self._inverse = factor_inverse.T @ factor_inverse
+
+    def kelly_weights(self) -> np.ndarray:
+        """
+        Returns the fractional Kelly weight of each strategy, in the order of `strategies`.
+        """
+        weights = self.fraction * (self._inverse @ self.mean)
+        if self.max_leverage is not None:
+            leverage = np.abs(weights).sum()
+            if leverage > self.max_leverage:
+                weights *= self.max_leverage / leverage
+        return weights
+
+    def apply_half_kelly(self, portfolio: Optional[Portfolio] = None) -> Dict:
+        """
+        Computes the half-Kelly allocation of the portfolio's equity across the strategies.
+
+        Parameters:
+            portfolio (Portfolio, optional): The portfolio to allocate. Defaults to self.portfolio.
+
+        Returns:
+            Dict: {'weights': {strategy: fraction of equity}, 'allocations': {strategy: capital},
+                   'equity': the equity allocated, 'leverage': the sum of absolute weights}.
+                   Negative weights mean the strategy should be run in reverse.
+        """
+        portfolio = self.portfolio if portfolio is None else portfolio
+        equity = portfolio.current_cash + sum(position.quantity * position.price for position in portfolio.positions)
+        weights = self.kelly_weights()
+        return {
+            'weights': dict(zip(self.strategies, weights.tolist())),
+            'allocations': dict(zip(self.strategies, (weights * equity).tolist())),
+            'equity': equity,
+            'leverage': float(np.abs(weights).sum()),
+        }
 
-    def apply_half_kelly(self, portfolio: Portfolio) -> Dict:
-        # Code to apply the Half Kelly Criterion for portfolio rebalancing
-        pass
\ No newline at end of file
+def _grow(matrix: np.ndarray, diagonal: float) -> np.ndarray:
+    """
+    Returns a square matrix with one more row and column, zero except for a new diagonal entry.
+    """
+    n = len(matrix)
+    grown = np.zeros((n + 1, n + 1))
+    grown[:n, :n] = matrix
+    grown[n, n] = diagonal
+    return grown
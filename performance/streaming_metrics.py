@@ -0,0 +1,202 @@
+import math
+from typing import Dict, Optional
+
+from data_management.streaming_indicators import StreamingRollingStd, StreamingSMA
+
+class RunningMoments:
+    """
+    The running count, mean and sum of squared deviations of a stream, using Welford's algorithm.
+
+    Attributes:
+        count (int): The number of observations.
+        mean (float): The mean of the observations.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def push(self, x: float) -> None:
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+
+    @property
+    def std(self) -> float:
+        """
+        The sample standard deviation, or NaN with fewer than two observations.
+        """
+        if self.count < 2:
+            return math.nan
+        return math.sqrt(max(self._m2, 0.0) / (self.count - 1))
+
+class StreamingMetrics:
+    """
+    Performance metrics for one strategy, updated in constant time per fill and per mark.
+
+    Positions are booked at their average cost: buying into a position blends the fill price into
+    the average cost, reducing it realizes the P&L of the closed quantity against the average
+    cost, and a fill that flips the position opens the remainder at the fill price. Commissions
+    are deducted from realized P&L.
+
+    Returns are sampled once per period (e.g. per bar or per day) by end_period(), from the
+    equity at the previous period end. Sharpe and Sortino ratios are taken over the last
+    `window` returns, or over every return when no window is given.
+
+    Attributes:
+        initial_capital (float): The equity before the first fill, used to compute returns.
+        window (int, optional): The number of most recent returns used for the Sharpe and Sortino ratios.
+        periods_per_year (int): The number of periods per year, used to annualize the ratios.
+        realized_pnl (float): The P&L of closed quantities, net of commissions.
+        unrealized_pnl (float): The P&L of the open positions at their latest marks.
+        commissions (float): The commissions paid.
+        traded_notional (float): The absolute value of everything bought and sold.
+        peak_equity (float): The highest equity seen.
+        max_drawdown (float): The largest fall from a peak, as a fraction of the peak.
+        closed_trades (int): The number of fills that reduced or closed a position.
+        winning_trades (int): The closing fills whose closed quantity made money before commissions.
+    """
+
+    def __init__(self, initial_capital: float = 100_000.0, window: Optional[int] = None, periods_per_year: int = 252):
+        if initial_capital <= 0:
+            raise ValueError("initial_capital must be positive")
+        self.initial_capital = initial_capital
+        self.window = window
+        self.periods_per_year = periods_per_year
+        self.positions: Dict[str, float] = {}
+        self.average_costs: Dict[str, float] = {}
+        self.marks: Dict[str, float] = {}
+        self._unrealized: Dict[str, float] = {}
+        self.realized_pnl = 0.0
+        self.unrealized_pnl = 0.0
+        self.commissions = 0.0
+        self.traded_notional = 0.0
+        self.fills = 0
+        self.closed_trades = 0
+        self.winning_trades = 0
+        self.peak_equity = initial_capital
+        self.max_drawdown = 0.0
+        self.periods = 0
+        self._period_equity = initial_capital
+        if window is None:
+            self._returns = RunningMoments()
+            self._downside_sum = 0.0
+        else:
+            self._mean = StreamingSMA('returns', window)
+            self._std = StreamingRollingStd('returns', window)
+            self._downside = StreamingSMA('downside', window)
+
+    @property
+    def equity(self) -> float:
+        return self.initial_capital + self.realized_pnl + self.unrealized_pnl
+
+    def on_fill(self, symbol: str, quantity: float, price: float, commission: float = 0.0) -> None:
+        """
+        Books a fill and marks the symbol at the fill price.
+
+        Parameters:
+            symbol (str): The symbol filled.
+            quantity (float): The signed quantity, positive for buys and negative for sells.
+            price (float): The fill price.
+            commission (float): The commission paid for the fill.
+        """
+        position = self.positions.get(symbol, 0.0)
+        average_cost = self.average_costs.get(symbol, 0.0)
+        new_position = position + quantity
+
+        if position and (quantity > 0) != (position > 0):
+            closed = min(abs(quantity), abs(position))
+            pnl = closed * (price - average_cost) if position > 0 else closed * (average_cost - price)
+            self.realized_pnl += pnl
+            self.closed_trades += 1
+            if pnl > 0:
+                self.winning_trades += 1
+            if new_position and (new_position > 0) != (position > 0):
+                average_cost = price
+        elif new_position:
+            average_cost = (average_cost * abs(position) + price * abs(quantity)) / abs(new_position)
+
+        self.positions[symbol] = new_position
+        self.average_costs[symbol] = average_cost if new_position else 0.0
+        self.realized_pnl -= commission
+        self.commissions += commission
+        self.traded_notional += abs(quantity) * price
+        self.fills += 1
+        self.on_mark(symbol, price)
+
+    def on_mark(self, symbol: str, price: float) -> None:
+        """
+        Revalues the open position in a symbol at a new price.
+        """
+        self.marks[symbol] = price
+        position = self.positions.get(symbol, 0.0)
+        unrealized = position * (price - self.average_costs[symbol]) if position else 0.0
+        self.unrealized_pnl += unrealized - self._unrealized.get(symbol, 0.0)
+        self._unrealized[symbol] = unrealized
+
+        equity = self.equity
+        if equity > self.peak_equity:
+            self.peak_equity = equity
+        elif self.peak_equity > 0:
+            drawdown = 1 - equity / self.peak_equity
+            if drawdown > self.max_drawdown:
+                self.max_drawdown = drawdown
+
+    def end_period(self) -> float:
+        """
+        Records the return since the previous period end and returns it.
+        """
+        equity = self.equity
+        r = equity / self._period_equity - 1 if self._period_equity > 0 else 0.0
+        self._period_equity = equity
+        self.periods += 1
+        downside = min(r, 0.0) ** 2
+        if self.window is None:
+            self._returns.push(r)
+            self._downside_sum += downside
+        else:
+            self._mean.push(r)
+            self._std.push(r)
+            self._downside.push(downside)
+        return r
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Returns every metric as a flat dict, with the same keys as MetricsCalculation.calculate_backtest_metrics().
+        """
+        if self.window is None:
+            mean, std = self._returns.mean, self._returns.std
+            downside = math.sqrt(self._downside_sum / self._returns.count) if self._returns.count else math.nan
+        else:
+            mean, std = self._mean.value, self._std.value
+            downside = math.sqrt(self._downside.value) if not math.isnan(self._downside.value) else math.nan
+        equity = self.equity
+        return {
+            'equity': equity,
+            'total_return': equity / self.initial_capital - 1,
+            'realized_pnl': self.realized_pnl,
+            'unrealized_pnl': self.unrealized_pnl,
+            'commissions': self.commissions,
+            'sharpe_ratio': annualized_ratio(mean, std, self.periods_per_year),
+            'sortino_ratio': annualized_ratio(mean, downside, self.periods_per_year),
+            'max_drawdown': self.max_drawdown,
+            'drawdown': 1 - equity / self.peak_equity if self.peak_equity > 0 else 0.0,
+            'traded_notional': self.traded_notional,
+            'turnover': self.traded_notional / self.initial_capital,
+            'fills': self.fills,
+            'closed_trades': self.closed_trades,
+            'hit_rate': self.winning_trades / self.closed_trades if self.closed_trades else math.nan,
+            'periods': self.periods,
+        }
+
+def annualized_ratio(mean: float, deviation: float, periods_per_year: int) -> float:
+    """
+    Returns mean / deviation scaled to a year, NaN while undefined and 0 when the deviation is 0.
+    """
+    if math.isnan(deviation):
+        return math.nan
+    if deviation == 0:
+        return 0.0
+    return mean / deviation * math.sqrt(periods_per_year)
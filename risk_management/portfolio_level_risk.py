@@ -1,14 +1,67 @@
-from main import Portfolio
+from entities.portfolio import Portfolio
 
-# TODO: Implement this class
 class PortfolioLevelRisk:
+    """
+    Tracks the portfolio's drawdown from its peak equity and halts trading when it gets too deep.
+
+    Equity is fed in as it changes, through update_equity() or calculate_max_drawdown(), so each
+    update is constant time.
+
+    Attributes:
+        max_drawdown (float): The drawdown, as a fraction of peak equity, at which trading is halted.
+        peak_equity (float): The highest equity seen.
+        drawdown (float): The current fall from the peak, as a fraction of the peak.
+        worst_drawdown (float): The largest drawdown seen.
+        trading_halted (bool): Whether orders that add risk are being blocked.
+    """
+
     def __init__(self, max_drawdown: float):
         self.max_drawdown = max_drawdown
+        self.peak_equity = 0.0
+        self.drawdown = 0.0
+        self.worst_drawdown = 0.0
+        self.trading_halted = False
+
+    def update_equity(self, equity: float) -> float:
+        """
+        Records the latest portfolio equity, halting trading if the drawdown limit is reached.
+
+        Returns:
+            float: The current drawdown.
+        """
+        if equity > self.peak_equity:
+            self.peak_equity = equity
+        self.drawdown = 1 - equity / self.peak_equity if self.peak_equity > 0 else 0.0
+        if self.drawdown > self.worst_drawdown:
+            self.worst_drawdown = self.drawdown
+        self.halt_trading(self.max_drawdown)
+        return self.drawdown
 
     def calculate_max_drawdown(self, portfolio: Portfolio) -> float:
-        # Code to calculate the maximum drawdown for the portfolio
-        pass
+        """
+        Values the portfolio as its cash plus its positions at their prices, records that equity,
+        and returns the largest drawdown seen so far.
+        """
+        equity = portfolio.current_cash + sum(position.quantity * position.price for position in portfolio.positions)
+        self.update_equity(equity)
+        return self.worst_drawdown
+
+    def halt_trading(self, threshold: float) -> bool:
+        """
+        Halts trading if the current drawdown has reached a threshold. Once halted, trading stays
+        halted until resume_trading() is called.
+
+        Returns:
+            bool: Whether trading is halted.
+        """
+        if self.drawdown >= threshold > 0:
+            self.trading_halted = True
+        return self.trading_halted
 
-    def halt_trading(self, threshold: float):
-        # Code to halt trading activities if risk thresholds are breached
-        pass
\ No newline at end of file
+    def resume_trading(self) -> None:
+        """
+        Lifts a halt. The peak restarts from the next equity update.
+        """
+        self.trading_halted = False
+        self.peak_equity = 0.0
+        self.drawdown = 0.0
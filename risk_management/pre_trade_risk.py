@@ -0,0 +1,272 @@
+from typing import Dict, List, Optional, Tuple
+
+from entities.confirmation import Confirmation
+from entities.option_order import OptionOrder
+from entities.order import Order
+from entities.position import Position
+from risk_management.portfolio_level_risk import PortfolioLevelRisk
+from risk_management.strategy_level_risk import StrategyLevelRisk
+
+# Number of shares controlled by one option contract
+OPTION_MULTIPLIER = 100
+
+ACCEPTED = Confirmation('SUCCESS', 'Order passed pre-trade risk checks')
+
+class PreTradeRiskGate:
+    """
+    Checks orders against risk limits before they are sent to the broker.
+
+    The gate keeps its own exposure state, updated incrementally from fills and price marks, so
+    checking an order is a handful of dictionary lookups rather than a round trip to the broker.
+    Accepted orders reserve their quantity until they are filled or released, so orders checked
+    together in one batch, or in quick succession, count against the same limits.
+
+    Orders that reduce a position are always accepted. Orders that add to one are rejected if:
+        - trading is halted because the portfolio drawdown limit was reached,
+        - the order's notional value is above max_order_notional,
+        - the resulting position is larger than the instrument's position limit,
+        - the resulting gross exposure is above max_gross_notional, or
+        - the position is already past its stop-loss or take-profit level.
+
+    Instruments are keyed by symbol for stocks, and by symbol, expiry, strike and right for options.
+
+    Attributes:
+        max_position (float, optional): The largest absolute position in any one instrument.
+        position_limits (Dict[str, float]): Per-instrument overrides of max_position.
+        max_order_notional (float, optional): The largest notional value of a single order.
+        max_gross_notional (float, optional): The largest sum of absolute position values, including
+                                              reserved quantities.
+        strategy_risk (StrategyLevelRisk, optional): Supplies the stop-loss and take-profit levels,
+                                                     as fractions of the average cost.
+        portfolio_risk (PortfolioLevelRisk, optional): Tracks the portfolio drawdown and trading halts.
+        cash (float): The cash balance, used with the positions' values to compute equity. The
+                      drawdown is only tracked once the cash is known, i.e. passed in or loaded
+                      with load_positions() or load_account(), and while equity is positive.
+        cash_known (bool): Whether the cash has been set, so equity can be tracked.
+        gross_notional (float): The current sum of absolute position values, including reserved quantities.
+    """
+
+    def __init__(
+        self,
+        max_position: Optional[float] = None,
+        max_order_notional: Optional[float] = None,
+        max_gross_notional: Optional[float] = None,
+        strategy_risk: Optional[StrategyLevelRisk] = None,
+        portfolio_risk: Optional[PortfolioLevelRisk] = None,
+        position_limits: Optional[Dict[str, float]] = None,
+        cash: Optional[float] = None,
+    ):
+        self.max_position = max_position
+        self.position_limits = position_limits if position_limits is not None else {}
+        self.max_order_notional = max_order_notional
+        self.max_gross_notional = max_gross_notional
+        self.strategy_risk = strategy_risk
+        self.portfolio_risk = portfolio_risk
+        self.cash = cash if cash is not None else 0.0
+        self.cash_known = cash is not None
+        self.positions: Dict[str, float] = {}
+        self.average_costs: Dict[str, float] = {}
+        self.marks: Dict[str, float] = {}
+        self.multipliers: Dict[str, int] = {}
+        self.reserved: Dict[str, float] = {}  # Signed quantity of accepted, unfilled orders
+        self.gross_notional = 0.0
+        self.market_value = 0.0
+        self._exposures: Dict[str, float] = {}  # Each instrument's share of gross_notional
+        self._reservations: Dict[Order, Tuple[str, float]] = {}  # Unfilled quantity of each accepted order
+
+    @property
+    def equity(self) -> float:
+        return self.cash + self.market_value
+
+    def load_positions(self, positions: List[Position], cash: Optional[float] = None) -> None:
+        """
+        Replaces the stock positions and cash, e.g. from BrokerIntegration.query_positions() at startup.
+
+        Each position is marked at its price until a newer mark arrives.
+        """
+        if cash is not None:
+            self.cash = cash
+            self.cash_known = True
+        for position in positions:
+            key = position.symbol
+            self.multipliers.setdefault(key, 1)
+            self.positions[key] = position.quantity
+            self.average_costs[key] = position.price
+            self.marks.setdefault(key, position.price)
+        self.market_value = sum(quantity * self.marks.get(key, 0.0) * self.multipliers.get(key, 1) for key, quantity in self.positions.items())
+        for key in self.positions:
+            self._update_exposure(key)
+        self._update_equity()
+
+    def load_account(self, details: Dict[str, str]) -> None:
+        """
+        Sets the cash from BrokerIntegration.query_account_details(), e.g. at startup.
+
+        Raises:
+            KeyError: If the details have no TotalCashValue.
+        """
+        self.cash = float(details['TotalCashValue'])
+        self.cash_known = True
+        self._update_equity()
+
+    def check(self, order: Order) -> Confirmation:
+        """
+        Checks one order against the risk limits, reserving its quantity if it is accepted.
+
+        Parameters:
+            order (Order): The order, with a signed quantity.
+
+        Returns:
+            Confirmation: SUCCESS if the order may be sent, or ERROR with the limit it breaches.
+        """
+        key, multiplier = self._instrument(order)
+        if key not in self.marks and order.price:
+            self.marks[key] = order.price
+        quantity = order.quantity
+        exposure = self.positions.get(key, 0.0) + self.reserved.get(key, 0.0)
+        projected = exposure + quantity
+        if abs(projected) > abs(exposure):
+            rejection = self._check_increase(order, key, multiplier, exposure, projected)
+            if rejection is not None:
+                return rejection
+
+        self.reserved[key] = self.reserved.get(key, 0.0) + quantity
+        self._reservations[order] = (key, quantity)
+        self._update_exposure(key)
+        return ACCEPTED
+
+    def check_batch(self, orders: List[Order]) -> List[Confirmation]:
+        """
+        Checks several orders in sequence, each against the exposure reserved by those before it.
+
+        Returns:
+            List[Confirmation]: One Confirmation per order, in the same order.
+        """
+        check = self.check
+        return [check(order) for order in orders]
+
+    def instrument_key(self, order: Order) -> str:
+        """
+        Returns the key the gate books an order's fills and marks under.
+        """
+        return self._instrument(order)[0]
+
+    def _check_increase(self, order: Order, key: str, multiplier: int, exposure: float, projected: float) -> Optional[Confirmation]:
+        """
+        Returns the rejection for an order that adds to a position, or None if it is within every limit.
+        """
+        if self.portfolio_risk is not None and self.portfolio_risk.trading_halted:
+            return Confirmation('ERROR', 'Trading halted: portfolio drawdown limit reached')
+
+        limit = self.position_limits.get(key, self.max_position)
+        if limit is not None and abs(projected) > limit:
+            return Confirmation('ERROR', f'Position limit of {limit:g} exceeded for {key}')
+
+        if self.max_order_notional is not None or self.max_gross_notional is not None:
+            price = order.price or self.marks.get(key)
+            if not price:
+                return Confirmation('ERROR', f'No price to check notional limits for {key}')
+            if self.max_order_notional is not None and abs(order.quantity) * price * multiplier > self.max_order_notional:
+                return Confirmation('ERROR', f'Order notional above {self.max_order_notional:g}')
+            if self.max_gross_notional is not None:
+                gross = self.gross_notional - self._exposures.get(key, 0.0) + abs(projected) * price * multiplier
+                if gross > self.max_gross_notional:
+                    return Confirmation('ERROR', f'Gross notional above {self.max_gross_notional:g}')
+
+        position = self.positions.get(key, 0.0)
+        if self.strategy_risk is not None and position and (position > 0) == (projected > 0):
+            average_cost = self.average_costs.get(key)
+            mark = self.marks.get(key)
+            if average_cost and mark:
+                change = (mark / average_cost - 1) if position > 0 else (1 - mark / average_cost)
+                if self.strategy_risk.stop_loss_level and change <= -self.strategy_risk.stop_loss_level:
+                    return Confirmation('ERROR', f'Stop-loss level breached for {key}')
+                if self.strategy_risk.take_profit_level and change >= self.strategy_risk.take_profit_level:
+                    return Confirmation('ERROR', f'Take-profit level reached for {key}')
+        return None
+
+    def release(self, order: Order) -> None:
+        """
+        Releases the unfilled quantity an accepted order reserved, e.g. once it is cancelled or rejected.
+        """
+        reservation = self._reservations.pop(order, None)
+        if reservation is None:
+            return
+        key, remaining = reservation
+        self.reserved[key] -= remaining
+        self._update_exposure(key)
+
+    def on_fill(self, order: Optional[Order], symbol: str, quantity: float, price: float, commission: float = 0.0) -> None:
+        """
+        Books a fill into the positions and cash, and releases the quantity the order reserved.
+
+        Parameters:
+            order (Order, optional): The order that was filled, if it went through the gate.
+            symbol (str): The instrument key, as used by the gate.
+            quantity (float): The signed filled quantity.
+            price (float): The fill price.
+            commission (float): The commission paid.
+        """
+        reservation = self._reservations.get(order) if order is not None else None
+        if reservation is not None:
+            key, remaining = reservation
+            # Never release more than is still reserved, or in the other direction
+            filled = min(abs(quantity), abs(remaining)) * (1 if remaining > 0 else -1)
+            self.reserved[key] -= filled
+            remaining -= filled
+            if remaining:
+                self._reservations[order] = (key, remaining)
+            else:
+                del self._reservations[order]
+
+        multiplier = self.multipliers.setdefault(symbol, 1)
+        position = self.positions.get(symbol, 0.0)
+        new_position = position + quantity
+        if not new_position:
+            self.average_costs.pop(symbol, None)
+        elif not position or (position > 0) != (new_position > 0):
+            self.average_costs[symbol] = price
+        elif (quantity > 0) == (position > 0):
+            self.average_costs[symbol] = (self.average_costs[symbol] * abs(position) + price * abs(quantity)) / abs(new_position)
+        self.positions[symbol] = new_position
+        self.cash -= quantity * price * multiplier + commission
+        self.market_value += (new_position * price - position * self.marks.get(symbol, price)) * multiplier
+        self.marks[symbol] = price
+        self._update_exposure(symbol)
+        self._update_equity()
+
+    def on_mark(self, symbol: str, price: float) -> None:
+        """
+        Revalues an instrument at a new price.
+        """
+        previous = self.marks.get(symbol, price)
+        self.marks[symbol] = price
+        position = self.positions.get(symbol, 0.0)
+        if position:
+            self.market_value += position * (price - previous) * self.multipliers.get(symbol, 1)
+            self._update_equity()
+        if symbol in self._exposures or position:
+            self._update_exposure(symbol)
+
+    def _update_exposure(self, key: str) -> None:
+        price = self.marks.get(key, 0.0)
+        exposure = abs(self.positions.get(key, 0.0) + self.reserved.get(key, 0.0)) * price * self.multipliers.get(key, 1)
+        self.gross_notional += exposure - self._exposures.get(key, 0.0)
+        self._exposures[key] = exposure
+
+    def _update_equity(self) -> None:
+        # Without the cash, equity would only be the P&L, and tiny moves would read as huge drawdowns
+        if self.portfolio_risk is not None and self.cash_known:
+            equity = self.equity
+            if equity > 0:
+                self.portfolio_risk.update_equity(equity)
+
+    def _instrument(self, order: Order) -> Tuple[str, int]:
+        """
+        Returns the key and contract multiplier of the instrument an order trades.
+        """
+        if isinstance(order, OptionOrder):
+            key = f"{order.symbol} {order.expiry} {order.strike:g} {order.option_type}"
+            self.multipliers[key] = OPTION_MULTIPLIER
+            return key, OPTION_MULTIPLIER
+        return order.symbol, 1
@@ -1,15 +1,173 @@
-from pandas import Series
+from typing import Optional
+
+import numpy as np
+from pandas import DataFrame, Series
 
-# TODO: Implement this class
 class StrategyLevelRisk:
+    """
+    Stop-loss and take-profit exits for a strategy, applied to whole position histories at once.
+
+    Positions are target positions per bar, as returned by StrategyInterface.generate_signals(),
+    entered at the close of the bar they first appear on. Each run of a constant non-zero position
+    is one trade, entered at that bar's price. When a later bar's price crosses the trade's exit
+    level, the position is set to zero from that bar until the signal next changes, i.e. the trade
+    is exited at that bar's close and not re-entered until the strategy asks for a new position.
+
+    Levels are fractions of the entry price, e.g. 0.05 for 5%. A trailing stop is measured from
+    the best price since entry instead of the entry price.
+
+    Attributes:
+        stop_loss_level (float): The default stop-loss level.
+        take_profit_level (float): The default take-profit level.
+    """
+
     def __init__(self, stop_loss_level: float, take_profit_level: float):
         self.stop_loss_level = stop_loss_level
         self.take_profit_level = take_profit_level
 
-    def apply_stop_loss(self, signals: Series, level: float):
-        # Code to apply stop-loss levels to a strategy
-        pass
+    def apply_stop_loss(self, signals: Series, prices: Series, level: Optional[float] = None, trailing: bool = False) -> Series:
+        """
+        Exits each trade on the first bar its price falls (longs) or rises (shorts) past the stop.
+
+        Parameters:
+            signals (Series): The target position for every bar.
+            prices (Series): The price for every bar, aligned with signals.
+            level (float, optional): The stop-loss level. Defaults to stop_loss_level.
+            trailing (bool): Whether the stop trails the best price since entry.
+
+        Returns:
+            Series: The positions with stopped-out bars set to zero, indexed like signals.
+        """
+        level = self.stop_loss_level if level is None else level
+        positions = _exit_positions(_to_array(signals), _to_array(prices), level, 'stop_loss', trailing)
+        return Series(positions, index=signals.index, name=signals.name)
+
+    def apply_take_profit(self, signals: Series, prices: Series, level: Optional[float] = None) -> Series:
+        """
+        Exits each trade on the first bar its price rises (longs) or falls (shorts) past the target.
+
+        Parameters:
+            signals (Series): The target position for every bar.
+            prices (Series): The price for every bar, aligned with signals.
+            level (float, optional): The take-profit level. Defaults to take_profit_level.
+
+        Returns:
+            Series: The positions with bars after the target was reached set to zero, indexed like signals.
+        """
+        level = self.take_profit_level if level is None else level
+        positions = _exit_positions(_to_array(signals), _to_array(prices), level, 'take_profit', False)
+        return Series(positions, index=signals.index, name=signals.name)
+
+    def apply_exits(
+        self,
+        signals: DataFrame,
+        prices: DataFrame,
+        stop_loss_level: Optional[float] = None,
+        take_profit_level: Optional[float] = None,
+        trailing: bool = False,
+    ) -> DataFrame:
+        """
+        Applies the stop-loss and then the take-profit to many symbols in one pass.
+
+        Each column is one symbol. The columns are laid end to end and processed as a single
+        array, with a trade boundary at the start of every column.
+
+        Parameters:
+            signals (DataFrame): The target positions, one column per symbol.
+            prices (DataFrame): The prices, with the same shape, columns and order as signals.
+            stop_loss_level (float, optional): Defaults to stop_loss_level. Pass 0 to skip the stop.
+            take_profit_level (float, optional): Defaults to take_profit_level. Pass 0 to skip the target.
+            trailing (bool): Whether the stop trails the best price since entry.
+
+        Returns:
+            DataFrame: The positions after both exits, indexed like signals.
+        """
+        if signals.shape != prices.shape:
+            raise ValueError(f"signals has shape {signals.shape} but prices has shape {prices.shape}")
+        stop_loss_level = self.stop_loss_level if stop_loss_level is None else stop_loss_level
+        take_profit_level = self.take_profit_level if take_profit_level is None else take_profit_level
+
+        n = len(signals)
+        # Column-major, so each symbol's bars are contiguous
+        positions = signals.to_numpy(dtype=np.float64).ravel(order='F')
+        price_array = prices.to_numpy(dtype=np.float64).ravel(order='F')
+        breaks = np.arange(0, positions.size, max(n, 1))
+        if stop_loss_level:
+            positions = _exit_positions(positions, price_array, stop_loss_level, 'stop_loss', trailing, breaks)
+        if take_profit_level:
+            positions = _exit_positions(positions, price_array, take_profit_level, 'take_profit', False, breaks)
+        return DataFrame(positions.reshape(signals.shape, order='F'), index=signals.index, columns=signals.columns)
+
+def _to_array(values: Series) -> np.ndarray:
+    return values.to_numpy(dtype=np.float64)
+
+def _exit_positions(
+    positions: np.ndarray,
+    prices: np.ndarray,
+    level: float,
+    kind: str,
+    trailing: bool,
+    breaks: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Zeroes every bar of a trade from the first bar its price crosses the exit level.
+
+    Parameters:
+        positions (np.ndarray): The target position for every bar.
+        prices (np.ndarray): The price for every bar.
+        level (float): The exit level, as a fraction of the entry or best price.
+        kind (str): 'stop_loss' or 'take_profit'.
+        trailing (bool): Whether the level is measured from the best price since entry.
+        breaks (np.ndarray, optional): Indices that always start a new trade, e.g. the first bar of each symbol.
+
+    Returns:
+        np.ndarray: A new array of positions.
+    """
+    n = len(positions)
+    if n == 0:
+        return positions.copy()
+    if len(prices) != n:
+        raise ValueError(f"Expected {n} prices, got {len(prices)}")
+
+    # Each run of an unchanged position is one trade
+    starts_mask = np.empty(n, dtype=bool)
+    starts_mask[0] = True
+    np.not_equal(positions[1:], positions[:-1], out=starts_mask[1:])
+    if breaks is not None:
+        starts_mask[breaks] = True
+    starts = np.flatnonzero(starts_mask)
+    trade_ids = np.cumsum(starts_mask) - 1
+    long, short = positions > 0, positions < 0
+
+    if trailing:
+        grouped = Series(prices).groupby(trade_ids, sort=False)
+        long_reference = grouped.cummax().to_numpy()
+        short_reference = grouped.cummin().to_numpy()
+    else:
+        long_reference = short_reference = prices[starts][trade_ids]
+
+    if kind == 'stop_loss':
+        hits = (long & (prices <= long_reference * (1 - level))) | (short & (prices >= short_reference * (1 + level)))
+    elif kind == 'take_profit':
+        hits = (long & (prices >= long_reference * (1 + level))) | (short & (prices <= short_reference * (1 - level)))
+    else:
+        raise ValueError(f"Unsupported exit kind: {kind}")
+    # A trade can't exit on the bar it is entered
+    hits[starts] = False
+
+    # The first hit at or after each trade's start, if it comes before the next trade starts
+    hit_indices = np.flatnonzero(hits)
+    ends = np.append(starts[1:], n)
+    first = np.searchsorted(hit_indices, starts)
+    has_hit = first < len(hit_indices)
+    first_hits = hit_indices[first[has_hit]]
+    exited = first_hits < ends[has_hit]
+    exit_starts, exit_ends = first_hits[exited], ends[has_hit][exited]
 
-    def apply_take_profit(self, signals: Series, level: float):
-        # Code to apply take-profit levels to a strategy
-        pass
\ No newline at end of file
+    # Mark the exited stretches with +1/-1 boundaries and a running sum
+    boundaries = np.zeros(n + 1, dtype=np.int64)
+    boundaries[exit_starts] += 1
+    boundaries[exit_ends] -= 1
+    result = positions.copy()
+    result[np.cumsum(boundaries[:-1]) > 0] = 0.0
+    return result
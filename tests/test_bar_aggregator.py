@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from data_management.bar_aggregator import NANOSECONDS, BarAggregator
+
+T0 = 1_700_000_000 * NANOSECONDS
+
+def test_timer_does_not_close_the_current_bar():
+    aggregator = BarAggregator(resolutions=(1, 5), grace=0.25)
+    aggregator.on_trade('AAPL', T0 + NANOSECONDS // 10, 100.0, 1)
+    aggregator.close_due(T0 + NANOSECONDS // 5)
+    aggregator.on_trade('AAPL', T0 + NANOSECONDS // 2, 101.0, 2)
+    assert aggregator.buffer('AAPL', 1).count == 0
+
+    aggregator.close_due(T0 + NANOSECONDS + NANOSECONDS // 2)
+    bar = aggregator.buffer('AAPL', 1).latest()
+    assert (bar.open, bar.high, bar.close, bar.volume, bar.count) == (100.0, 101.0, 101.0, 3, 2)
+    assert aggregator.late_trades == 0
+
+def test_bars_match_resample_with_timer_interleaved():
+    rng = np.random.default_rng(0)
+    n = 50_000
+    times = T0 + np.sort(rng.integers(0, 3600 * NANOSECONDS, n))
+    prices = 100 + np.cumsum(rng.normal(0, 0.01, n))
+    sizes = rng.integers(1, 500, n).astype(float)
+
+    aggregator = BarAggregator(resolutions=(1, 5, 60), capacity=4096, grace=0.25)
+    steps = rng.integers(NANOSECONDS // 20, NANOSECONDS // 2, n).tolist()
+    timer = T0
+    for timestamp, price, size in zip(times.tolist(), prices.tolist(), sizes.tolist()):
+        while timer <= timestamp:
+            aggregator.close_due(timer)
+            timer += steps.pop()
+        aggregator.on_trade('AAPL', timestamp, price, size)
+    aggregator.close_due(int(times[-1]) + 3600 * NANOSECONDS)
+    assert aggregator.late_trades == 0
+
+    trades = pd.DataFrame({'price': prices, 'size': sizes}, index=pd.to_datetime(times, unit='ns', utc=True))
+    for resolution in (1, 5, 60):
+        expected = trades.resample(f'{resolution}s').agg({'price': ['first', 'max', 'min', 'last'], 'size': 'sum'}).dropna()
+        bars = aggregator.buffer('AAPL', resolution).to_frame()
+        assert len(bars) == len(expected)
+        np.testing.assert_array_equal(bars['date'].to_numpy(), expected.index.to_numpy())
+        np.testing.assert_allclose(bars[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy(), expected.to_numpy())
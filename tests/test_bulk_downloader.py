@@ -0,0 +1,95 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from eventkit import Event
+from ib_insync import BarData
+
+from data_management.bulk_downloader import BulkDownloader, SlidingWindowLimiter
+from data_management.data_storage import DataStorage
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+END = datetime(2024, 1, 3, tzinfo=timezone.utc)
+
+PACING_ERROR = 'Historical Market Data Service error message:Historical data request pacing violation'
+
+class FakeIB:
+    """
+    Returns a bar inside and a bar outside every requested day. Each symbol in `behaviour` maps to
+    what its first requests do instead: 'pacing' reports a pacing violation and 'timeout' never
+    answers, so the request times out.
+    """
+
+    def __init__(self, behaviour=None):
+        self.errorEvent = Event('errorEvent')
+        self.RaiseRequestErrors = False
+        self.behaviour = behaviour or {}
+        self.requests = []
+
+    async def reqHistoricalDataAsync(self, contract, endDateTime, durationStr, barSizeSetting, whatToShow, useRTH, formatDate, timeout):
+        self.requests.append((contract.symbol, endDateTime, time.monotonic()))
+        failures = self.behaviour.get(contract.symbol, [])
+        if failures:
+            failure = failures.pop(0)
+            if failure == 'pacing':
+                self.errorEvent.emit(1, 162, PACING_ERROR, contract)
+            else:
+                await asyncio.sleep(timeout)
+            return []
+        return [
+            BarData(date=endDateTime - timedelta(minutes=1), open=1.0, high=1.0, low=1.0, close=1.0, volume=1.0),
+            BarData(date=endDateTime, open=2.0, high=2.0, low=2.0, close=2.0, volume=2.0),
+        ]
+
+def make_downloader(ib, tmp_path, **kwargs) -> BulkDownloader:
+    options = dict(retry_delay=0.05, request_timeout=0.05, requests_per_window=100, window=0.1, symbol_requests_per_window=100, symbol_window=0.1)
+    options.update(kwargs)
+    return BulkDownloader(ib, DataStorage(str(tmp_path)), **options)
+
+def download(downloader: BulkDownloader, symbols, start, end):
+    return asyncio.run(downloader.download_async(symbols, start, end))
+
+def test_sliding_window_never_exceeds_the_limit():
+    limiter = SlidingWindowLimiter(3, 0.2)
+
+    async def acquire_all():
+        sent = []
+        for _ in range(9):
+            await limiter.acquire()
+            sent.append(time.monotonic())
+        return sent
+
+    sent = asyncio.run(acquire_all())
+    assert max(sum(1 for t in sent if start <= t < start + 0.2) for start in sent) == 3
+    assert sent[-1] - sent[0] >= 0.4
+
+def test_chunks_are_saved_to_storage(tmp_path):
+    ib = FakeIB()
+    downloader = make_downloader(ib, tmp_path)
+    progress = download(downloader, ['AAPL', 'MSFT'], START, END)
+
+    assert (progress.completed_chunks, progress.total_chunks, progress.failed) == (4, 4, [])
+    assert progress.bars == 8
+    for symbol in ('AAPL', 'MSFT'):
+        bars = downloader.storage.load_partitioned(symbol)
+        # The bar at each chunk's end lies outside the chunk and is dropped
+        assert list(bars['date']) == [datetime(2024, 1, 1, 23, 59), datetime(2024, 1, 2, 23, 59)]
+    assert ib.RaiseRequestErrors is False
+
+def test_pacing_error_is_retried_with_backoff(tmp_path):
+    ib = FakeIB({'AAPL': ['pacing', 'pacing']})
+    progress = download(make_downloader(ib, tmp_path), ['AAPL'], START, START + timedelta(days=1))
+
+    assert (progress.completed_chunks, progress.retries, progress.pacing_errors) == (1, 2, 2)
+    sent = [t for _, _, t in ib.requests]
+    assert sent[1] - sent[0] >= 0.05
+    assert sent[2] - sent[1] >= 0.1
+
+def test_timeout_counts_as_failure(tmp_path):
+    ib = FakeIB({'AAPL': ['timeout', 'timeout']})
+    downloader = make_downloader(ib, tmp_path, max_retries=1)
+    progress = download(downloader, ['AAPL'], START, START + timedelta(days=1))
+
+    assert progress.completed_chunks == 0 and progress.retries == 1
+    assert progress.failed == [(('AAPL', START, START + timedelta(days=1)), 'Request timed out')]
+    assert downloader.storage.list_partitions('AAPL') == []
@@ -0,0 +1,73 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from application.execution_scheduler import ExecutionScheduler
+from trading_strategies.strategy_executor import StrategyExecutor
+from trading_strategies.strategy_interface import StrategyInterface
+
+class TargetStrategy(StrategyInterface):
+    def __init__(self, fail: bool = False):
+        super().__init__()
+        self.fail = fail
+
+    def analyze(self, data):
+        self.rebalance('AAPL', 100, 10.0)
+        if self.fail:
+            raise ValueError('bad data')
+
+class FailingOrderManager:
+    def execute_signals(self, signals, strategy=None):
+        raise RuntimeError('rejected')
+
+class FakeDataRetrieval:
+    def __init__(self):
+        self.callbacks = {}
+
+    def fetch_realtime_data(self, symbol, callback):
+        self.callbacks[symbol] = callback
+        return symbol
+
+    def cancel_realtime_data(self, subscription):
+        del self.callbacks[subscription]
+
+def run_one_tick(strategy: StrategyInterface, order_manager) -> dict:
+    source = FakeDataRetrieval()
+    executor = StrategyExecutor(strategy, order_manager, None, source, symbols=['AAPL'], prepare_data=lambda buffer: None)
+    scheduler = ExecutionScheduler([executor])
+
+    async def run():
+        task = asyncio.ensure_future(scheduler.run_async())
+        await asyncio.sleep(0)
+        source.callbacks['AAPL'](SimpleNamespace(symbol='AAPL', received_ns=0))
+        while not scheduler.metrics()[executor.name]['errors']:
+            await asyncio.sleep(0.01)
+        scheduler.stop()
+        await task
+
+    asyncio.run(run())
+    scheduler.pool.shutdown()
+    return scheduler.metrics()[executor.name]
+
+def test_failed_submit_releases_pending():
+    strategy = TargetStrategy()
+    metrics = run_one_tick(strategy, FailingOrderManager())
+    assert metrics['errors'] == 1 and metrics['orders'] == 0
+    assert strategy.pending == {} and strategy.positions == {}
+
+    # With nothing left in flight, the next run asks for the whole target again
+    strategy.analyze(None)
+    assert [signal.quantity for signal in strategy.signals] == [100]
+
+def test_failed_analyze_releases_pending():
+    strategy = TargetStrategy(fail=True)
+    metrics = run_one_tick(strategy, FailingOrderManager())
+    assert metrics['errors'] == 1
+    assert strategy.pending == {} and strategy.signals == []
+
+def test_rejects_a_process_pool():
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        with pytest.raises(ValueError):
+            ExecutionScheduler([], pool)
@@ -0,0 +1,114 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from eventkit import Event
+from ib_insync import BarData
+
+from data_management.data_storage import DataStorage
+from data_management.historical_cache import HistoricalDataCache
+
+def day(n: int) -> datetime:
+    return datetime(2024, 1, n, tzinfo=timezone.utc)
+
+class FakeIB:
+    """
+    Returns one bar a minute before the end of every request, and reports an error for the
+    request ends listed in `fail`.
+    """
+
+    def __init__(self):
+        self.errorEvent = Event('errorEvent')
+        self.requests = []
+        self.fail = set()
+
+    def reqHistoricalData(self, contract, endDateTime, durationStr, barSizeSetting, whatToShow, useRTH, formatDate, timeout):
+        self.requests.append((contract.symbol, endDateTime, durationStr))
+        if endDateTime in self.fail:
+            self.errorEvent.emit(1, 162, 'Historical Market Data Service error message:API historical data query cancelled', contract)
+            return []
+        return [BarData(date=endDateTime - timedelta(minutes=1), open=1.0, high=1.0, low=1.0, close=1.0, volume=1.0)]
+
+def test_partial_hit_fetches_only_missing_days(tmp_path):
+    ib = FakeIB()
+    cache = HistoricalDataCache(ib, DataStorage(str(tmp_path)))
+
+    bars = cache.fetch('AAPL', day(1), day(3), '1 min')
+    assert len(bars) == 2
+    assert [end for _, end, _ in ib.requests] == [day(2), day(3)]
+
+    ib.requests.clear()
+    bars = cache.fetch('AAPL', day(1), day(5), '1 min')
+    assert len(bars) == 4
+    assert sorted(end for _, end, _ in ib.requests) == [day(4), day(5)]
+
+    ib.requests.clear()
+    assert len(cache.fetch('AAPL', day(2), day(4), '1 min')) == 2
+    assert ib.requests == []
+    stats = cache.stats.to_dict()
+    assert (stats['misses'], stats['partial_hits'], stats['hits'], stats['requests']) == (1, 1, 1, 4)
+
+def test_failed_request_leaves_its_day_uncovered(tmp_path):
+    ib = FakeIB()
+    ib.fail.add(day(3))
+    cache = HistoricalDataCache(ib, DataStorage(str(tmp_path)))
+
+    assert len(cache.fetch('AAPL', day(1), day(4), '1 min')) == 2
+    assert cache.stats.failed_requests == 1
+
+    ib.fail.clear()
+    ib.requests.clear()
+    assert len(cache.fetch('AAPL', day(1), day(4), '1 min')) == 3
+    assert ib.requests == [('AAPL', day(3), '1 D')]
+
+def test_sub_day_chunks_cover_a_day_only_when_all_succeed(tmp_path):
+    ib = FakeIB()
+    ib.fail.add(day(1) + timedelta(hours=12))
+    cache = HistoricalDataCache(ib, DataStorage(str(tmp_path)))
+
+    cache.fetch('AAPL', day(1), day(2), '10 secs')
+    assert [duration for _, _, duration in ib.requests] == ['14400 S'] * 6
+    assert cache.stats.failed_requests == 1
+
+    ib.fail.clear()
+    ib.requests.clear()
+    cache.fetch('AAPL', day(1), day(2), '10 secs')
+    assert len(ib.requests) == 6
+    ib.requests.clear()
+    cache.fetch('AAPL', day(1), day(2), '10 secs')
+    assert ib.requests == []
+
+def test_evicts_least_recently_used_beyond_max_bytes(tmp_path):
+    ib = FakeIB()
+    cache = HistoricalDataCache(ib, DataStorage(str(tmp_path)))
+    cache.fetch('AAPL', day(1), day(3), '1 min')
+    cache.fetch('MSFT', day(1), day(3), '1 min')
+    cache.fetch('AAPL', day(1), day(3), '1 min')
+    entry_size = cache.size() // 2
+
+    cache.max_bytes = entry_size * 2
+    cache.fetch('TSLA', day(1), day(3), '1 min')
+    assert cache.stats.evictions == 1
+    assert cache.size() == entry_size * 2
+
+    ib.requests.clear()
+    cache.fetch('AAPL', day(1), day(3), '1 min')
+    assert ib.requests == []
+    cache.max_bytes = None
+    cache.fetch('MSFT', day(1), day(3), '1 min')
+    assert len(ib.requests) == 2
+
+def test_evicts_entries_older_than_max_age(tmp_path):
+    ib = FakeIB()
+    cache = HistoricalDataCache(ib, DataStorage(str(tmp_path)))
+    cache.fetch('AAPL', day(1), day(2), '1 min')
+    time.sleep(0.1)
+
+    cache.max_age = timedelta(seconds=0.05)
+    cache.fetch('MSFT', day(1), day(2), '1 min')
+    assert cache.stats.evictions == 1
+
+    ib.requests.clear()
+    cache.fetch('MSFT', day(1), day(2), '1 min')
+    assert ib.requests == []
+    cache.fetch('AAPL', day(1), day(2), '1 min')
+    assert ib.requests == [('AAPL', day(2), '1 D')]
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from entities.stock_signal import StockSignal
+from order_execution.order_management import OrderManagement
+from order_execution.order_netting import NettedOrderHandle, OrderNetting, allocate
+from order_execution.simulated_broker import CommissionModel, SimulatedBroker
+
+class RecordingMetrics:
+    def __init__(self):
+        self.fills = []
+
+    def on_fill(self, symbol, quantity, price, strategy=None):
+        self.fills.append((strategy, quantity, price))
+
+def run_netting(signals, quote_size=None, cancel_after_fill=False):
+    """
+    Submits (strategy, signal) pairs for netting on a simulated broker quoting 99.99 / 100.01 and
+    returns the broker, the netting and the handles once every handle has completed.
+    """
+    async def run():
+        broker = SimulatedBroker(cash=1e9, commissions=CommissionModel(per_share=0, minimum=0), participation=None if quote_size is None else 1.0)
+        metrics = RecordingMetrics()
+        netting = OrderNetting(OrderManagement(broker), window=60, price_source=lambda symbol: 100.0, metrics=metrics)
+        broker.on_tick('AAPL', bid=99.99, ask=100.01, bid_size=quote_size or float('nan'), ask_size=quote_size or float('nan'))
+        handles = [handle for strategy, signal in signals for handle in netting.submit(strategy, [signal])]
+        netting.flush()
+        if cancel_after_fill:
+            broker.cancel_order(handles[0].parent.order)
+        await asyncio.wait_for(asyncio.gather(*[handle.completed for handle in handles]), 1)
+        return broker, netting, metrics, handles
+
+    return asyncio.run(run())
+
+def buy(quantity):
+    return StockSignal('AAPL', 'BUY', quantity, 'MARKET', 100.0)
+
+def sell(quantity):
+    return StockSignal('AAPL', 'SELL', quantity, 'MARKET', 100.0)
+
+def test_opposing_strategies_send_one_net_order():
+    broker, netting, metrics, handles = run_netting([('A', buy(100)), ('B', buy(50)), ('C', sell(70))])
+
+    assert [trade.order.totalQuantity for trade in broker.trades.values()] == [80]
+    assert [handle.filled for handle in handles] == [100, 50, -70]
+    assert all(handle.confirmation.confirmation_type == 'SUCCESS' for handle in handles)
+    assert netting.stats == {'signals': 3, 'parent_orders': 1, 'crossed_quantity': 70}
+    # Every strategy's reported fills add up to its allocation, and together to the broker's position
+    for strategy, handle in zip('ABC', handles):
+        assert sum(quantity for name, quantity, _ in metrics.fills if name == strategy) == handle.filled
+    assert sum(quantity for _, quantity, _ in metrics.fills) == broker.positions['AAPL'].quantity == 80
+
+def test_partial_parent_fill_then_cancel():
+    broker, _, metrics, handles = run_netting([('A', buy(100)), ('B', buy(50)), ('C', sell(70))], quote_size=30, cancel_after_fill=True)
+
+    assert broker.positions['AAPL'].quantity == 30
+    # The crossings stand, and the 30 shares bought are split between A and B by what each still needs
+    assert [handle.filled for handle in handles] == [67, 33, -70]
+    for handle in handles:
+        assert abs(handle.filled) <= abs(handle.order.quantity)
+    assert sum(handle.filled for handle in handles) == sum(quantity for _, quantity, _ in metrics.fills) == 30
+    assert [handle.confirmation.confirmation_type for handle in handles][2] == 'SUCCESS'
+    assert all(handle.confirmation.confirmation_type != 'SUCCESS' for handle in handles[:2])
+
+def test_net_zero_group_is_crossed_at_the_reference_price():
+    broker, netting, metrics, handles = run_netting([('A', buy(50)), ('B', sell(20)), ('C', sell(30))])
+
+    assert broker.trades == {}
+    assert [handle.filled for handle in handles] == [50, -20, -30]
+    assert all(handle.average_price == 100.0 for handle in handles)
+    assert netting.stats['parent_orders'] == 0 and netting.stats['crossed_quantity'] == 50
+    assert sum(quantity for _, quantity, _ in metrics.fills) == 0
+
+def test_fractional_quantities_are_not_netted():
+    broker, netting, _, handles = run_netting([('A', buy(10)), ('B', sell(0.5))])
+
+    assert isinstance(handles[0], NettedOrderHandle) and not isinstance(handles[1], NettedOrderHandle)
+    assert sorted(trade.order.totalQuantity for trade in broker.trades.values()) == [0.5, 10]
+    assert netting.stats['signals'] == 1
+
+def test_allocate_splits_whole_units():
+    assert allocate(7, [1, 1, 1]) == [3, 2, 2]
+    assert allocate(30, [53, 27]) == [20, 10]
+    assert allocate(10, []) == []
+    shares = allocate(97, [13, 29, 31, 40])
+    assert sum(shares) == 97 and all(share.is_integer() and share <= weight for share, weight in zip(shares, [13, 29, 31, 40]))
+    with pytest.raises(ValueError):
+        allocate(2.5, [1, 1])
@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_management.streaming_indicators import STREAMING_INDICATORS, StreamingIndicator, StreamingTransform, StreamingVWAP
+from data_management.tick_list_enum import TRANSFORM_FUNCTIONS, TickListEnum
+
+PARAMETERS = {
+    TickListEnum.ADD_CONSTANT: ['Close', 1.5],
+    TickListEnum.MULTIPLY_BY_FACTOR: ['Close', 0.5],
+    TickListEnum.CALCULATE_SMA: ['Close', 10],
+    TickListEnum.CALCULATE_EMA: ['Close', 10],
+    TickListEnum.CALCULATE_ROLLING_STD: ['Close', 10],
+    TickListEnum.CALCULATE_VWAP: ['Close', 'Volume'],
+}
+
+def make_frame(n: int, nan_fraction: float) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    volume = rng.integers(1, 1000, n).astype(float)
+    close[rng.random(n) < nan_fraction] = np.nan
+    volume[rng.random(n) < nan_fraction] = np.nan
+    return pd.DataFrame({'Close': close, 'Volume': volume})
+
+def stream(expr, data: pd.DataFrame) -> pd.DataFrame:
+    transform = StreamingTransform(expr)
+    return pd.DataFrame([transform.update(row) for row in data.to_dict('records')])
+
+def test_every_operation_has_a_streaming_counterpart():
+    assert set(STREAMING_INDICATORS) == set(TRANSFORM_FUNCTIONS) == set(TickListEnum)
+    assert all(issubclass(indicator, StreamingIndicator) for indicator in STREAMING_INDICATORS.values())
+    with pytest.raises(TypeError):
+        StreamingIndicator()
+
+@pytest.mark.parametrize('nan_fraction', [0.0, 0.05])
+@pytest.mark.parametrize('operation', list(TickListEnum), ids=lambda operation: operation.name)
+def test_streaming_matches_batch(operation, nan_fraction):
+    data = make_frame(2000, nan_fraction)
+    params = PARAMETERS[operation]
+    expected = TRANSFORM_FUNCTIONS[operation](data.copy(), *params)
+    actual = stream([(operation, params)], data)
+    assert list(actual.columns) == list(expected.columns)
+    for column in expected.columns:
+        np.testing.assert_allclose(actual[column].to_numpy(), expected[column].to_numpy(), rtol=1e-9, atol=1e-9, err_msg=column)
+
+def test_chained_expression_matches_batch():
+    data = make_frame(500, 0.05)
+    expr = [
+        (TickListEnum.MULTIPLY_BY_FACTOR, ['Close', 2.0]),
+        (TickListEnum.CALCULATE_SMA, ['Close', 5]),
+        (TickListEnum.CALCULATE_EMA, ['Close', 5]),
+        (TickListEnum.CALCULATE_ROLLING_STD, ['Close', 5]),
+        (TickListEnum.CALCULATE_VWAP, ['Close', 'Volume']),
+    ]
+    expected = data.copy()
+    for operation, params in expr:
+        expected = TRANSFORM_FUNCTIONS[operation](expected, *params)
+    actual = stream(expr, data)
+    np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-9)
+
+def test_vwap_recovers_after_a_nan_volume():
+    vwap = StreamingVWAP('Close', 'Volume')
+    values = [vwap.push(10, 1), vwap.push(11, math.nan), vwap.push(12, 1)]
+    assert values[0] == 10 and math.isnan(values[1]) and values[2] == 11
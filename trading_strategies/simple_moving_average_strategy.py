@@ -1,4 +1,4 @@
-from entities.stock_signal import StockSignal
+import numpy as np
 from trading_strategies.strategy_interface import StrategyInterface
 from pandas import DataFrame
 
@@ -6,35 +6,70 @@ class SimpleMovingAverageStrategy(StrategyInterface):
     """
     A simple moving average crossover strategy implementation.
     
-    This strategy generates buy or sell signals based on the crossover of the simple 
-    moving average. A buy signal is generated when the current SMA value crosses above 
-    the previous SMA value, and a sell signal when it crosses below.
+    This strategy goes long when the simple moving average is rising, i.e. the current SMA value
+    is above the previous one, and short when it is flat or falling. It implements the vectorized
+    generate_signals() contract, and analyze() acts on the last element of the same computation.
+
+    Attributes:
+        window (int): The number of bars averaged by the SMA.
+        symbol (str): The symbol traded.
+        quantity (int): The size of the long or short position.
+        order_type (str): 'MARKET' or 'LIMIT'.
+        column (str): The column holding closing prices.
     """
 
+    def __init__(self, window: int = 20, symbol: str = "AAPL", quantity: int = 100, order_type: str = "MARKET", column: str = 'Close'):
+        """
+        Initializes the strategy with the SMA window to use.
+
+        Parameters:
+            window (int): The number of bars averaged by the SMA.
+            symbol (str): The symbol traded.
+            quantity (int): The size of the long or short position.
+            order_type (str): 'MARKET' or 'LIMIT'.
+            column (str): The column holding closing prices.
+        """
+        super().__init__()
+        self.window = window
+        self.symbol = symbol
+        self.quantity = quantity
+        self.order_type = order_type
+        self.column = column
+
+    def generate_signals(self, data: DataFrame) -> np.ndarray:
+        """
+        Returns the target position for every bar: +quantity while the SMA is rising, -quantity
+        otherwise, and 0 until there are window + 1 bars to compare two SMA values.
+
+        Parameters:
+            data (DataFrame): The market data, oldest bar first, with closing prices in self.column.
+
+        Returns:
+            np.ndarray: One target position per row of data.
+        """
+        closes = data[self.column].to_numpy(dtype=np.float64)
+        positions = np.zeros(len(closes))
+        w = self.window
+        # SMA[i] - SMA[i-1] == (close[i] - close[i-w]) / w, so the SMA rises exactly when the
+        # newest close is above the one leaving the window. No rolling mean is needed.
+        rising = closes[w:] > closes[:-w]
+        positions[w:] = np.where(rising, self.quantity, -self.quantity)
+        return positions
+
     def analyze(self, data: DataFrame):
         """
-        Analyzes the market data and generates trading signals based on a simple moving 
-        average crossover strategy.
+        Analyzes the market data and generates the signal that moves the position to the
+        strategy's target for the latest bar.
         
         Parameters:
             data (DataFrame): The most recent market data to analyze. It is assumed 
-            that the DataFrame contains a 'Close' column for closing prices and an 'SMA' 
-            column for simple moving average values.
+            that the DataFrame contains a 'Close' column for closing prices.
         """
         self.signals = []
+        if len(data) <= self.window:
+            return
 
-        # Example parameters for signal generation
-        symbol = "AAPL"  # Example stock symbol
-        quantity = 100  # Example quantity
-        order_type = "MARKET"  # or "LIMIT"
-        price = data['Close'][-1]  # Current closing price, for example
-
-        # Signal generation logic
-        if data['SMA'][-1] > data['SMA'][-2]:
-            signal_type = "BUY"
-            signal = StockSignal(symbol, signal_type, quantity, order_type, price)
-            self.signals.append(signal)
-        else:
-            signal_type = "SELL"
-            signal = StockSignal(symbol, signal_type, quantity, order_type, price)
-            self.signals.append(signal)
+        # Only the last window + 1 bars determine the latest target
+        target = self.generate_signals(data.iloc[-(self.window + 1):])[-1]
+        price = data[self.column].iloc[-1]
+        self.rebalance(self.symbol, target, price, self.order_type)
@@ -0,0 +1,156 @@
+import math
+from time import perf_counter_ns
+from typing import Callable, List, Optional, Union
+
+from pandas import DataFrame
+
+from application.latency_tracing import tracer
+from data_management.bar_aggregator import BarBuffer
+from data_management.data_retrieval import DataRetrieval
+from data_management.tick_store import TickBuffer
+from entities.option_signal import OptionSignal
+from entities.signal import Signal
+from order_execution.broker_integration import OrderHandle
+from order_execution.order_management import OrderManagement
+from order_execution.order_netting import NettedOrderHandle, OrderNetting
+from performance.metrics_calculations import MetricsCalculation
+from trading_strategies.strategy_interface import StrategyInterface
+
+class StrategyExecutor:
+    """
+    Runs one strategy on live market data and turns its signals into orders.
+
+    The ExecutionScheduler calls prepare_data() and submit() on the event loop and analyze() on a
+    worker thread, so at most one analyze() call per executor is ever in flight.
+
+    Attributes:
+        strategy (StrategyInterface): The strategy to run.
+        order_manager (OrderManagement): Creates and submits the orders for the strategy's signals.
+        metrics_calculations (MetricsCalculation): The strategy's performance metrics.
+        data_retrieval (DataRetrieval): The source of the strategy's market data.
+        symbols (List[str]): The symbols the strategy is run on.
+        lookback (int): The number of most recent ticks, or bars, passed to the strategy.
+        time_budget (float): The number of seconds a run may take, from the tick arriving to the
+                             signals being ready. Signals from slower runs are discarded.
+        max_pending (int): The most symbols with unprocessed updates kept while the strategy is busy.
+        name (str): The name used in metrics and logs.
+        netting (OrderNetting, optional): Nets the strategy's orders with other strategies' before
+                                          they are sent. Without it, orders are sent directly.
+        bar_resolution (int, optional): Runs the strategy on each completed bar of this many
+                                        seconds instead of on every tick.
+    """
+
+    def __init__(
+        self,
+        strategy: StrategyInterface,
+        order_manager: OrderManagement,
+        metrics_calculations: MetricsCalculation,
+        data_retrieval: DataRetrieval,
+        symbols: Optional[List[str]] = None,
+        lookback: int = 256,
+        time_budget: float = 1.0,
+        max_pending: int = 16,
+        prepare_data: Optional[Callable[[Union[TickBuffer, BarBuffer]], DataFrame]] = None,
+        name: Optional[str] = None,
+        netting: Optional[OrderNetting] = None,
+        bar_resolution: Optional[int] = None,
+    ):
+        """
+        Parameters:
+            prepare_data (Callable[[Union[TickBuffer, BarBuffer]], DataFrame], optional): Builds the
+                data passed to the strategy from a symbol's tick or bar buffer. Defaults to a copy of
+                the last `lookback` rows. It runs on the event loop, so it must copy what the
+                strategy needs.
+        """
+        self.strategy = strategy
+        self.order_manager = order_manager
+        self.metrics_calculations = metrics_calculations
+        self.data_retrieval = data_retrieval
+        self.symbols = symbols if symbols is not None else ['AAPL']
+        self.lookback = lookback
+        self.time_budget = time_budget
+        self.max_pending = max_pending
+        self._prepare_data = prepare_data
+        self.name = name if name is not None else type(strategy).__name__
+        self.netting = netting
+        self.bar_resolution = bar_resolution
+
+    def prepare_data(self, buffer: Union[TickBuffer, BarBuffer]) -> DataFrame:
+        """
+        Snapshots a symbol's tick or bar buffer into the data the strategy analyzes.
+        """
+        if self._prepare_data is not None:
+            return self._prepare_data(buffer)
+        return buffer.to_frame(self.lookback)
+
+    def analyze(self, data: DataFrame) -> List[Signal]:
+        """
+        Runs the strategy on the data and returns the signals it generated.
+        """
+        start = perf_counter_ns() if tracer.enabled else 0
+        try:
+            self.strategy.analyze(data)
+        except Exception:
+            # Signals appended before the failure are never returned, so release them here
+            self.discard(self.strategy.signals)
+            self.strategy.signals = []
+            raise
+        signals = self.strategy.signals
+        self.strategy.signals = []
+        if tracer.enabled:
+            tracer.record('analyze', start, self.name)
+        return signals
+
+    def submit(self, signals: List[Signal]) -> List[OrderHandle]:
+        """
+        Creates and submits the orders for the strategy's signals without waiting for the broker.
+        """
+        if not signals:
+            return []
+        if self.netting is not None:
+            handles = self.netting.submit(self.name, signals)
+        else:
+            handles = self.order_manager.execute_signals(signals, self.name)
+        for signal, handle in zip(signals, handles):
+            handle.completed.add_done_callback(
+                lambda _, signal=signal, handle=handle: self.strategy.on_signal_done(signal, _filled_quantity(handle))
+            )
+        return handles
+
+    def discard(self, signals: List[Signal]) -> None:
+        """
+        Tells the strategy that signals were dropped without being sent, e.g. because analyze()
+        ran past the time budget.
+        """
+        for signal in signals:
+            self.strategy.on_signal_done(signal, 0.0)
+
+    async def qualify(self, signals: List[Signal]) -> None:
+        """
+        Qualifies the contracts of any option signals that the broker hasn't cached yet, so that
+        submit() doesn't reject them. Awaited by the ExecutionScheduler before submit().
+        """
+        options = [signal for signal in signals if isinstance(signal, OptionSignal)]
+        if options:
+            orders = [self.order_manager.create_order(signal) for signal in options]
+            await self.order_manager.broker_integration.qualify_options_async(orders)
+
+    def execute(self, data: DataFrame) -> List[OrderHandle]:
+        """
+        Analyzes the data and submits the resulting orders in the calling thread.
+        """
+        return self.submit(self.analyze(data))
+
+    def scale_strategy(self, factor: float):
+        # Code to scale a strategy based on performance
+        pass
+
+def _filled_quantity(handle: OrderHandle) -> float:
+    """
+    Returns the signed quantity filled for a handle's order.
+    """
+    if isinstance(handle, NettedOrderHandle):
+        return handle.filled
+    if handle.trade is None:
+        return 0.0
+    return math.copysign(handle.trade.filled(), handle.order.quantity)
@@ -1,5 +1,10 @@
+import threading
+import numpy as np
 from abc import ABC, abstractmethod
+from typing import Dict, Tuple
 from pandas import DataFrame
+from entities.signal import Signal
+from entities.stock_signal import StockSignal
 
 class StrategyInterface(ABC):
     """
@@ -9,8 +14,24 @@ class StrategyInterface(ABC):
     Each strategy should implement the 'analyze' method to generate trading signals 
     based on market data analysis.
 
+    Strategies can also implement the optional generate_signals() method, which returns the target
+    position for every bar of a history in one vectorized pass. The backtester then simulates the
+    whole history with array operations, and analyze() can take the last element of the same
+    array, so backtest and live trading share one implementation.
+
+    Whoever executes the signals reports back how much of each was filled through
+    on_signal_done(): the StrategyExecutor once the signal's order is finished (or the signal is
+    dropped), and the backtester as it fills them. rebalance() counts both the filled positions and
+    the signals still in flight, so it neither re-sends an order that is working nor assumes an
+    order filled that was rejected, dropped or never executed. Live, rebalance() runs on a worker
+    thread inside analyze() while on_signal_done() runs on the event loop, so both hold a lock while
+    they read and update the positions.
+
     Attributes:
         signals (list): A list of trading signals generated by the strategy.
+        positions (Dict[str, float]): The filled stock position for each symbol.
+        pending (Dict[str, float]): The signed quantity of rebalance() signals for each symbol that
+                                    haven't finished yet.
     """
 
     def __init__(self):
@@ -20,6 +41,10 @@ class StrategyInterface(ABC):
         Sets up an empty list for storing trading signals.
         """
         self.signals = []
+        self.positions: Dict[str, float] = {}
+        self.pending: Dict[str, float] = {}
+        self._in_flight: Dict[Signal, Tuple[str, float]] = {}  # Signed quantity of each unfinished rebalance() signal
+        self._positions_lock = threading.Lock()
 
     @abstractmethod
     def analyze(self, data: DataFrame):
@@ -33,4 +58,80 @@ class StrategyInterface(ABC):
         
         The implementation should populate self.signals with instances of trading signals.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def generate_signals(self, data: DataFrame) -> np.ndarray:
+        """
+        Returns the target position for every bar of the data in one vectorized pass.
+
+        Implementing this method is optional. The value for each bar must only depend on that bar
+        and the bars before it, so that the last element is what analyze() would act on live.
+
+        Parameters:
+            data (DataFrame): The market data, oldest bar first.
+
+        Returns:
+            np.ndarray: A float array with one target position per row of data.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not implement generate_signals()")
+
+    @classmethod
+    def supports_vectorized(cls) -> bool:
+        """
+        Returns whether the strategy implements generate_signals().
+        """
+        return cls.generate_signals is not StrategyInterface.generate_signals
+
+    def reset(self) -> None:
+        """
+        Clears the signals and positions, e.g. before replaying a new history through analyze().
+        """
+        self.signals = []
+        with self._positions_lock:
+            self.positions = {}
+            self.pending = {}
+            self._in_flight = {}
+
+    def rebalance(self, symbol: str, target: float, price: float, order_type: str = 'MARKET') -> None:
+        """
+        Appends the StockSignal that moves the symbol's position to a target, if the filled position
+        and the signals still in flight don't add up to it yet.
+
+        Parameters:
+            symbol (str): The symbol to trade.
+            target (float): The target position, negative for short.
+            price (float): The signal price.
+            order_type (str): 'MARKET' or 'LIMIT'.
+        """
+        with self._positions_lock:
+            delta = target - self.positions.get(symbol, 0.0) - self.pending.get(symbol, 0.0)
+            if delta == 0:
+                return
+            signal_type = 'BUY' if delta > 0 else 'SELL'
+            quantity = abs(delta)
+            if float(quantity).is_integer():
+                quantity = int(quantity)
+            signal = StockSignal(symbol, signal_type, quantity, order_type, price)
+            self.pending[symbol] = self.pending.get(symbol, 0.0) + delta
+            self._in_flight[signal] = (symbol, delta)
+        self.signals.append(signal)
+
+    def on_signal_done(self, signal: Signal, filled: float) -> None:
+        """
+        Records that a signal's order is finished, or that the signal was dropped before it was sent.
+
+        Parameters:
+            signal (Signal): The signal, as appended to self.signals.
+            filled (float): The signed quantity filled, 0 if the order was rejected or never sent.
+        """
+        with self._positions_lock:
+            if filled and isinstance(signal, StockSignal):
+                self.positions[signal.symbol] = self.positions.get(signal.symbol, 0.0) + filled
+            in_flight = self._in_flight.pop(signal, None)
+            if in_flight is not None:
+                symbol, quantity = in_flight
+                remaining = self.pending[symbol] - quantity
+                if remaining:
+                    self.pending[symbol] = remaining
+                else:
+                    del self.pending[symbol]